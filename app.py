@@ -6,13 +6,16 @@ from firebase_admin import credentials
 from firebase_admin import firestore
 from utils.auth import init_firebase, login_user, logout_user
 from streamlit_extras.switch_page_button import switch_page
-from utils.firestore_db import get_db
+from utils.firestore_db import get_db, warm_up_db
 from pages.Home import home_page
 from pages.NewProject import new_project_page
 from pages.ChatHistory import chat_history_page
+from pages.Performance import performance_page
 from utils.error_handler import handle_errors
 from utils.auth import init_firebase, login_user, logout_user, display_navigation
 from utils.github_integration import create_github_oauth_url
+from utils.helpers import is_admin
+from utils.tracing import span
 
 # Must be the first Streamlit command
 st.set_page_config(page_title="DevSpell", page_icon="🔮", layout="wide")
@@ -47,6 +50,9 @@ def main():
             'projectId': os.getenv('FIREBASE_PROJECT_ID'),
         })
 
+    # Share one database handle per process and open its channels up front
+    warm_up_db()
+
     # Main app flow
     if not st.session_state.user:
         render_login_ui()
@@ -73,18 +79,25 @@ def render_main_app():
 def display_navigation():
     st.sidebar.title("Navigation")
     st.sidebar.write(f"Welcome, {st.session_state.user.email}")
-    page = st.sidebar.radio("Go to", ["Home", "New Project", "Chat History", "About", "Contact"])
+    pages = ["Home", "New Project", "Chat History", "About", "Contact"]
+    if is_admin(st.session_state.user):
+        pages.append("Performance")
+    page = st.sidebar.radio("Go to", pages)
 
     if st.sidebar.button("Logout"):
         handle_logout()
 
     # Route to appropriate page
-    if page == "Home":
-        home_page()
-    elif page == "New Project":
-        new_project_page()
-    elif page == "Chat History":
-        chat_history_page()
+    if page in ["Home", "New Project", "Chat History", "Performance"]:
+        with span("page.render", page=page):
+            if page == "Home":
+                home_page()
+            elif page == "New Project":
+                new_project_page()
+            elif page == "Chat History":
+                chat_history_page()
+            else:
+                performance_page()
     elif page == "About":
         switch_page("About")
     elif page == "Contact":
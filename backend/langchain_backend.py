@@ -1,9 +1,9 @@
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
 from backend.project_generator import EnhancedProjectGenerator
+from firebase_admin import firestore
 from utils.firestore_db import get_db
-import os
+from utils.llm_provider import get_llm
+from utils.token_budget import run_budgeted_chain
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
@@ -84,10 +84,8 @@ Ensure all code is production-ready and follows modern development standards.
 
 def generate_initial_prompt(project_data, user_id):
     """Generate initial prompt focused only on project structure and requirements"""
-    llm1 = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model="mixtral-8x7b-32768")
-    chain = LLMChain(prompt=llm1_prompt_template, llm=llm1)
-    
-    prompt = chain.run({
+    llm1 = get_llm("mixtral-8x7b-32768", stage="initial_prompt")
+    prompt = run_budgeted_chain(llm1, llm1_prompt_template, {
         "project_name": project_data["name"],
         "project_type": project_data["project_type"],
         "frontend_option": project_data["frontend"],
@@ -95,34 +93,35 @@ def generate_initial_prompt(project_data, user_id):
         "backend_option": project_data["backend"],
         "database_option": project_data["database"],
         "authentication": project_data["authentication"],
-        "features": ", ".join(project_data["additional_features"]),
+        "features": project_data["additional_features"],
         "description": project_data["description"],
-        "requirements": ", ".join(project_data["requirements"])
-    })
+        "requirements": project_data["requirements"]
+    }, stage="initial_prompt")
     
-    # Save to Firestore
+    # Save to Firestore in the background
     db = get_db()
+    writer = db.batch_writer()
     db.save_chat_history(user_id, {
         "user_message": "Initial prompt generation",
         "llm_response": prompt
-    })
+    }, writer=writer)
+    db.update_user(user_id, {"last_generation_at": firestore.SERVER_TIMESTAMP}, writer=writer)
+    writer.commit_async()
     
     return prompt
 
 def generate_project_files(project_data, approved_prompt):
     """Generate the final project files using LLM2"""
-    llm2 = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model="mixtral-8x7b-32768")
-    chain = LLMChain(prompt=llm2_prompt_template, llm=llm2)
-    
-    implementation_details = chain.run({
+    llm2 = get_llm("mixtral-8x7b-32768", stage="implementation")
+    implementation_details = run_budgeted_chain(llm2, llm2_prompt_template, {
         "prompt": approved_prompt,
         "frontend_option": project_data["frontend"],
         "ui_library": project_data["ui_library"],
         "backend_option": project_data["backend"],
         "database_option": project_data["database"],
         "authentication": project_data["authentication"],
-        "features": ", ".join(project_data["additional_features"])
-    })
+        "features": project_data["additional_features"]
+    }, stage="implementation", summarise_fields=())
     
     # Generate project using the implementation details
     generator = EnhancedProjectGenerator()
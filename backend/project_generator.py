@@ -8,6 +8,8 @@ import os
 
 import yaml
 
+from utils.tracing import span
+
 @dataclass
 class ProjectConfig:
     name: str
@@ -151,37 +153,50 @@ class ProjectGenerator:
 
     def generate_project(self, config: ProjectConfig, implementation_details: str) -> Optional[Dict]:
         """Generate project files based on configuration"""
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with span("generator.generate_project", frontend=config.frontend, backend=config.backend,
+                  database=config.database, deployment=config.deployment_platform,
+                  request_bytes=len(implementation_details or "")) as trace, \
+                tempfile.TemporaryDirectory() as temp_dir:
             base_path = Path(temp_dir)
             
             # Create basic project structure
-            self._create_base_structure(base_path)
+            with span("generator.base_structure"):
+                self._create_base_structure(base_path)
             
             # Generate frontend files
-            self._generate_frontend_files(base_path, config)
+            with span("generator.frontend"):
+                self._generate_frontend_files(base_path, config)
             
             # Generate backend files
             if config.backend != "None":
-                self._generate_backend_files(base_path, config)
+                with span("generator.backend"):
+                    self._generate_backend_files(base_path, config)
             
             # Generate database files
             if config.database != "None":
-                self._generate_database_files(base_path, config)
+                with span("generator.database"):
+                    self._generate_database_files(base_path, config)
             
             # Generate configuration files
-            self._generate_config_files(base_path, config)
+            with span("generator.config"):
+                self._generate_config_files(base_path, config)
             
             # Generate documentation
-            self._generate_documentation(base_path, config)
+            with span("generator.documentation"):
+                self._generate_documentation(base_path, config)
             
             # Create deployment files
-            self._generate_deployment_files(base_path, config)
+            with span("generator.deployment"):
+                self._generate_deployment_files(base_path, config)
             
             # Parse and generate implementation files
-            self._generate_implementation_files(base_path, implementation_details)
+            with span("generator.implementation"):
+                self._generate_implementation_files(base_path, implementation_details)
             
             # Create ZIP archive
-            return self._create_zip_archive(base_path)
+            result = self._create_zip_archive(base_path)
+            trace.set(files=len(result['files']), response_bytes=len(result['zip_content']))
+            return result
 
     def _create_base_structure(self, base_path: Path):
         """Create common project structure"""
@@ -239,8 +254,9 @@ class ProjectGenerator:
         
         # Generate package.json if needed
         if config.frontend in ["React", "Vue.js", "Next.js"] or config.backend == "Node.js/Express":
-            package_json = self._generate_package_json(config)
-            self._write_json(base_path / "package.json", package_json)
+            if not (base_path / "package.json").exists():
+                package_json = self._generate_package_json(config)
+                self._write_json(base_path / "package.json", package_json)
 
     def _generate_deployment_files(self, base_path: Path, config: ProjectConfig):
         """Generate deployment configuration files"""
@@ -308,6 +324,8 @@ export default App;"""
     @staticmethod
     def _write_file(path: Path, content: str):
         """Helper method to write file content"""
+        if isinstance(content, dict):
+            content = json.dumps(content, indent=2)
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_text(content)
 
@@ -319,6 +337,12 @@ export default App;"""
 
     def _create_zip_archive(self, base_path: Path) -> Dict:
         """Create ZIP archive of the generated project"""
+        with span("generator.zip") as trace:
+            result = self._build_zip_archive(base_path)
+            trace.set(files=len(result['files']), response_bytes=len(result['zip_content']))
+        return result
+
+    def _build_zip_archive(self, base_path: Path) -> Dict:
         files = []
         zip_path = base_path / "project.zip"
         
@@ -341,6 +365,44 @@ export default App;"""
             'zip_content': zip_content,
             'files': files
         }
+    def _generate_gitignore(self, config: ProjectConfig) -> str:
+        """Generate .gitignore file"""
+        entries = [".env", "*.log", ".DS_Store"]
+        if config.frontend in ["React", "Vue.js", "Next.js"] or config.backend == "Node.js/Express":
+            entries.extend(["node_modules/", "dist/", "build/", ".next/"])
+        if config.backend in ["Django", "FastAPI", "Flask"]:
+            entries.extend(["__pycache__/", "*.py[cod]", ".venv/"])
+        return "\n".join(entries) + "\n"
+
+    def _generate_package_json(self, config: ProjectConfig) -> Dict:
+        """Generate a root package.json when no template provided one"""
+        return {
+            "name": config.name.lower().replace(" ", "-"),
+            "version": "1.0.0",
+            "private": True,
+            "description": config.description
+        }
+
+    def _generate_dockerfile(self, config: ProjectConfig) -> str:
+        """Generate Dockerfile for the selected backend"""
+        if config.backend == "FastAPI":
+            return self._generate_fastapi_dockerfile(config)
+        if config.backend in ["Django", "Flask"]:
+            return """FROM python:3.11-slim
+WORKDIR /app
+COPY requirements.txt .
+RUN pip install --no-cache-dir -r requirements.txt
+COPY . .
+EXPOSE 8000
+CMD ["python", "manage.py", "runserver", "0.0.0.0:8000"]"""
+        return """FROM node:18-alpine
+WORKDIR /app
+COPY package*.json ./
+RUN npm install
+COPY . .
+EXPOSE 3000
+CMD ["npm", "start"]"""
+
     # Add these methods to the ProjectGenerator class
 
     def _generate_css(self, config: ProjectConfig) -> str:
@@ -550,16 +612,17 @@ export default App;"""
 
     # In the ProjectGenerator class
 
-    def _generate_vue_package_json(self, project_name: str) -> Dict:
+    def _generate_vue_package_json(self, config: ProjectConfig) -> Dict:
         """
         Generates a package.json file for a Vue.js project.
 
         Args:
-            project_name (str): Name of the Vue.js project.
+            config (ProjectConfig): Configuration of the Vue.js project.
 
         Returns:
             Dict: A dictionary representing the contents of package.json.
         """
+        project_name = config.name
         return {
             "name": project_name,
             "version": "1.0.0",
@@ -659,9 +722,9 @@ export default App;"""
         MIT
         """
 
-    def _generate_nextjs_package_json(self, project_name: str) -> Dict:
+    def _generate_nextjs_package_json(self, config: ProjectConfig) -> Dict:
         return {
-            "name": project_name,
+            "name": config.name,
             "version": "1.0.0",
             "scripts": {
                 "dev": "next dev",
@@ -720,21 +783,9 @@ export default App;"""
 
     module.exports = app;"""
 
-def _generate_express_server(self, config: ProjectConfig) -> str:
-    """Generate Express server.js file"""
-    return """const app = require('./app');
-require('dotenv').config();
-
-const PORT = process.env.PORT || 3000;
-const HOST = process.env.HOST || 'localhost';
-
-app.listen(PORT, () => {
-    console.log(`Server running at http://${HOST}:${PORT}`);
-});"""
-
-def _generate_express_package_json(self, config: ProjectConfig) -> str:
-    """Generate package.json for Express projects"""
-    return """{
+    def _generate_express_package_json(self, config: ProjectConfig) -> str:
+        """Generate package.json for Express projects"""
+        return """{
     "name": "%s",
     "version": "1.0.0",
     "description": "Express.js backend for %s",
@@ -757,9 +808,9 @@ def _generate_express_package_json(self, config: ProjectConfig) -> str:
     }
 }""" % (config.name, config.name)
 
-def _generate_express_server(self, config: ProjectConfig) -> str:
-    """Generate Express server.js file"""
-    return """const app = require('./app');
+    def _generate_express_server(self, config: ProjectConfig) -> str:
+        """Generate Express server.js file"""
+        return """const app = require('./app');
 require('dotenv').config();
 
 const PORT = process.env.PORT || 3000;
@@ -769,9 +820,9 @@ app.listen(PORT, () => {
     console.log(`Server running at http://${HOST}:${PORT}`);
 });"""
 
-def _generate_django_manage(self, config: ProjectConfig) -> str:
-    """Generate Django manage.py file"""
-    return """#!/usr/bin/env python
+    def _generate_django_manage(self, config: ProjectConfig) -> str:
+        """Generate Django manage.py file"""
+        return """#!/usr/bin/env python
 import os
 import sys
 
@@ -790,18 +841,18 @@ def main():
 if __name__ == '__main__':
     main()"""
 
-def _generate_django_requirements(self, config: ProjectConfig) -> str:
-    """Generate Django requirements.txt file"""
-    return """Django>=4.2.0
+    def _generate_django_requirements(self, config: ProjectConfig) -> str:
+        """Generate Django requirements.txt file"""
+        return """Django>=4.2.0
 djangorestframework>=3.14.0
 django-cors-headers>=4.0.0
 python-dotenv>=1.0.0
 psycopg2-binary>=2.9.6
 gunicorn>=20.1.0"""
 
-def _generate_django_settings(self, config: ProjectConfig) -> str:
-    """Generate Django settings.py file"""
-    return """import os
+    def _generate_django_settings(self, config: ProjectConfig) -> str:
+        """Generate Django settings.py file"""
+        return """import os
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -848,9 +899,9 @@ DATABASES = {
 STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'"""
 
-def _generate_fastapi_main(self, config: ProjectConfig) -> str:
-    """Generate FastAPI main.py file"""
-    return """from fastapi import FastAPI
+    def _generate_fastapi_main(self, config: ProjectConfig) -> str:
+        """Generate FastAPI main.py file"""
+        return """from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(
@@ -872,18 +923,18 @@ app.add_middleware(
 async def root():
     return {"message": "Welcome to the API"}"""
 
-def _generate_fastapi_requirements(self, config: ProjectConfig) -> str:
-    """Generate FastAPI requirements.txt file"""
-    return """fastapi>=0.95.0
+    def _generate_fastapi_requirements(self, config: ProjectConfig) -> str:
+        """Generate FastAPI requirements.txt file"""
+        return """fastapi>=0.95.0
 uvicorn>=0.21.0
 python-dotenv>=1.0.0
 sqlalchemy>=2.0.0
 pydantic>=1.10.0
 alembic>=1.10.0"""
 
-def _generate_fastapi_dockerfile(self, config: ProjectConfig) -> str:
-    """Generate FastAPI Dockerfile"""
-    return """FROM python:3.9-slim
+    def _generate_fastapi_dockerfile(self, config: ProjectConfig) -> str:
+        """Generate FastAPI Dockerfile"""
+        return """FROM python:3.9-slim
 
 WORKDIR /app
 
@@ -895,9 +946,9 @@ COPY . .
 CMD ["uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000"]"""
 
 
-def _generate_postgres_init(self, config: ProjectConfig) -> str:
-    """Generate initial PostgreSQL migration file"""
-    return """-- Initial database schema
+    def _generate_postgres_init(self, config: ProjectConfig) -> str:
+        """Generate initial PostgreSQL migration file"""
+        return """-- Initial database schema
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     username VARCHAR(100) UNIQUE NOT NULL,
@@ -908,9 +959,9 @@ CREATE TABLE IF NOT EXISTS users (
 -- Add your table definitions here
 """
 
-def _generate_postgres_config(self, config: ProjectConfig) -> str:
-    """Generate PostgreSQL configuration file"""
-    return """const { Pool } = require('pg');
+    def _generate_postgres_config(self, config: ProjectConfig) -> str:
+        """Generate PostgreSQL configuration file"""
+        return """const { Pool } = require('pg');
 require('dotenv').config();
 
 const pool = new Pool({
@@ -924,9 +975,9 @@ const pool = new Pool({
 module.exports = pool;
 """
 
-def _generate_mongodb_config(self, config: ProjectConfig) -> str:
-    """Generate MongoDB configuration file"""
-    return """const mongoose = require('mongoose');
+    def _generate_mongodb_config(self, config: ProjectConfig) -> str:
+        """Generate MongoDB configuration file"""
+        return """const mongoose = require('mongoose');
 require('dotenv').config();
 
 const connectDB = async () => {
@@ -945,9 +996,9 @@ const connectDB = async () => {
 module.exports = connectDB;
 """
 
-def _generate_mongodb_schema(self, config: ProjectConfig) -> str:
-    """Generate MongoDB schema file"""
-    return """const mongoose = require('mongoose');
+    def _generate_mongodb_schema(self, config: ProjectConfig) -> str:
+        """Generate MongoDB schema file"""
+        return """const mongoose = require('mongoose');
 
 const userSchema = new mongoose.Schema({
     username: {
@@ -969,9 +1020,9 @@ const userSchema = new mongoose.Schema({
 module.exports = mongoose.model('User', userSchema);
 """
 
-def _generate_mysql_init(self, config: ProjectConfig) -> str:
-    """Generate initial MySQL migration file"""
-    return """-- Initial database schema
+    def _generate_mysql_init(self, config: ProjectConfig) -> str:
+        """Generate initial MySQL migration file"""
+        return """-- Initial database schema
 CREATE TABLE IF NOT EXISTS users (
     id INT AUTO_INCREMENT PRIMARY KEY,
     username VARCHAR(100) UNIQUE NOT NULL,
@@ -982,9 +1033,9 @@ CREATE TABLE IF NOT EXISTS users (
 -- Add your table definitions here
 """
 
-def _generate_mysql_config(self, config: ProjectConfig) -> str:
-    """Generate MySQL configuration file"""
-    return """const mysql = require('mysql2');
+    def _generate_mysql_config(self, config: ProjectConfig) -> str:
+        """Generate MySQL configuration file"""
+        return """const mysql = require('mysql2');
 require('dotenv').config();
 
 const pool = mysql.createPool({
@@ -1000,78 +1051,78 @@ const pool = mysql.createPool({
 module.exports = pool.promise();
 """
 
-def _generate_implementation_files(self, base_path: Path, implementation_details: str) -> None:
-    """Generate implementation-specific files based on provided details"""
-    try:
-        details = json.loads(implementation_details)
-        for file_info in details:
-            file_path = base_path / file_info['path']
-            content = file_info['content']
-            self._write_file(file_path, content)
-    except json.JSONDecodeError:
-        print("Invalid implementation details format")
-    except KeyError:
-        print("Missing required implementation details")
-
-def _generate_docker_compose(self, config: ProjectConfig) -> str:
-    """Generate docker-compose.yml file"""
-    services = {
-        "app": {
-            "build": ".",
-            "ports": ["3000:3000"],
-            "environment": [
-                "NODE_ENV=development"
-            ],
-            "volumes": ["./:/app"],
-            "depends_on": []
+    def _generate_implementation_files(self, base_path: Path, implementation_details: str) -> None:
+        """Generate implementation-specific files based on provided details"""
+        try:
+            details = json.loads(implementation_details)
+            for file_info in details:
+                file_path = base_path / file_info['path']
+                content = file_info['content']
+                self._write_file(file_path, content)
+        except json.JSONDecodeError:
+            print("Invalid implementation details format")
+        except KeyError:
+            print("Missing required implementation details")
+
+    def _generate_docker_compose(self, config: ProjectConfig) -> str:
+        """Generate docker-compose.yml file"""
+        services = {
+            "app": {
+                "build": ".",
+                "ports": ["3000:3000"],
+                "environment": [
+                    "NODE_ENV=development"
+                ],
+                "volumes": ["./:/app"],
+                "depends_on": []
+            }
         }
-    }
     
-    if config.database == "PostgreSQL":
-        services["postgres"] = {
-            "image": "postgres:latest",
-            "environment": [
-                "POSTGRES_USER=postgres",
-                "POSTGRES_PASSWORD=postgres",
-                "POSTGRES_DB=app"
-            ],
-            "ports": ["5432:5432"]
-        }
-        services["app"]["depends_on"].append("postgres")
+        if config.database == "PostgreSQL":
+            services["postgres"] = {
+                "image": "postgres:latest",
+                "environment": [
+                    "POSTGRES_USER=postgres",
+                    "POSTGRES_PASSWORD=postgres",
+                    "POSTGRES_DB=app"
+                ],
+                "ports": ["5432:5432"]
+            }
+            services["app"]["depends_on"].append("postgres")
     
-    elif config.database == "MongoDB":
-        services["mongodb"] = {
-            "image": "mongo:latest",
-            "ports": ["27017:27017"]
-        }
-        services["app"]["depends_on"].append("mongodb")
+        elif config.database == "MongoDB":
+            services["mongodb"] = {
+                "image": "mongo:latest",
+                "ports": ["27017:27017"]
+            }
+            services["app"]["depends_on"].append("mongodb")
     
-    return f"""version: '3.8'
+        return f"""version: '3.8'
 
 services:
   {yaml.dump(services, default_flow_style=False)}"""
 
-def _generate_vercel_config(self, config: ProjectConfig) -> dict:
-    """Generate Vercel configuration"""
-    return {
-        "version": 2,
-        "builds": [
-            {
-                "src": "package.json",
-                "use": "@vercel/node"
-            }
-        ],
-        "routes": [
-            {
-                "src": "/(.*)",
-                "dest": "/"
-            }
-        ]
-    }
+    def _generate_vercel_config(self, config: ProjectConfig) -> dict:
+        """Generate Vercel configuration"""
+        return {
+            "version": 2,
+            "builds": [
+                {
+                    "src": "package.json",
+                    "use": "@vercel/node"
+                }
+            ],
+            "routes": [
+                {
+                    "src": "/(.*)",
+                    "dest": "/"
+                }
+            ]
+        }
 
-def _generate_netlify_config(self, config: ProjectConfig) -> str:
-    """Generate Netlify configuration"""
-    return """[build]
+    def _generate_netlify_config(self, config: ProjectConfig) -> str:
+        """Generate Netlify configuration"""
+        return """[build]
   command = "npm run build"
   publish = "dist"
 
@@ -1085,9 +1136,9 @@ def _generate_netlify_config(self, config: ProjectConfig) -> str:
   status = 200
 """
 
-def _generate_api_docs(self, config: ProjectConfig) -> str:
-    """Generate API documentation"""
-    return f"""# API Documentation
+    def _generate_api_docs(self, config: ProjectConfig) -> str:
+        """Generate API documentation"""
+        return f"""# API Documentation
 
 ## Overview
 This document provides documentation for the {config.name} API.
@@ -1122,14 +1173,14 @@ All endpoints follow standard HTTP status codes and return JSON responses.
 API requests are limited to 100 requests per minute per IP address.
 """
 
-def _get_auth_docs(self, config: ProjectConfig) -> str:
-    """Generate authentication documentation based on config"""
-    if config.authentication == "JWT":
-        return """Authentication is handled via JWT tokens.
+    def _get_auth_docs(self, config: ProjectConfig) -> str:
+        """Generate authentication documentation based on config"""
+        if config.authentication == "JWT":
+            return """Authentication is handled via JWT tokens.
 Include the token in the Authorization header:
 `Authorization: Bearer <token>`"""
-    elif config.authentication == "OAuth":
-        return """Authentication is handled via OAuth 2.0.
+        elif config.authentication == "OAuth":
+            return """Authentication is handled via OAuth 2.0.
 Follow the standard OAuth flow to obtain access tokens."""
-    else:
-        return "No authentication required for public endpoints."
\ No newline at end of file
+        else:
+            return "No authentication required for public endpoints."
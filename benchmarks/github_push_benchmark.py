@@ -0,0 +1,116 @@
+"""Benchmark of pushing generated projects to GitHub.
+
+Runs utils.github_push against the local utils.fake_github stand-in. For
+each project size it times a first push, an unchanged re-push and a
+re-push after a small edit, and records the requests each one made.
+
+Usage:
+    python -m benchmarks.github_push_benchmark
+    python -m benchmarks.github_push_benchmark --files 10 300 --latency-ms 80 --workers 4 8 16
+    python -m benchmarks.github_push_benchmark --error-rate 0.02 --secondary-limit-rate 0.01
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import GITHUB_CONFIG
+from utils.fake_github import FakeGitHubServer
+from utils.github_push import GitDataClient, push_files
+
+SCENARIOS = ["first_push", "unchanged", "small_edit"]
+
+
+def make_files(count, bytes_per_file, revision=0, edited=0):
+    """Synthetic project; the first edited files differ for revision > 0"""
+    files = []
+    for index in range(count):
+        body = f"// module {index}\n" + f"export const value{index} = {index};\n" * (bytes_per_file // 32 + 1)
+        if revision and index < edited:
+            body += f"// revision {revision}\n"
+        files.append({"path": f"src/generated/module_{index}.js", "content": body})
+    return files
+
+
+def timed_push(server, client, repo, files, message):
+    """Push once and return the duration, requests made and push result"""
+    before = server.github.stats['requests']
+    start = time.perf_counter()
+    result = push_files(client, repo, files, message, replace=True)
+    return {
+        "seconds": round(time.perf_counter() - start, 4),
+        "requests": server.github.stats['requests'] - before,
+        "uploaded": result['uploaded'],
+        "changed": result['changed']
+    }
+
+
+def run_workload(server, files, bytes_per_file, workers, edited):
+    """Benchmark the push scenarios for one project size and worker count"""
+    client = GitDataClient(f"benchmark-{files}-{workers}", api_url=server.url, workers=workers)
+    owner = client.verified_login()
+    repo = client.ensure_repository(owner, f"bench-{files}-{workers}")[0]['full_name']
+
+    results = {
+        "first_push": timed_push(server, client, repo, make_files(files, bytes_per_file), "first push"),
+        "unchanged": timed_push(server, client, repo, make_files(files, bytes_per_file), "unchanged"),
+        "small_edit": timed_push(server, client, repo, make_files(files, bytes_per_file, 1, edited), "edit")
+    }
+    return {"name": f"{files} files|{workers} workers", "files": files, "workers": workers,
+            "scenarios": results, "etag_cache": client.etags.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GitHub pushes against the local stand-in")
+    parser.add_argument("--files", type=int, nargs="*", default=[10, 100, 300], help="Project sizes")
+    parser.add_argument("--bytes-per-file", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="*", default=[GITHUB_CONFIG['push_workers']],
+                        help="Blob upload pool sizes")
+    parser.add_argument("--edited", type=int, default=2, help="Files changed in the small_edit scenario")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated GitHub latency")
+    parser.add_argument("--latency-jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failed with a 502")
+    parser.add_argument("--secondary-limit-rate", type=float, default=0.0,
+                        help="Share of requests failed with a secondary rate limit")
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    server = FakeGitHubServer("127.0.0.1", 0, latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                              rate_limit=args.rate_limit, error_rate=args.error_rate,
+                              secondary_limit_rate=args.secondary_limit_rate, seed=args.seed).start()
+    try:
+        workloads = []
+        for files in args.files:
+            for workers in args.workers:
+                workload = run_workload(server, files, args.bytes_per_file, workers, args.edited)
+                workloads.append(workload)
+                for scenario in SCENARIOS:
+                    result = workload["scenarios"][scenario]
+                    print(f"{workload['name']:<24} {scenario:<12} {result['seconds'] * 1000:>10.1f} ms "
+                          f"{result['requests']:>6} requests {result['uploaded']:>6} blobs")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    results = {
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+        "secondary_limit_rate": args.secondary_limit_rate,
+        "server": server.github.stats,
+        "workloads": workloads
+    }
+    print(f"Server: {server.github.stats['requests']} requests, {server.github.stats['not_modified']} not modified, "
+          f"{server.github.stats['injected_errors']} injected errors")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
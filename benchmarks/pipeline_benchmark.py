@@ -0,0 +1,229 @@
+"""End-to-end benchmark of the DevSpell generation pipeline.
+
+Drives the four New Project steps (stack recommendation, prompt generation,
+implementation generation and ProjectGenerator ZIP creation) against the
+offline FakeLLM for every stack and implementation size in a workload file.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark
+    python -m benchmarks.pipeline_benchmark --files 10 100 --iterations 3
+    python -m benchmarks.pipeline_benchmark --compare benchmarks/results/<commit>.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import LLM_CONFIG
+from backend.project_generator import ProjectGenerator
+from utils.cognitive_verifier import CognitiveVerifier
+from pages.NewProject import generate_initial_prompt, generate_implementation_details, build_project_config
+
+STAGES = ["recommendation", "prompt", "implementation", "generation"]
+DEFAULT_WORKLOADS = Path(__file__).parent / "workloads.json"
+DEFAULT_RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def run_pipeline(project_data):
+    """Run the full pipeline once, returning per-stage durations and the ZIP size"""
+    durations = {}
+
+    start = time.perf_counter()
+    verifier = CognitiveVerifier()
+    verifier.get_stack_recommendation(project_data["project_type"], project_data["description"],
+                                      project_data["requirements"], project_data["scale"])
+    verifier.verify_compatibility(project_data["frontend"], project_data["ui_library"],
+                                  project_data["backend"], project_data["database"],
+                                  project_data["authentication"])
+    durations["recommendation"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prompt = generate_initial_prompt(project_data)
+    durations["prompt"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    implementation_details = generate_implementation_details(project_data, prompt)
+    durations["implementation"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = ProjectGenerator().generate_project(build_project_config(project_data), implementation_details)
+    durations["generation"] = time.perf_counter() - start
+
+    return durations, len(result["zip_content"]), len(result["files"])
+
+
+def measure_allocations(project_data):
+    """
+    Run the pipeline once under tracemalloc
+
+    Returns:
+        tuple: (peak bytes allocated by each stage, peak bytes held at any point of the run)
+    """
+    allocations = {}
+    outputs = {}
+    run_peak = 0
+    stage_functions = {
+        "recommendation": lambda: CognitiveVerifier().get_stack_recommendation(
+            project_data["project_type"], project_data["description"],
+            project_data["requirements"], project_data["scale"]),
+        "prompt": lambda: generate_initial_prompt(project_data),
+        "implementation": lambda: generate_implementation_details(project_data, outputs["prompt"]),
+        "generation": lambda: ProjectGenerator().generate_project(
+            build_project_config(project_data), outputs["implementation"])
+    }
+
+    tracemalloc.start()
+    try:
+        for stage in STAGES:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            outputs[stage] = stage_functions[stage]()
+            stage_peak = tracemalloc.get_traced_memory()[1]
+            allocations[stage] = stage_peak - baseline
+            run_peak = max(run_peak, stage_peak)
+    finally:
+        tracemalloc.stop()
+    return allocations, run_peak
+
+
+def percentiles(samples):
+    """Summarise a list of durations in milliseconds"""
+    millis = sorted(sample * 1000 for sample in samples)
+    if len(millis) == 1:
+        cuts = [millis[0]] * 99
+    else:
+        cuts = statistics.quantiles(millis, n=100, method="inclusive")
+    return {
+        "mean_ms": round(statistics.fmean(millis), 3),
+        "p50_ms": round(cuts[49], 3),
+        "p90_ms": round(cuts[89], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "max_ms": round(millis[-1], 3)
+    }
+
+
+def run_workload(base_project_data, stack, files, bytes_per_file, iterations):
+    """Benchmark one stack/implementation size combination"""
+    LLM_CONFIG['fake']['implementation_files'] = files
+    LLM_CONFIG['fake']['response_chars'] = files * bytes_per_file
+    project_data = {**base_project_data, **stack}
+
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(iterations):
+        durations, zip_bytes, file_count = run_pipeline(project_data)
+        for stage, duration in durations.items():
+            samples[stage].append(duration)
+    totals = [sum(samples[stage][i] for stage in STAGES) for i in range(iterations)]
+    # tracemalloc starts fresh for each workload, unlike the process-wide ru_maxrss
+    allocations, peak_bytes = measure_allocations(project_data)
+
+    return {
+        "name": f"{stack['frontend']}|{stack['backend']}|{stack['database']}|{stack['deployment_platform']}|{files}",
+        "stack": stack,
+        "implementation_files": files,
+        "iterations": iterations,
+        "stages": {stage: percentiles(samples[stage]) for stage in STAGES},
+        "total": percentiles(totals),
+        "allocated_peak_bytes": allocations,
+        "peak_traced_bytes": peak_bytes,
+        "zip_bytes": zip_bytes,
+        "generated_files": file_count
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(baseline_path, results, threshold):
+    """Print per-workload p50 changes against a previous results file"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {w["name"]: w for w in json.load(f)["workloads"]}
+
+    regressions = 0
+    for workload in results["workloads"]:
+        previous = baseline.get(workload["name"])
+        if not previous:
+            continue
+        for stage in STAGES + ["total"]:
+            current_ms = (workload["total"] if stage == "total" else workload["stages"][stage])["p50_ms"]
+            previous_ms = (previous["total"] if stage == "total" else previous["stages"][stage])["p50_ms"]
+            if not previous_ms:
+                continue
+            change = (current_ms - previous_ms) / previous_ms
+            marker = ""
+            if change > threshold:
+                marker = "  REGRESSION"
+                regressions += 1
+            print(f"{workload['name']:<60} {stage:<15} {previous_ms:>10.2f} -> {current_ms:>10.2f} ms "
+                  f"({change:+.1%}){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DevSpell generation pipeline offline")
+    parser.add_argument("--workloads", default=str(DEFAULT_WORKLOADS), help="Workload definition JSON file")
+    parser.add_argument("--iterations", type=int, default=5, help="Pipeline runs per workload")
+    parser.add_argument("--files", type=int, nargs="*", help="Only run these implementation sizes")
+    parser.add_argument("--frontend", nargs="*", help="Only run stacks with these frontends")
+    parser.add_argument("--replay", help="JSONL recording of LLM responses to replay")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated LLM latency")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative p50 slowdown reported as a regression")
+    args = parser.parse_args()
+
+    with open(args.workloads, encoding="utf-8") as f:
+        workloads = json.load(f)
+
+    LLM_CONFIG['backend'] = 'fake'
+    LLM_CONFIG['fake']['replay_path'] = args.replay
+    LLM_CONFIG['fake']['latency_ms'] = args.latency_ms
+    LLM_CONFIG['fake']['error_rate'] = 0.0
+
+    sizes = args.files or workloads["implementation_files"]
+    stacks = [s for s in workloads["stacks"] if not args.frontend or s["frontend"] in args.frontend]
+
+    results = {
+        "commit": current_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "workloads": []
+    }
+    for stack in stacks:
+        for files in sizes:
+            workload = run_workload(workloads["project_data"], stack, files,
+                                    workloads["bytes_per_file"], args.iterations)
+            results["workloads"].append(workload)
+            print(f"{workload['name']:<60} total p50 {workload['total']['p50_ms']:>10.2f} ms  "
+                  f"p95 {workload['total']['p95_ms']:>10.2f} ms  zip {workload['zip_bytes']} B")
+
+    output = Path(args.output) if args.output else DEFAULT_RESULTS_DIR / f"{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        if compare_results(args.compare, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,127 @@ GITHUB_CONFIG = {
     'client_id': os.getenv('GITHUB_CLIENT_ID'),
     'client_secret': os.getenv('GITHUB_CLIENT_SECRET'),
     'redirect_uri': 'http://localhost:8501/Callback',
-    'scope': 'repo user'
+    'scope': 'repo user',
+    # Point both at utils.fake_github to run OAuth and pushes offline
+    'oauth_url': os.getenv('GITHUB_OAUTH_URL', 'https://github.com'),
+    'api_url': os.getenv('GITHUB_API_URL', 'https://api.github.com'),
+    # Pushes upload blobs on push_workers threads, then write one tree, one commit and the ref
+    'push_workers': int(os.getenv('GITHUB_PUSH_WORKERS', '8')),
+    'max_retries': int(os.getenv('GITHUB_MAX_RETRIES', '3')),
+    # Longest pause for an exhausted rate limit before the push fails instead
+    'max_rate_limit_wait_seconds': int(os.getenv('GITHUB_MAX_RATE_LIMIT_WAIT_SECONDS', '60')),
+    # Clients are cached per token; a token's identity is re-verified after identity_ttl_seconds
+    'client_cache_size': int(os.getenv('GITHUB_CLIENT_CACHE_SIZE', '256')),
+    'identity_ttl_seconds': int(os.getenv('GITHUB_IDENTITY_TTL_SECONDS', '300')),
+    # GET responses kept per client for If-None-Match requests; a 304 doesn't count against the rate limit
+    'etag_cache_entries': int(os.getenv('GITHUB_ETAG_CACHE_ENTRIES', '500')),
+    # Local GitHub API stand-in used by integration tests and benchmarks
+    'fake': {
+        'host': os.getenv('FAKE_GITHUB_HOST', '127.0.0.1'),
+        'port': int(os.getenv('FAKE_GITHUB_PORT', '8765')),
+        'latency_ms': float(os.getenv('FAKE_GITHUB_LATENCY_MS', '0')),
+        'latency_jitter_ms': float(os.getenv('FAKE_GITHUB_LATENCY_JITTER_MS', '0')),
+        # Requests per token per window before the primary rate limit answers 403
+        'rate_limit': int(os.getenv('FAKE_GITHUB_RATE_LIMIT', '5000')),
+        'rate_limit_window_seconds': int(os.getenv('FAKE_GITHUB_RATE_LIMIT_WINDOW_SECONDS', '3600')),
+        # Share of requests failed with a 502, and with a secondary rate limit 403 and Retry-After
+        'error_rate': float(os.getenv('FAKE_GITHUB_ERROR_RATE', '0')),
+        'secondary_limit_rate': float(os.getenv('FAKE_GITHUB_SECONDARY_LIMIT_RATE', '0')),
+        'seed': int(os.getenv('FAKE_GITHUB_SEED', '0'))
+    }
 }
 
 FIREBASE_CONFIG = {
     'config_path': os.getenv('FIREBASE_CONFIG_PATH'),
-    'project_id': os.getenv('FIREBASE_PROJECT_ID')
-}
\ No newline at end of file
+    'project_id': os.getenv('FIREBASE_PROJECT_ID'),
+    # Number of Firestore clients (each with its own gRPC channel) shared by the process
+    'channel_pool_size': int(os.getenv('FIRESTORE_CHANNEL_POOL_SIZE', '1')),
+    'warm_up': os.getenv('FIRESTORE_WARM_UP', 'true').lower() == 'true',
+    # Per-user read-through cache for project lists and history pages
+    'cache_ttl_seconds': int(os.getenv('FIRESTORE_CACHE_TTL_SECONDS', '300')),
+    'cache_max_entries': int(os.getenv('FIRESTORE_CACHE_MAX_ENTRIES', '5000')),
+    # Background WriteBatch commits
+    'write_workers': int(os.getenv('FIRESTORE_WRITE_WORKERS', '4')),
+    'write_retries': int(os.getenv('FIRESTORE_WRITE_RETRIES', '3')),
+    # Large LLM responses are zlib-compressed, and chunked into a subcollection above chunk_size_bytes
+    'compress_threshold_bytes': int(os.getenv('FIRESTORE_COMPRESS_THRESHOLD_BYTES', '8192')),
+    'compression_level': int(os.getenv('FIRESTORE_COMPRESSION_LEVEL', '6')),
+    'chunk_size_bytes': int(os.getenv('FIRESTORE_CHUNK_SIZE_BYTES', '524288')),
+    # Chat history renders from a snapshot listener over the newest live_history_limit chats
+    'live_history': os.getenv('FIRESTORE_LIVE_HISTORY', 'false').lower() == 'true',
+    'live_history_limit': int(os.getenv('FIRESTORE_LIVE_HISTORY_LIMIT', '200')),
+    'live_history_idle_seconds': int(os.getenv('FIRESTORE_LIVE_HISTORY_IDLE_SECONDS', '900'))
+}
+
+STORAGE_CONFIG = {
+    # 'firestore' in production, 'sqlite' for offline development and load tests
+    'backend': os.getenv('STORAGE_BACKEND', 'firestore'),
+    # ':memory:' keeps the SQLite database in process for the lifetime of the app
+    'sqlite_path': os.getenv('SQLITE_PATH', 'data/devspell.db')
+}
+
+SEARCH_CONFIG = {
+    # Chat history search keeps one inverted index file per user under index_dir
+    'enabled': os.getenv('SEARCH_ENABLED', 'true').lower() == 'true',
+    'index_dir': os.getenv('SEARCH_INDEX_DIR', 'data/search'),
+    'page_size': int(os.getenv('SEARCH_PAGE_SIZE', '10'))
+}
+
+RETENTION_CONFIG = {
+    # Chats older than ttl_days are deleted, or moved to chat_history_archive; 0 keeps them forever
+    'ttl_days': int(os.getenv('CHAT_RETENTION_DAYS', '0')),
+    'expired_action': os.getenv('CHAT_RETENTION_ACTION', 'delete'),
+    'checkpoint_path': os.getenv('CHAT_RETENTION_CHECKPOINT', 'data/retention_checkpoint.json')
+}
+
+PROMPT_VERSION_CONFIG = {
+    # Prompt regenerations are stored as deltas against the latest full copy (a base);
+    # a new base starts after keyframe_interval versions or when a delta exceeds max_delta_ratio of the text
+    'keyframe_interval': int(os.getenv('PROMPT_KEYFRAME_INTERVAL', '20')),
+    'max_delta_ratio': float(os.getenv('PROMPT_MAX_DELTA_RATIO', '0.5'))
+}
+
+BLOB_CONFIG = {
+    # Generated project files are stored once per content hash, locally or in an S3-compatible bucket
+    'backend': os.getenv('BLOB_BACKEND', 'local'),
+    'local_path': os.getenv('BLOB_LOCAL_PATH', 'data/blobs'),
+    's3_bucket': os.getenv('BLOB_S3_BUCKET'),
+    's3_prefix': os.getenv('BLOB_S3_PREFIX', 'artifacts/'),
+    's3_endpoint_url': os.getenv('BLOB_S3_ENDPOINT_URL')
+}
+
+LLM_CONFIG = {
+    # 'groq' for the hosted models, 'fake' for the offline stand-in used in benchmarks
+    'backend': os.getenv('LLM_BACKEND', 'groq'),
+    'context_window': int(os.getenv('LLM_CONTEXT_WINDOW', '32768')),
+    # Maximum prompt tokens sent for each pipeline stage
+    'stage_budgets': {
+        'stack_recommendation': int(os.getenv('LLM_BUDGET_STACK_RECOMMENDATION', '3000')),
+        'compatibility_check': int(os.getenv('LLM_BUDGET_COMPATIBILITY_CHECK', '1500')),
+        'initial_prompt': int(os.getenv('LLM_BUDGET_INITIAL_PROMPT', '6000')),
+        'implementation': int(os.getenv('LLM_BUDGET_IMPLEMENTATION', '16000'))
+    },
+    'default_budget': int(os.getenv('LLM_BUDGET_DEFAULT', '4000')),
+    'fake': {
+        'replay_path': os.getenv('FAKE_LLM_REPLAY_PATH'),
+        'record_path': os.getenv('FAKE_LLM_RECORD_PATH'),
+        'response_chars': int(os.getenv('FAKE_LLM_RESPONSE_CHARS', '2000')),
+        'implementation_files': int(os.getenv('FAKE_LLM_IMPLEMENTATION_FILES', '10')),
+        'latency_ms': float(os.getenv('FAKE_LLM_LATENCY_MS', '0')),
+        'latency_jitter_ms': float(os.getenv('FAKE_LLM_LATENCY_JITTER_MS', '0')),
+        'error_rate': float(os.getenv('FAKE_LLM_ERROR_RATE', '0')),
+        'seed': int(os.getenv('FAKE_LLM_SEED', '0'))
+    }
+}
+
+TRACING_CONFIG = {
+    'enabled': os.getenv('TRACING_ENABLED', 'true').lower() == 'true',
+    # 'memory' keeps spans in an in-process ring buffer, 'file' appends them to a JSONL file
+    'exporters': os.getenv('TRACING_EXPORTERS', 'memory').split(','),
+    'buffer_size': int(os.getenv('TRACING_BUFFER_SIZE', '10000')),
+    'file_path': os.getenv('TRACING_FILE_PATH', 'data/traces.jsonl')
+}
+
+ADMIN_CONFIG = {
+    'emails': [email.strip().lower() for email in os.getenv('DEVSPELL_ADMIN_EMAILS', '').split(',') if email.strip()]
+}
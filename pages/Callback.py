@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.github_integration import get_github_token, get_github_client
+from utils.github_integration import get_github_token, get_github_client, get_github_login
 from utils.firestore_db import get_db
 from streamlit_extras.switch_page_button import switch_page
 
@@ -51,17 +51,18 @@ def handle_callback():
            st.error("Failed to initialize GitHub client")
            return
 
-       github_user = github_client.get_user()
+       # Verified while creating the client, so this doesn't call GitHub again
+       github_login = get_github_login(token)
        
        # Update session state
        st.session_state.github_token = token
-       st.session_state.github_username = github_user.login
+       st.session_state.github_username = github_login
        
        # Update user profile in Firestore
        try:
            db = get_db()
            db.update_user(st.session_state.user.uid, {
-               "github_username": github_user.login,
+               "github_username": github_login,
                "github_token": token,
                "github_connected": True
            })
@@ -74,7 +75,7 @@ def handle_callback():
            del st.session_state.github_oauth_state
 
        # Show success message
-       st.success(f"Successfully connected GitHub account: {github_user.login}")
+       st.success(f"Successfully connected GitHub account: {github_login}")
        
        # Add some useful information
        st.write("You can now:")
@@ -1,6 +1,103 @@
 import streamlit as st
 from utils.firestore_db import get_db
 from datetime import datetime
+from config import SEARCH_CONFIG
+from utils.live_history import get_live_history
+
+CHAT_HISTORY_PAGE_SIZE = 20
+
+def reset_chat_history():
+    """Forget loaded pages so the next render starts from the newest chat"""
+    st.session_state.chat_history = []
+    st.session_state.chat_history_cursor = None
+    st.session_state.chat_history_loaded = False
+    st.session_state.chat_bodies = {}
+    st.session_state.prompt_version_pages = {}
+
+def load_next_page(user_id):
+    """Fetch the next page of chat summaries and append it to the loaded history"""
+    db = get_db()
+    chats, cursor = db.list_chat_summaries(
+        user_id,
+        page_size=CHAT_HISTORY_PAGE_SIZE,
+        start_after=st.session_state.chat_history_cursor
+    )
+    loaded = {chat['id'] for chat in st.session_state.chat_history}
+    st.session_state.chat_history.extend(chat for chat in chats if chat['id'] not in loaded)
+    st.session_state.chat_history_cursor = cursor
+    st.session_state.chat_history_loaded = True
+
+def live_window_cursor(recent_chats, limit):
+    """Cursor just below the oldest resolved chat of a full live window, or None"""
+    if len(recent_chats) < limit:
+        return None
+    # Chats still waiting for their server timestamp can't anchor a query
+    for chat in reversed(recent_chats):
+        if chat.get('timestamp') is not None:
+            return chat['timestamp'], chat['id']
+    return None
+
+def get_chat_body(chat_id):
+    """Fetch a chat's full document the first time it is opened"""
+    if chat_id not in st.session_state.chat_bodies:
+        st.session_state.chat_bodies[chat_id] = get_db().get_chat(chat_id)
+    return st.session_state.chat_bodies[chat_id]
+
+PROMPT_VERSIONS_PAGE_SIZE = 10
+
+def show_prompt_versions(user_id, project_key):
+    """Page through the stored versions of a project's prompt"""
+    pages = st.session_state.setdefault("prompt_version_pages", {})
+    loaded = pages.setdefault(project_key, {"versions": [], "cursor": None, "loaded": False})
+    if not loaded["loaded"]:
+        versions, cursor = get_db().list_prompt_versions(user_id, project_key, page_size=PROMPT_VERSIONS_PAGE_SIZE)
+        loaded.update(versions=versions, cursor=cursor, loaded=True)
+
+    for version in loaded["versions"]:
+        label = f"Version {version['version']} ({version['source']}, {version['created_at'][:16].replace('T', ' ')})"
+        if st.toggle(label, key=f"show_version_{project_key}_{version['version']}"):
+            full = get_db().get_prompt_version(user_id, project_key, version['version'])
+            st.code(full['text'] if full else "This version is no longer available.", language="markdown")
+
+    if loaded["cursor"] is not None and st.button("Older versions", key=f"more_versions_{project_key}"):
+        versions, cursor = get_db().list_prompt_versions(user_id, project_key, page_size=PROMPT_VERSIONS_PAGE_SIZE,
+                                                         start_after=loaded["cursor"])
+        loaded["versions"].extend(versions)
+        loaded["cursor"] = cursor
+        st.rerun()
+
+def show_search_results(user_id, query):
+    """Render one page of ranked search results for query"""
+    if st.session_state.get("chat_search_query") != query:
+        st.session_state.chat_search_query = query
+        st.session_state.chat_search_page = 1
+
+    page = st.session_state.chat_search_page
+    hits, total = get_db().search_chats(user_id, query, page=page, page_size=SEARCH_CONFIG['page_size'])
+    if not total:
+        st.info("No chats match your search.")
+        return
+
+    page_count = -(-total // SEARCH_CONFIG['page_size'])
+    st.caption(f"{total} matching chats, page {page} of {page_count}")
+    for hit in hits:
+        with st.expander(f"{hit['snippet'][:80] or 'Chat'} ({(hit['created_at'] or '')[:16].replace('T', ' ')})"):
+            st.write("**Your Input:**")
+            st.write(hit['snippet'])
+            if st.toggle("Show AI Response", key=f"show_hit_{hit['doc_id']}"):
+                body = get_chat_body(hit['doc_id'])
+                st.write("**AI Response:**")
+                st.write(body['llm_response'] if body else "This chat is no longer available.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if page > 1 and st.button("Previous results"):
+            st.session_state.chat_search_page -= 1
+            st.rerun()
+    with col2:
+        if page < page_count and st.button("Next results"):
+            st.session_state.chat_search_page += 1
+            st.rerun()
 
 def chat_history_page():
     st.title("Chat History")
@@ -11,20 +108,60 @@ def chat_history_page():
         
     # Get user ID from session state
     user_id = st.session_state["user"].uid
-    db = get_db()
+
+    # Loaded pages are kept across reruns and only reset when the user changes
+    if st.session_state.get("chat_history_user") != user_id or "chat_history" not in st.session_state:
+        st.session_state.chat_history_user = user_id
+        reset_chat_history()
     
-    # Retrieve chat history
-    chat_history = db.retrieve_chat_history(user_id)
+    # In live mode the newest chats come from a snapshot listener and only older pages are queried
+    live_history = get_live_history(user_id)
+    if live_history is not None and not live_history.wait():
+        live_history = None
+    
+    recent_chats = []
+    if live_history is not None:
+        recent_chats = live_history.chats()
+        if not st.session_state.chat_history_loaded:
+            # Until an older page is loaded the cursor follows the window as new chats arrive
+            st.session_state.chat_history_cursor = live_window_cursor(recent_chats, live_history.limit)
+    elif not st.session_state.chat_history_loaded:
+        load_next_page(user_id)
+    
+    if st.button("🔄 Refresh"):
+        reset_chat_history()
+        st.rerun()
+    
+    if SEARCH_CONFIG['enabled']:
+        query = st.text_input("Search your chats", placeholder="e.g. supabase dashboard")
+        if query.strip():
+            show_search_results(user_id, query.strip())
+            return
+    
+    # A chat can be both in the live window and on an older page once the window moves
+    live_ids = {chat['id'] for chat in recent_chats}
+    chat_history = recent_chats + [chat for chat in st.session_state.chat_history if chat['id'] not in live_ids]
     
     if chat_history:
         for chat in chat_history:
-            with st.expander(f"Chat from {chat['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"):
+            created = chat['timestamp'].strftime('%Y-%m-%d %H:%M:%S') if chat.get('timestamp') else "just now"
+            with st.expander(f"Chat from {created}"):
                 st.write("**Your Input:**")
                 st.write(chat['user_message'])
-                st.write("**AI Response:**")
-                st.write(chat['llm_response'])
+                if st.toggle("Show AI Response", key=f"show_chat_{chat['id']}"):
+                    body = get_chat_body(chat['id'])
+                    st.write("**AI Response:**")
+                    st.write(body['llm_response'] if body else "This chat is no longer available.")
+                project_key = (chat.get('metadata') or {}).get('project_key')
+                if project_key and st.toggle("Show prompt versions", key=f"show_versions_{chat['id']}"):
+                    show_prompt_versions(user_id, project_key)
+        
+        if st.session_state.chat_history_cursor is not None:
+            if st.button("Load more"):
+                load_next_page(user_id)
+                st.rerun()
     else:
         st.info("No chat history available yet. Try creating a new project!")
 
 if __name__ == "__main__":
-    chat_history_page()
\ No newline at end of file
+    chat_history_page()
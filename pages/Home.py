@@ -2,9 +2,42 @@ import streamlit as st
 from streamlit_extras.switch_page_button import switch_page
 from utils.github_integration import link_github_account
 from utils.firestore_db import get_db
+from utils.async_firestore_db import get_async_db
+from utils.blob_store import get_blob_store, build_archive
+from utils.export import export_user_data
+import os
+import tempfile
 import uuid
 from urllib.parse import urlencode
 
+def get_project_details(project_id):
+    """Fetch a project's full document the first time it is opened"""
+    details = st.session_state.setdefault("project_details", {})
+    if project_id not in details:
+        details[project_id] = get_db().get_project(project_id)
+    return details[project_id]
+
+@st.cache_data(max_entries=20, show_spinner=False)
+def load_project_archive(manifest_sha256, project_id):
+    """Rebuild a stored project's ZIP; identical manifests share one cache entry"""
+    return build_archive(get_blob_store(), get_db().get_project(project_id)['files'])
+
+def prepare_export(user_id, export_format):
+    """Stream the user's data through a temporary file and return (file name, bytes)"""
+    suffix = ".parquet" if export_format == "parquet" else ".ndjson"
+    fd, path = tempfile.mkstemp(prefix="devspell-export-", suffix=suffix)
+    try:
+        if export_format == "parquet":
+            os.close(fd)
+            export_user_data(get_db(), user_id, path, "parquet")
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                export_user_data(get_db(), user_id, f)
+        with open(path, "rb") as f:
+            return f"devspell-export{suffix}", f.read()
+    finally:
+        os.remove(path)
+
 def home_page():
     # Check if user is logged in
     if "user" not in st.session_state:
@@ -16,6 +49,27 @@ def home_page():
     st.title("DevSpell 🔮")
     st.write(f"Welcome {st.session_state.user.email} to your project development hub!")
 
+    # Independent reads run concurrently, so the page waits only for the slowest one
+    db = get_async_db()
+    profile, recent_projects, stats = db.gather(
+        db.call.get_user_profile(st.session_state.user.uid),
+        db.call.list_project_summaries(st.session_state.user.uid, limit=5),
+        db.call.get_user_stats(st.session_state.user.uid)
+    )
+    if profile and profile.get("github_connected") and "github_username" not in st.session_state:
+        st.session_state.github_username = profile.get("github_username")
+        st.session_state.github_token = profile.get("github_token")
+
+    # Activity counters are kept up to date on every save, so this is a single document read
+    stats = stats or {}
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Projects", stats.get("project_count", 0))
+    col2.metric("Generations", stats.get("generation_count", 0))
+    col3.metric("Chats", stats.get("chat_count", 0))
+    col4.metric("Tokens Used", f"{stats.get('prompt_tokens', 0) + stats.get('completion_tokens', 0):,}")
+    if stats.get("last_activity_at"):
+        st.caption(f"Last activity: {stats['last_activity_at']:%Y-%m-%d %H:%M} UTC")
+
     # Rest of your code remains the same...
     # GitHub Account Section
     st.subheader("GitHub Integration")
@@ -35,9 +89,6 @@ def home_page():
 
     # Recent Projects
     st.subheader("Recent Projects")
-    db = get_db()
-    recent_projects = db.get_user_projects(st.session_state.user.uid, limit=5)
-    
     if recent_projects:
         for project in recent_projects:
             with st.expander(f"📁 {project.get('name', 'Untitled Project')}"):
@@ -45,8 +96,35 @@ def home_page():
                 st.write(f"Status: {project.get('status', 'N/A')}")
                 if project.get('github_url'):
                     st.markdown(f"[View on GitHub]({project['github_url']})")
+                if project.get('manifest_sha256') and st.toggle(
+                        f"Download ({project.get('file_count', 0)} files)", key=f"download_project_{project['id']}"):
+                    st.download_button(
+                        "Download Project",
+                        load_project_archive(project['manifest_sha256'], project['id']),
+                        f"{project.get('name', 'project')}.zip",
+                        mime="application/zip",
+                        key=f"download_button_{project['id']}"
+                    )
+                if st.toggle("Show details", key=f"show_project_{project['id']}"):
+                    details = get_project_details(project['id'])
+                    st.json(details or {})
     else:
         st.info("No projects yet. Click 'Create New Project' to get started!")
 
+    # Data Export
+    st.subheader("Export Your Data")
+    export_format = st.radio("Format", ["ndjson", "parquet"], horizontal=True,
+                             format_func=lambda value: {"ndjson": "NDJSON", "parquet": "Parquet"}[value])
+    if st.button("Prepare Export"):
+        with st.spinner("Exporting chat history and projects..."):
+            try:
+                st.session_state.export_file = prepare_export(st.session_state.user.uid, export_format)
+            except ImportError as e:
+                st.error(str(e))
+    export_file = st.session_state.get("export_file")
+    if export_file:
+        file_name, data = export_file
+        st.download_button("Download Export", data, file_name, mime="application/octet-stream")
+
 if __name__ == "__main__":
     home_page()
\ No newline at end of file
@@ -1,11 +1,16 @@
-import os
-from langchain_groq import ChatGroq
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 import streamlit as st
 from utils.cognitive_verifier import CognitiveVerifier
+from utils.firestore_db import get_db
+from utils.llm_provider import get_llm
+from utils.token_budget import run_budgeted_chain, track_token_usage
+from utils.blob_store import get_blob_store, store_files, manifest_hash
+from utils.github_push import push_project
+from utils.error_handler import FirestoreError, GitHubError
 from backend.project_generator import ProjectGenerator, ProjectConfig
 import json
+import re
+import uuid
 from typing import Dict
 
 
@@ -22,6 +27,29 @@ def initialize_session_state():
         st.session_state.generated_prompt = None
     if "approved_prompt" not in st.session_state:
         st.session_state.approved_prompt = None
+    if "generated_project" not in st.session_state:
+        st.session_state.generated_project = None
+    if "saved_project_id" not in st.session_state:
+        st.session_state.saved_project_id = None
+    if "github_push" not in st.session_state:
+        st.session_state.github_push = None
+    if "github_repo" not in st.session_state:
+        # Repository created by this project; only that one is replaced wholesale on later pushes
+        st.session_state.github_repo = None
+    if "project_key" not in st.session_state:
+        # Groups every prompt version generated for this project
+        st.session_state.project_key = str(uuid.uuid4())
+
+def start_new_project():
+    """Give the project a fresh key and drop everything generated for the previous one"""
+    st.session_state.project_key = str(uuid.uuid4())
+    st.session_state.recommendations = None
+    st.session_state.generated_prompt = None
+    st.session_state.approved_prompt = None
+    st.session_state.generated_project = None
+    st.session_state.saved_project_id = None
+    st.session_state.github_push = None
+    st.session_state.github_repo = None
 
 def collect_project_requirements():
     """Step 1: Collect project requirements"""
@@ -125,14 +153,19 @@ def collect_project_requirements():
                 st.error("Please fill in all required fields")
                 return False
             
-            st.session_state.project_data.update({
+            requirements = {
                 "name": project_name,
                 "project_type": project_type,
                 "description": project_description,
                 "scale": scale_requirements,
                 "deployment": deployment_preference,
                 "requirements": key_requirements
-            })
+            }
+            # Changed requirements mean a different project, with its own prompt history
+            previous = st.session_state.project_data
+            if previous and any(previous.get(field) != value for field, value in requirements.items()):
+                start_new_project()
+            st.session_state.project_data.update(requirements)
             
             return True
     
@@ -395,6 +428,9 @@ def review_generated_prompt():
             # Updated to pass project_data as a single argument
             initial_prompt = generate_initial_prompt(st.session_state.project_data)
             st.session_state.generated_prompt = initial_prompt
+            if st.session_state.get("user"):
+                record_prompt_generation(st.session_state.user.uid, st.session_state.project_key,
+                                         st.session_state.project_data, initial_prompt)
     
     st.write("Please review the generated prompt below:")
     
@@ -413,15 +449,53 @@ def review_generated_prompt():
     
     with col2:
         if st.button("Edit Prompt"):
+            if st.session_state.get("user") and prompt_text != st.session_state.generated_prompt:
+                record_prompt_generation(st.session_state.user.uid, st.session_state.project_key,
+                                         st.session_state.project_data, prompt_text, source="edited")
             st.session_state.generated_prompt = prompt_text
     
     with col3:
         if st.button("Approve Prompt"):
             st.session_state.approved_prompt = prompt_text
+            st.session_state.generated_project = None
+            st.session_state.saved_project_id = None
+            st.session_state.github_push = None
             return True
     
     return False
 
+def record_prompt_generation(user_id: str, project_key: str, project_data: Dict, prompt: str,
+                             source: str = "generated") -> int:
+    """
+    Store a prompt version and record the activity
+
+    Only the first version goes into chat history; regenerations and edits
+    are stored as deltas in the project's prompt versions. The user's
+    generation count and last generation time are updated with the version.
+    """
+    db = get_db()
+    version = db.save_prompt_version(user_id, project_key, prompt, source=source,
+                                     project_name=project_data['name'])
+    if version == 1:
+        writer = db.batch_writer()
+        db.save_chat_history(user_id, {
+            "user_message": f"Prompt generation for {project_data['name']}",
+            "llm_response": prompt,
+            "project_key": project_key
+        }, writer=writer)
+        writer.commit_async()
+    return version
+
+
+def record_token_usage(usage: Dict):
+    """Add the LLM calls made while handling this run to the user's aggregates"""
+    user = st.session_state.get('user')
+    if usage['llm_calls'] and user is not None:
+        db = get_db()
+        writer = db.batch_writer()
+        db.record_token_usage(user.uid, usage, writer=writer)
+        writer.commit_async()
+
 def generate_initial_prompt(project_data: Dict) -> str:
     """Generate initial prompt based on project requirements"""
     prompt_template = PromptTemplate(
@@ -458,10 +532,9 @@ def generate_initial_prompt(project_data: Dict) -> str:
                         "description", "requirements"]
     )
     
-    llm = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model="mixtral-8x7b-32768")
-    chain = LLMChain(prompt=prompt_template, llm=llm)
+    llm = get_llm("mixtral-8x7b-32768", stage="initial_prompt")
     
-    return chain.run({
+    return run_budgeted_chain(llm, prompt_template, {
         "project_name": project_data["name"],
         "project_type": project_data["project_type"],
         "frontend": project_data["frontend"],
@@ -469,18 +542,13 @@ def generate_initial_prompt(project_data: Dict) -> str:
         "backend": project_data["backend"],
         "database": project_data["database"],
         "authentication": project_data["authentication"],
-        "features": ", ".join(project_data.get("additional_features", [])),
+        "features": project_data.get("additional_features", []),
         "description": project_data["description"],
-        "requirements": ", ".join(project_data["requirements"])
-    })
+        "requirements": project_data["requirements"]
+    }, stage="initial_prompt")
 
-def generate_final_project():
-    """Generate the final project files using two-step LLM process and DynamicProjectGenerator"""
-    from langchain_groq import ChatGroq
-    from langchain.chains import LLMChain
-    from langchain.prompts import PromptTemplate
-    import os
-    
+def generate_implementation_details(project_data: Dict, approved_prompt: str) -> str:
+    """Generate implementation details for the approved prompt using LLM2"""
     # LLM2 Prompt Template (For implementation details)
     implementation_prompt = PromptTemplate(
         template="""
@@ -512,43 +580,73 @@ def generate_final_project():
     )
     
     # Initialize LLM for implementation generation
-    llm = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model="mixtral-8x7b-32768")
-    chain = LLMChain(prompt=implementation_prompt, llm=llm)
+    llm = get_llm("mixtral-8x7b-32768", stage="implementation")
     
-    # Generate implementation details using the approved prompt
-    implementation_details = chain.run({
-        "prompt": st.session_state.approved_prompt,
-        "frontend": st.session_state.project_data["frontend"],
-        "ui_library": st.session_state.project_data["ui_library"],
-        "backend": st.session_state.project_data["backend"],
-        "database": st.session_state.project_data["database"],
-        "authentication": st.session_state.project_data["authentication"],
-        "features": ", ".join(st.session_state.project_data.get("additional_features", []))
-    })
-    
-    # Create project configuration with all required fields
-    config = ProjectConfig(
-        name=st.session_state.project_data["name"],
-        project_type=st.session_state.project_data["project_type"],
-        description=st.session_state.project_data["description"],
-        frontend=st.session_state.project_data["frontend"],
-        ui_library=st.session_state.project_data.get("ui_library", "None"),
-        backend=st.session_state.project_data.get("backend", "None"),
-        database=st.session_state.project_data.get("database", "None"),
-        authentication=st.session_state.project_data.get("authentication", "None"),
-        features=st.session_state.project_data.get("additional_features", []),
-        requirements=st.session_state.project_data.get("requirements", []),
-        deployment_platform=st.session_state.project_data.get("deployment_platform", "None"),
-        static_site_generator=st.session_state.project_data.get("static_site_generator", "None"),
-        css_technologies=st.session_state.project_data.get("css_technologies", []),
-        js_technologies=st.session_state.project_data.get("js_technologies", []),
-        cache_service=st.session_state.project_data.get("cache_service", "None"),
-        cms=st.session_state.project_data.get("cms", "None")
+    return run_budgeted_chain(llm, implementation_prompt, {
+        "prompt": approved_prompt,
+        "frontend": project_data["frontend"],
+        "ui_library": project_data["ui_library"],
+        "backend": project_data["backend"],
+        "database": project_data["database"],
+        "authentication": project_data["authentication"],
+        "features": project_data.get("additional_features", [])
+    }, stage="implementation", summarise_fields=())
+
+def build_project_config(project_data: Dict) -> ProjectConfig:
+    """Create project configuration with all required fields"""
+    return ProjectConfig(
+        name=project_data["name"],
+        project_type=project_data["project_type"],
+        description=project_data["description"],
+        frontend=project_data["frontend"],
+        ui_library=project_data.get("ui_library", "None"),
+        backend=project_data.get("backend", "None"),
+        database=project_data.get("database", "None"),
+        authentication=project_data.get("authentication", "None"),
+        features=project_data.get("additional_features", []),
+        requirements=project_data.get("requirements", []),
+        deployment_platform=project_data.get("deployment_platform", "None"),
+        static_site_generator=project_data.get("static_site_generator", "None"),
+        css_technologies=project_data.get("css_technologies", []),
+        js_technologies=project_data.get("js_technologies", []),
+        cache_service=project_data.get("cache_service", "None"),
+        cms=project_data.get("cms", "None")
     )
-    
-    # Initialize and use the project generator
-    generator = ProjectGenerator()
-    result = generator.generate_project(config, implementation_details)
+
+def save_project_artifacts(user_id: str, project_key: str, project_data: Dict, result: Dict) -> str:
+    """Store the generated files content-addressed and record their manifest in projects"""
+    manifest = store_files(get_blob_store(), result['files'])
+    return get_db().save_project(user_id, {
+        "name": project_data['name'],
+        "project_type": project_data.get('project_type'),
+        "status": "generated",
+        "project_key": project_key,
+        "stack": {key: project_data.get(key) for key in ("frontend", "backend", "database", "deployment_platform")},
+        "files": manifest,
+        "file_count": len(manifest),
+        "artifact_bytes": sum(entry['size'] for entry in manifest),
+        "manifest_sha256": manifest_hash(manifest)
+    })
+
+def generate_final_project():
+    """Generate the final project files using two-step LLM process and DynamicProjectGenerator"""
+    # Reruns reuse the generated project instead of calling the LLM again
+    if st.session_state.generated_project is None:
+        # Generate implementation details using the approved prompt
+        implementation_details = generate_implementation_details(
+            st.session_state.project_data,
+            st.session_state.approved_prompt
+        )
+        config = build_project_config(st.session_state.project_data)
+        
+        # Initialize and use the project generator
+        generator = ProjectGenerator()
+        result = generator.generate_project(config, implementation_details)
+        st.session_state.generated_project = result
+        if result and st.session_state.get("user"):
+            st.session_state.saved_project_id = save_project_artifacts(
+                st.session_state.user.uid, st.session_state.project_key, st.session_state.project_data, result)
+    result = st.session_state.generated_project
     
     if result:
         with st.expander("Project Structure"):
@@ -563,6 +661,53 @@ def generate_final_project():
             "project.zip",
             mime="application/zip"
         )
+        push_to_github(result)
+
+def push_to_github(result: Dict):
+    """Push the generated project to the linked GitHub account as a single commit"""
+    st.subheader("Push to GitHub")
+    token = st.session_state.get("github_token")
+    if not token:
+        st.info("Link your GitHub account on the Home page to push this project.")
+        return
+
+    project_data = st.session_state.project_data
+    default_name = re.sub(r"[^A-Za-z0-9._-]+", "-", project_data.get('name', 'devspell-project')).strip("-")
+    repo_name = st.text_input("Repository name", value=default_name or "devspell-project")
+    private = st.checkbox("Private repository", value=True)
+    allow_existing = st.checkbox("Push into an existing repository (files outside the project are kept)",
+                                 value=False)
+    if st.button("Push to GitHub"):
+        with st.spinner(f"Pushing {len(result['files'])} files..."):
+            try:
+                pushed = push_project(token, repo_name, result['files'],
+                                      f"Generate {project_data.get('name', 'project')} with DevSpell",
+                                      private=private, description=project_data.get('description', '')[:300],
+                                      owned_repo=st.session_state.github_repo, allow_existing=allow_existing)
+            except GitHubError as e:
+                st.error(f"Push failed: {str(e)}")
+                return
+        st.session_state.github_push = pushed
+        if pushed['created']:
+            st.session_state.github_repo = pushed['repo']
+        if st.session_state.saved_project_id and st.session_state.get("user"):
+            try:
+                get_db().update_project(st.session_state.user.uid, st.session_state.saved_project_id, {
+                    "github_url": pushed['html_url'],
+                    "github_repo": pushed['repo'],
+                    "github_commit": pushed['commit_sha']
+                })
+            except FirestoreError as e:
+                # The push itself succeeded; only the link on the project is missing
+                st.warning(f"Pushed, but the GitHub link couldn't be saved to the project: {str(e)}")
+
+    pushed = st.session_state.github_push
+    if pushed and not pushed['changed']:
+        st.info(f"[{pushed['repo']}]({pushed['html_url']}) is already up to date")
+    elif pushed:
+        st.success(f"Pushed {pushed['files']} files to [{pushed['repo']}]({pushed['html_url']}) "
+                   f"in commit {pushed['commit_sha'][:7]} ({pushed['uploaded']} changed)")
+
 def new_project_page():
     """Main function to handle the new project page"""
     st.title("🪄 Intelligent Project Generator")
@@ -571,39 +716,44 @@ def new_project_page():
     
     progress = st.progress(0)
     
-    if st.session_state.step == 1:
-        progress.progress(25)
-        if collect_project_requirements():
-            st.session_state.step = 2
-            st.rerun()
+    # st.rerun() raises, so usage is recorded on the way out whatever the step does
+    with track_token_usage() as usage:
+        try:
+            if st.session_state.step == 1:
+                progress.progress(25)
+                if collect_project_requirements():
+                    st.session_state.step = 2
+                    st.rerun()
     
-    elif st.session_state.step == 2:
-        progress.progress(50)
-        if select_technology_stack():
-            st.session_state.step = 3
-            st.rerun()
+            elif st.session_state.step == 2:
+                progress.progress(50)
+                if select_technology_stack():
+                    st.session_state.step = 3
+                    st.rerun()
         
-        if st.button("Back to Requirements"):
-            st.session_state.step = 1
-            st.rerun()
+                if st.button("Back to Requirements"):
+                    st.session_state.step = 1
+                    st.rerun()
     
-    elif st.session_state.step == 3:
-        progress.progress(75)
-        if review_generated_prompt():
-            st.session_state.step = 4
-            st.rerun()
+            elif st.session_state.step == 3:
+                progress.progress(75)
+                if review_generated_prompt():
+                    st.session_state.step = 4
+                    st.rerun()
         
-        if st.button("Back to Tech Stack"):
-            st.session_state.step = 2
-            st.rerun()
+                if st.button("Back to Tech Stack"):
+                    st.session_state.step = 2
+                    st.rerun()
     
-    elif st.session_state.step == 4:
-        progress.progress(100)
-        generate_final_project()
+            elif st.session_state.step == 4:
+                progress.progress(100)
+                generate_final_project()
         
-        if st.button("Back to Prompt Review"):
-            st.session_state.step = 3
-            st.rerun()
+                if st.button("Back to Prompt Review"):
+                    st.session_state.step = 3
+                    st.rerun()
+        finally:
+            record_token_usage(usage)
 
 if __name__ == "__main__":
     new_project_page()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import streamlit as st
+import pandas as pd
+from utils.helpers import is_admin
+from utils.firestore_db import get_db
+from utils.batch_writer import pending_commits, failed_commits
+from utils.performance_metrics import (load_span_frame, latency_percentiles, llm_latency, cache_hit_rates,
+                                       firestore_ops_per_render, generation_sizes, queue_depths,
+                                       rolling_latency)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_spans():
+    return load_span_frame()
+
+def performance_page():
+    st.title("Performance")
+
+    if not st.session_state.get("user") or not is_admin(st.session_state.user):
+        st.error("This page is only available to administrators")
+        return
+
+    spans = load_spans()
+    if spans.empty:
+        st.info("No timings recorded yet.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        lookback = st.selectbox("Time range", ["1h", "6h", "24h", "7d", "All"], index=2)
+    with col2:
+        window = st.selectbox("Rolling window", ["1min", "5min", "15min", "1h"], index=1)
+
+    if lookback != "All":
+        spans = spans[spans.index >= spans.index.max() - pd.Timedelta(lookback)]
+
+    st.caption(f"{len(spans):,} spans between {spans.index.min():%Y-%m-%d %H:%M} "
+               f"and {spans.index.max():%Y-%m-%d %H:%M}")
+
+    st.subheader("LLM Latency by Model and Stage")
+    st.dataframe(llm_latency(spans), use_container_width=True)
+
+    st.subheader("Latency by Operation")
+    st.dataframe(latency_percentiles(spans, "name"), use_container_width=True)
+    st.line_chart(rolling_latency(spans, window))
+
+    st.subheader("Cache Hit Rates")
+    cache = get_db().cache_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Cached Reads", cache["entries"])
+    col2.metric("Hit Rate", f"{cache['hit_rate']:.0%}")
+    col3.metric("Evictions", cache["evictions"])
+    st.dataframe(cache_hit_rates(spans), use_container_width=True)
+
+    st.subheader("Firestore Operations per Page Render")
+    st.dataframe(firestore_ops_per_render(spans), use_container_width=True)
+
+    st.subheader("Generation Sizes")
+    st.dataframe(generation_sizes(spans), use_container_width=True)
+
+    depths = queue_depths(spans, window)
+    if not depths.empty:
+        st.subheader("Queue Depths")
+        st.line_chart(depths)
+
+    st.subheader("Background Writes")
+    col1, col2 = st.columns(2)
+    col1.metric("Pending Commits", pending_commits())
+    col2.metric("Failed Commits", failed_commits())
+
+if __name__ == "__main__":
+    performance_page()
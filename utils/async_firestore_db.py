@@ -0,0 +1,502 @@
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+from firebase_admin import firestore_async
+from google.cloud import firestore
+from .error_handler import FirestoreError
+from .tracing import span, payload_size
+from .search_index import index_chat
+from .text_storage import unpack_text_async
+from .storage import StorageBackend, stats_update
+from .firestore_db import (CHAT_SUMMARY_FIELDS, ORDER_FIELDS, PROJECT_SUMMARY_FIELDS, get_db, FirestoreDB,
+                           FirestoreQueries)
+
+logger = logging.getLogger(__name__)
+
+_adapter_instance = None
+_adapter_lock = threading.Lock()
+
+# Every storage method, so AsyncFirestoreDB can't offer less than the backend interface
+_BACKEND_METHODS = frozenset(StorageBackend.__abstractmethods__) | {'search_chats'}
+
+
+class AsyncFirestoreDB(FirestoreQueries):
+    """FirestoreDB on the async Firestore client.
+
+    Every StorageBackend method is a coroutine with the same arguments and
+    results as its FirestoreDB counterpart, so independent reads and writes
+    can be awaited together with asyncio.gather. Queries and documents are
+    built by the shared FirestoreQueries helpers. Methods without an async
+    implementation here (prompt versions, search) run the synchronous
+    FirestoreDB method on a worker thread, and writes given a writer from
+    batch_writer() are queued on it like FirestoreDB does.
+    """
+
+    def __init__(self, db_client=None, cache=None, sync_db=None):
+        self.db = db_client or firestore_async.client()
+        self.sync = sync_db or FirestoreDB()
+        # Sharing FirestoreDB's cache lets writes made through either handle invalidate both
+        self.cache = cache or self.sync.cache
+
+    def __getattr__(self, name):
+        if name not in _BACKEND_METHODS:
+            raise AttributeError(name)
+        method = getattr(self.sync, name)
+
+        @functools.wraps(method)
+        async def threaded(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return threaded
+
+    def batch_writer(self):
+        """Return a BatchWriter for the writer= arguments; commit it with commit() or commit_async()"""
+        return self.sync.batch_writer()
+
+    async def _cached_read(self, trace, user_id, key, loader):
+        """Serve a per-user read from the cache, awaiting loader and caching its result on a miss"""
+        generation = self.cache.generation(user_id)
+        hit, value = self.cache.get(user_id, key)
+        if hit:
+            trace.set(cache="hit")
+            return value
+        value = await loader()
+        self.cache.put(user_id, key, value, generation)
+        trace.set(cache="miss", op="read")
+        return value
+
+    def cache_stats(self):
+        """Size and hit rate of the read-through cache"""
+        return self.cache.stats()
+
+    async def save_chat_history(self, user_id, chat_data, writer=None):
+        """
+        Save chat history for a user, or queue it on writer when given
+
+        Raises:
+            FirestoreError: If there's an error saving to Firestore
+            ValueError: If the input parameters are invalid
+        """
+        if writer is not None:
+            # Queuing does no I/O, so it needs no thread
+            return self.sync.save_chat_history(user_id, chat_data, writer)
+        doc_ref, chat_doc, chunks = self._build_chat(user_id, chat_data)
+        try:
+            with span("firestore.save_chat_history", op="write", collection="chat_history",
+                      request_bytes=payload_size(chat_doc) + sum(map(len, chunks)), chunks=len(chunks)):
+                batch = self.db.batch()
+                self._queue_chat(batch, user_id, doc_ref, chat_doc, chunks)
+                await batch.commit()
+            self.cache.invalidate_user(user_id)
+            await asyncio.to_thread(index_chat, user_id, doc_ref.id, chat_data, chat_doc['metadata']['created_at'])
+            return doc_ref.id
+        except Exception as e:
+            raise FirestoreError(f"Failed to save chat history: {str(e)}")
+
+    async def save_project(self, user_id, project_data, writer=None):
+        """
+        Save generated project data, or queue it on writer when given
+
+        Raises:
+            FirestoreError: If there's an error saving to Firestore
+            ValueError: If the input parameters are invalid
+        """
+        if writer is not None:
+            return self.sync.save_project(user_id, project_data, writer)
+        doc_ref, project_doc = self._build_project(user_id, project_data)
+        try:
+            with span("firestore.save_project", op="write", collection="projects",
+                      request_bytes=payload_size(project_doc)):
+                batch = self.db.batch()
+                self._queue_project(batch, user_id, doc_ref, project_doc)
+                await batch.commit()
+            self.cache.invalidate_user(user_id)
+            return project_doc['project_id']
+        except Exception as e:
+            raise FirestoreError(f"Failed to save project: {str(e)}")
+
+    async def update_project(self, user_id, project_id, update_data, writer=None):
+        """
+        Update fields of an existing project, or queue the update on writer when given
+
+        Raises:
+            FirestoreError: If there's an error updating Firestore
+        """
+        if writer is not None:
+            return self.sync.update_project(user_id, project_id, update_data, writer)
+        try:
+            with span("firestore.update_project", op="write", collection="projects",
+                      request_bytes=payload_size(update_data)):
+                await self.db.collection('projects').document(project_id).update(
+                    {**update_data, 'updated_at': firestore.SERVER_TIMESTAMP})
+            self.cache.invalidate_user(user_id)
+            return True
+        except Exception as e:
+            raise FirestoreError(f"Failed to update project: {str(e)}")
+
+    async def get_user_projects(self, user_id, limit=None):
+        """
+        Retrieve user's projects
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_user_projects", collection="projects") as trace:
+                async def load():
+                    query = self._build_user_query('projects', user_id, 'created_at', limit)
+                    return [project.to_dict() async for project in query.stream()]
+
+                projects = await self._cached_read(trace, user_id, ('get_user_projects', limit), load)
+                trace.set(documents=len(projects), response_bytes=payload_size(projects))
+            return projects
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve user projects: {str(e)}")
+
+    async def retrieve_chat_history(self, user_id):
+        """Retrieve chat history for a user"""
+        with span("firestore.retrieve_chat_history", op="read", collection="chat_history") as trace:
+            query = self._build_user_query('chat_history', user_id, 'timestamp')
+            chats = [chat async for chat in query.stream()]
+            history = await asyncio.gather(*(
+                unpack_text_async(chat.reference, chat.to_dict(), 'llm_response') for chat in chats
+            ))
+            trace.set(documents=len(history), response_bytes=payload_size(history))
+        return list(history)
+
+    async def _paged_query(self, collection, user_id, order_field, page_size, start_after=None, fields=None,
+                           text_field=None):
+        """Run a per-user, newest-first query and return (documents, next cursor)"""
+        query = self._build_page_query(collection, user_id, order_field, page_size, start_after, fields)
+        docs = [doc async for doc in query.stream()]
+
+        async def load(doc):
+            result = doc.to_dict()
+            if text_field:
+                await unpack_text_async(doc.reference, result, text_field)
+            result['id'] = doc.id
+            return result
+
+        results = list(await asyncio.gather(*(load(doc) for doc in docs[:page_size])))
+        return results, self._page_cursor(results, len(docs), page_size, order_field)
+
+    async def iter_user_documents(self, user_id, collection, page_size=200):
+        """Yield every document a user owns in collection, newest first, one uncached page at a time"""
+        text_field = 'llm_response' if collection == 'chat_history' else None
+        cursor = None
+        while True:
+            with span("firestore.iter_user_documents", op="read", collection=collection) as trace:
+                docs, cursor = await self._paged_query(collection, user_id, ORDER_FIELDS[collection], page_size,
+                                                       cursor, text_field=text_field)
+                trace.set(documents=len(docs), response_bytes=payload_size(docs))
+            for doc in docs:
+                yield doc
+            if cursor is None:
+                return
+
+    async def retrieve_chat_history_page(self, user_id, page_size=20, start_after=None):
+        """
+        Retrieve one page of a user's chat history, newest first
+
+        Returns:
+            tuple: (list of chat dicts, cursor for the next page or None when exhausted)
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.retrieve_chat_history_page", collection="chat_history") as trace:
+                chats, next_cursor = await self._cached_read(
+                    trace, user_id, ('retrieve_chat_history_page', page_size, start_after),
+                    lambda: self._paged_query('chat_history', user_id, 'timestamp', page_size, start_after,
+                                              text_field='llm_response'))
+                trace.set(documents=len(chats), response_bytes=payload_size(chats))
+            return chats, next_cursor
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve chat history: {str(e)}")
+
+    async def list_chat_summaries(self, user_id, page_size=20, start_after=None):
+        """
+        Retrieve one page of chat summaries without response bodies
+
+        Returns:
+            tuple: (list of summary dicts, cursor for the next page or None when exhausted)
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.list_chat_summaries", collection="chat_history") as trace:
+                chats, next_cursor = await self._cached_read(
+                    trace, user_id, ('list_chat_summaries', page_size, start_after),
+                    lambda: self._paged_query('chat_history', user_id, 'timestamp', page_size,
+                                              start_after, fields=CHAT_SUMMARY_FIELDS))
+                trace.set(documents=len(chats), response_bytes=payload_size(chats))
+            return chats, next_cursor
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve chat summaries: {str(e)}")
+
+    async def get_chat(self, chat_doc_id):
+        """
+        Retrieve a full chat history document, including the LLM response
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_chat", op="read", collection="chat_history") as trace:
+                doc = await self.db.collection('chat_history').document(chat_doc_id).get()
+                chat = doc.to_dict() if doc.exists else None
+                trace.set(documents=int(doc.exists), response_bytes=payload_size(chat))
+                if chat is not None:
+                    await unpack_text_async(doc.reference, chat, 'llm_response')
+                    chat['id'] = doc.id
+            return chat
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve chat: {str(e)}")
+
+    async def list_project_summaries(self, user_id, limit=5):
+        """
+        Retrieve the user's most recent projects with only the fields shown in project lists
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.list_project_summaries", collection="projects") as trace:
+                projects, _ = await self._cached_read(
+                    trace, user_id, ('list_project_summaries', limit),
+                    lambda: self._paged_query('projects', user_id, 'created_at', limit,
+                                              fields=PROJECT_SUMMARY_FIELDS))
+                trace.set(documents=len(projects), response_bytes=payload_size(projects))
+            return projects
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve project summaries: {str(e)}")
+
+    async def get_project(self, project_id):
+        """
+        Retrieve a full project document
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_project", op="read", collection="projects") as trace:
+                doc = await self.db.collection('projects').document(project_id).get()
+                project = doc.to_dict() if doc.exists else None
+                trace.set(documents=int(doc.exists), response_bytes=payload_size(project))
+            return project
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve project: {str(e)}")
+
+    async def record_token_usage(self, user_id, token_usage, writer=None):
+        """Add LLM call and token counts to the user's aggregates, or queue them on writer when given"""
+        if writer is not None:
+            return self.sync.record_token_usage(user_id, token_usage, writer)
+        with span("firestore.record_token_usage", op="write", collection="user_stats"):
+            await self._stats_ref(user_id).set(stats_update(token_usage=token_usage), merge=True)
+        self.cache.invalidate_user(user_id)
+
+    async def get_user_stats(self, user_id):
+        """
+        Retrieve a user's aggregate counters from a single document
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_user_stats", collection="user_stats") as trace:
+                async def load():
+                    doc = await self._stats_ref(user_id).get()
+                    return doc.to_dict() if doc.exists else None
+
+                stats = await self._cached_read(trace, user_id, ('get_user_stats',), load)
+                trace.set(documents=int(stats is not None))
+            return stats
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve user stats: {str(e)}")
+
+    async def get_user_profile(self, user_id):
+        """
+        Retrieve a user's profile document
+
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_user_profile", collection="user_profiles") as trace:
+                async def load():
+                    doc = await self.db.collection('user_profiles').document(user_id).get()
+                    return doc.to_dict() if doc.exists else None
+
+                profile = await self._cached_read(trace, user_id, ('get_user_profile',), load)
+                trace.set(documents=int(profile is not None), response_bytes=payload_size(profile))
+            return profile
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve user profile: {str(e)}")
+
+    async def save_user_profile(self, user_id, user_data):
+        """
+        Create a user profile together with its email index entry
+
+        Raises:
+            FirestoreError: If the email is already registered to another user
+                or there's an error saving to Firestore
+            ValueError: If the input parameters are invalid
+        """
+        if not user_id or not isinstance(user_data, dict) or not user_data.get('email'):
+            raise ValueError("Invalid user_id or user_data")
+
+        profile_ref = self.db.collection('user_profiles').document(user_id)
+        index_ref = self._email_ref(user_data['email'])
+
+        @firestore.async_transactional
+        async def create_profile(transaction):
+            index_doc = await index_ref.get(transaction=transaction)
+            if index_doc.exists and index_doc.to_dict().get('uid') != user_id:
+                raise FirestoreError("Email already exists")
+            transaction.set(index_ref, {'uid': user_id, 'email': user_data['email']})
+            transaction.set(profile_ref, user_data)
+
+        try:
+            with span("firestore.save_user_profile", op="write", collection="user_profiles",
+                      request_bytes=payload_size(user_data)):
+                await create_profile(self.db.transaction())
+            self.cache.invalidate_user(user_id)
+            return user_id
+        except FirestoreError:
+            raise
+        except Exception as e:
+            raise FirestoreError(f"Failed to save user profile: {str(e)}")
+
+    async def get_user_by_email(self, email):
+        """Get user profile by email through the user_emails index"""
+        with span("firestore.get_user_by_email", op="read", collection="user_emails") as trace:
+            index_doc = await self._email_ref(email).get()
+            user_record = None
+            if index_doc.exists:
+                uid = index_doc.to_dict()['uid']
+                profile = await self.db.collection('user_profiles').document(uid).get()
+                user_record = profile.to_dict() if profile.exists else {'email': email}
+                user_record['uid'] = uid
+            trace.set(documents=int(index_doc.exists) * 2, response_bytes=payload_size(user_record))
+        return user_record
+
+    async def update_user(self, user_id, update_data, writer=None):
+        """
+        Update user profile information, or queue a merge on writer when given
+
+        Email changes run in a transaction that also moves the email index entry.
+        """
+        if writer is not None and 'email' not in update_data:
+            return self.sync.update_user(user_id, update_data, writer)
+        profile_ref = self.db.collection('user_profiles').document(user_id)
+        profile_update = {
+            **update_data,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        }
+
+        @firestore.async_transactional
+        async def move_email(transaction):
+            new_index_ref = self._email_ref(update_data['email'])
+            profile = await profile_ref.get(transaction=transaction)
+            new_index = await new_index_ref.get(transaction=transaction)
+            if new_index.exists and new_index.to_dict().get('uid') != user_id:
+                raise FirestoreError("Email already exists")
+            old_email = (profile.to_dict() or {}).get('email') if profile.exists else None
+            if old_email and self._email_ref(old_email).id != new_index_ref.id:
+                transaction.delete(self._email_ref(old_email))
+            transaction.set(new_index_ref, {'uid': user_id, 'email': update_data['email']})
+            transaction.update(profile_ref, profile_update)
+
+        try:
+            with span("firestore.update_user", op="write", collection="user_profiles",
+                      request_bytes=payload_size(update_data)):
+                if 'email' in update_data:
+                    await move_email(self.db.transaction())
+                else:
+                    await profile_ref.update(profile_update)
+            self.cache.invalidate_user(user_id)
+            return True
+        except FirestoreError:
+            raise
+        except Exception as e:
+            raise FirestoreError(f"Failed to update user: {str(e)}")
+
+
+class ThreadedAsyncDB:
+    """Coroutine facade over a synchronous storage backend such as SQLiteDB.
+
+    Each call runs on a worker thread, so gathered calls still overlap.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        attribute = getattr(self.db, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def threaded(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+        return threaded
+
+
+class SyncFirestoreAdapter:
+    """Blocking facade over AsyncFirestoreDB for the synchronous Streamlit pages.
+
+    Coroutines run on a private event loop thread. Each async method is exposed
+    as a plain method, and gather() runs several calls concurrently so a page
+    waits for its slowest read instead of the sum of them:
+
+        profile, projects = db.gather(db.call.get_user_profile(uid),
+                                      db.call.list_project_summaries(uid))
+    """
+
+    def __init__(self, async_db=None):
+        self.call = async_db or AsyncFirestoreDB()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="firestore-async-loop",
+                                        daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine):
+        """Run a coroutine on the adapter's loop and return its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def gather(self, *coroutines):
+        """Run coroutines concurrently and return their results in order"""
+        async def run_all():
+            return await asyncio.gather(*coroutines)
+        return self.run(run_all())
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.call, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def blocking(*args, **kwargs):
+            return self.run(attribute(*args, **kwargs))
+        return blocking
+
+
+def get_async_db():
+    """Return the process-wide SyncFirestoreAdapter, creating it on first use"""
+    global _adapter_instance
+    if _adapter_instance is None:
+        with _adapter_lock:
+            if _adapter_instance is None:
+                db = get_db()
+                if isinstance(db, FirestoreDB):
+                    _adapter_instance = SyncFirestoreAdapter(AsyncFirestoreDB(sync_db=db))
+                else:
+                    _adapter_instance = SyncFirestoreAdapter(ThreadedAsyncDB(db))
+    return _adapter_instance
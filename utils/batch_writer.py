@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import FIREBASE_CONFIG
+from .error_handler import FirestoreError
+from .tracing import span, payload_size
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+
+_executor = ThreadPoolExecutor(max_workers=FIREBASE_CONFIG['write_workers'],
+                               thread_name_prefix="firestore-writer")
+_pending_lock = threading.Lock()
+_pending_commits = 0
+_failed_commits = 0
+
+
+def pending_commits():
+    """Number of background commits queued or in flight"""
+    return _pending_commits
+
+
+def failed_commits():
+    """Number of background commits that failed after all retries"""
+    return _failed_commits
+
+
+def _finish_background_commit(future):
+    """Done-callback of commit_async: count the commit as settled and log a failure"""
+    global _pending_commits, _failed_commits
+    error = None if future.cancelled() else future.exception()
+    with _pending_lock:
+        _pending_commits -= 1
+        if error is not None:
+            _failed_commits += 1
+    if error is not None:
+        logger.error(f"Background Firestore commit failed: {str(error)}", exc_info=error)
+
+
+class BatchWriter:
+    """Collects Firestore writes and commits them as WriteBatches.
+
+    Pipeline runs queue their writes and call commit_async() so the page is
+    not blocked; backfills and migrations call commit() directly. Each batch
+    is retried with exponential backoff.
+    """
+
+    def __init__(self, client, max_retries=None, backoff_seconds=0.5):
+        self.client = client
+        self.max_retries = FIREBASE_CONFIG['write_retries'] if max_retries is None else max_retries
+        self.backoff_seconds = backoff_seconds
+        self._operations = []
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._operations)
+
+    def set(self, doc_ref, data, merge=False):
+        with self._lock:
+            self._operations.append(("set", doc_ref, data, merge))
+
+    def update(self, doc_ref, data):
+        with self._lock:
+            self._operations.append(("update", doc_ref, data, False))
+
+    def delete(self, doc_ref):
+        with self._lock:
+            self._operations.append(("delete", doc_ref, None, False))
+
+    def on_commit(self, callback):
+        """Run callback after every queued write has been committed"""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def commit(self, progress=None):
+        """
+        Commit queued writes in batches of up to MAX_BATCH_SIZE
+
+        Args:
+            progress (callable): Optional progress(committed, total) callback
+
+        Returns:
+            int: Number of writes committed
+
+        Raises:
+            FirestoreError: If a batch still fails after all retries
+        """
+        with self._lock:
+            operations, self._operations = self._operations, []
+            callbacks, self._callbacks = self._callbacks, []
+
+        committed = 0
+        for start in range(0, len(operations), MAX_BATCH_SIZE):
+            chunk = operations[start:start + MAX_BATCH_SIZE]
+            self._commit_chunk(chunk)
+            committed += len(chunk)
+            if progress:
+                progress(committed, len(operations))
+
+        for callback in callbacks:
+            callback()
+        return committed
+
+    def commit_async(self):
+        """
+        Commit queued writes on a background thread and return the Future
+
+        Callers may drop the Future: a done-callback logs any failure and
+        counts it in failed_commits().
+        """
+        global _pending_commits
+        with _pending_lock:
+            _pending_commits += 1
+        future = _executor.submit(self.commit)
+        future.add_done_callback(_finish_background_commit)
+        return future
+
+    def _commit_chunk(self, chunk):
+        with span("firestore.batch_commit", op="write", writes=len(chunk), queue_depth=_pending_commits,
+                  request_bytes=sum(payload_size(data) for _, _, data, _ in chunk)) as trace:
+            for attempt in range(self.max_retries + 1):
+                batch = self.client.batch()
+                for kind, doc_ref, data, merge in chunk:
+                    if kind == "set":
+                        batch.set(doc_ref, data, merge=merge)
+                    elif kind == "update":
+                        batch.update(doc_ref, data)
+                    else:
+                        batch.delete(doc_ref)
+                try:
+                    batch.commit()
+                    trace.set(attempts=attempt + 1)
+                    return
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise FirestoreError(f"Failed to commit {len(chunk)} writes: {str(e)}")
+                    delay = self.backoff_seconds * (2 ** attempt)
+                    logger.warning(f"Batch commit failed ({str(e)}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
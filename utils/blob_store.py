@@ -0,0 +1,152 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from config import BLOB_CONFIG
+from .error_handler import DevSpellError
+from .tracing import span
+
+_store_instance = None
+_store_lock = threading.Lock()
+
+# Fixed entry timestamp so the same files always produce the same archive bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class LocalBlobStore:
+    """Content-addressed blobs on the local filesystem, sharded by hash prefix"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def put(self, data):
+        """Store data under its SHA-256 and return the hash; existing blobs are not rewritten"""
+        digest = content_hash(data)
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial blob
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        return digest
+
+    def get(self, digest):
+        try:
+            with open(self._path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise DevSpellError(f"Blob {digest} is missing from the artifact store")
+
+
+# head_object reports a missing key as a bare 404; get_object uses NoSuchKey
+S3_MISSING_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+class S3BlobStore:
+    """Content-addressed blobs in an S3-compatible bucket (AWS, MinIO, GCS interop, R2)"""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None):
+        try:
+            import boto3
+        except ImportError:
+            raise ImportError("BLOB_BACKEND=s3 needs boto3: pip install boto3") from None
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None)
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, digest):
+        return f"{self.prefix}{digest[:2]}/{digest}"
+
+    def exists(self, digest):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(digest))
+            return True
+        except ClientError as e:
+            # Permission, throttling and credential errors must not look like a missing blob
+            if e.response.get('Error', {}).get('Code') in S3_MISSING_CODES:
+                return False
+            raise
+
+    def put(self, data):
+        digest = content_hash(data)
+        if not self.exists(digest):
+            self.client.put_object(Bucket=self.bucket, Key=self._key(digest), Body=data)
+        return digest
+
+    def get(self, digest):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(digest))['Body'].read()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in S3_MISSING_CODES:
+                raise DevSpellError(f"Blob {digest} is missing from the artifact store")
+            raise
+
+
+def get_blob_store():
+    """Return the process-wide blob store selected by BLOB_CONFIG"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                if BLOB_CONFIG['backend'] == 's3':
+                    _store_instance = S3BlobStore(BLOB_CONFIG['s3_bucket'], BLOB_CONFIG['s3_prefix'],
+                                                  BLOB_CONFIG['s3_endpoint_url'])
+                else:
+                    _store_instance = LocalBlobStore(BLOB_CONFIG['local_path'])
+    return _store_instance
+
+
+def store_files(store, files):
+    """
+    Store generated files as blobs
+
+    Args:
+        store: Blob store
+        files (list): Dicts with 'path' and 'content' as returned by ProjectGenerator
+
+    Returns:
+        list: Manifest entries with 'path', 'sha256' and 'size', sorted by path
+    """
+    with span("artifacts.store", files=len(files)) as trace:
+        manifest = []
+        for file_info in files:
+            data = file_info['content'].encode('utf-8')
+            manifest.append({'path': file_info['path'], 'sha256': store.put(data), 'size': len(data)})
+        manifest.sort(key=lambda entry: entry['path'])
+        trace.set(request_bytes=sum(entry['size'] for entry in manifest))
+    return manifest
+
+
+def manifest_hash(manifest):
+    """Hash identifying a set of files, independent of where they came from"""
+    return content_hash(''.join(f"{entry['path']}\0{entry['sha256']}\n" for entry in manifest).encode('utf-8'))
+
+
+def build_archive(store, manifest):
+    """Rebuild a project's ZIP from its manifest; identical manifests give identical bytes"""
+    with span("artifacts.build_archive", files=len(manifest)) as trace:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for entry in manifest:
+                zipf.writestr(zipfile.ZipInfo(entry['path'], ZIP_DATE_TIME), store.get(entry['sha256']),
+                              compress_type=zipfile.ZIP_DEFLATED)
+        archive = buffer.getvalue()
+        trace.set(response_bytes=len(archive))
+    return archive
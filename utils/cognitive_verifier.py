@@ -1,14 +1,10 @@
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain_groq import ChatGroq
-import os
+from .llm_provider import get_llm
+from .token_budget import run_budgeted_chain
 
 class CognitiveVerifier:
     def __init__(self):
-        self.llm = ChatGroq(
-            api_key=os.getenv("GROQ_API_KEY"),
-            model="gemma-7b-it"
-        )
+        self.llm = get_llm("gemma-7b-it", stage="cognitive_verifier")
         
         self.stack_recommendation_template = PromptTemplate(
             template="""
@@ -50,24 +46,22 @@ class CognitiveVerifier:
         )
     
     def get_stack_recommendation(self, project_type, description, requirements, scale):
-        chain = LLMChain(prompt=self.stack_recommendation_template, llm=self.llm)
-        result = chain.run({
+        result = run_budgeted_chain(self.llm, self.stack_recommendation_template, {
             "project_type": project_type,
             "description": description,
             "requirements": requirements,
             "scale": scale
-        })
+        }, stage="stack_recommendation")
         return self._parse_recommendations(result)
     
     def verify_compatibility(self, frontend, ui_library, backend, database, auth_method):
-        chain = LLMChain(prompt=self.compatibility_check_template, llm=self.llm)
-        result = chain.run({
+        result = run_budgeted_chain(self.llm, self.compatibility_check_template, {
             "frontend": frontend,
             "ui_library": ui_library,
             "backend": backend,
             "database": database,
             "auth_method": auth_method
-        })
+        }, stage="compatibility_check", summarise_fields=())
         return self._parse_compatibility(result)
     
     def _parse_recommendations(self, result):
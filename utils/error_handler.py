@@ -24,6 +24,10 @@ class LLMError(DevSpellError):
     """Exception class for LLM-related errors"""
     pass
 
+class GitHubError(DevSpellError):
+    """Exception class for GitHub API errors"""
+    pass
+
 def handle_errors(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
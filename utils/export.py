@@ -0,0 +1,159 @@
+"""Streaming export of a user's chat history and projects.
+
+Documents are read one page at a time and written as they arrive, so memory
+stays flat however large the account is.
+
+Usage:
+    python -m utils.export <user_id> [--format ndjson|parquet] [--output PATH]
+"""
+import argparse
+import base64
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+import firebase_admin
+from firebase_admin import credentials
+from config import FIREBASE_CONFIG, STORAGE_CONFIG
+from .firestore_db import get_db
+from .tracing import span
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPORT_COLLECTIONS = ('chat_history', 'projects')
+PARQUET_ROW_GROUP_SIZE = 500
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return str(value)
+
+
+def iter_export_records(db, user_id, page_size=200):
+    """Yield (record type, document) for every chat and project of a user"""
+    for collection in EXPORT_COLLECTIONS:
+        yield from ((collection, doc) for doc in db.iter_user_documents(user_id, collection, page_size))
+
+
+def write_ndjson(records, output):
+    """Write one JSON object per line to a text file object and return the record count"""
+    count = 0
+    for record_type, doc in records:
+        output.write(json.dumps({'type': record_type, **doc}, default=_json_default))
+        output.write('\n')
+        count += 1
+    return count
+
+
+def _parquet_row(record_type, doc):
+    """Flatten a document into the export's fixed Parquet columns"""
+    doc = dict(doc)
+    timestamp = doc.pop('timestamp', None) if record_type == 'chat_history' else doc.pop('created_at', None)
+    if isinstance(timestamp, datetime) and timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return {
+        'type': record_type,
+        'id': doc.pop('id', None),
+        'timestamp': timestamp if isinstance(timestamp, datetime) else None,
+        'title': doc.pop('user_message', None) if record_type == 'chat_history' else doc.pop('name', None),
+        'body': doc.pop('llm_response', None),
+        'data': json.dumps(doc, default=_json_default)
+    }
+
+
+def write_parquet(records, output, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """
+    Write records to Parquet one row group at a time and return the record count
+
+    Every record shares one schema (type, id, timestamp, title, body, data),
+    with the remaining fields of each document kept as JSON in data.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from None
+
+    schema = pa.schema([
+        ('type', pa.string()),
+        ('id', pa.string()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('title', pa.string()),
+        ('body', pa.string()),
+        ('data', pa.string())
+    ])
+    count = 0
+    rows = []
+    with pq.ParquetWriter(output, schema, compression='zstd') as writer:
+        for record_type, doc in records:
+            rows.append(_parquet_row(record_type, doc))
+            if len(rows) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                count += len(rows)
+                rows = []
+        if rows:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            count += len(rows)
+    return count
+
+
+def export_user_data(db, user_id, output, export_format='ndjson'):
+    """
+    Stream a user's chats and projects to output
+
+    Args:
+        db: Storage backend
+        user_id (str): The user's unique identifier
+        output: Text file object for NDJSON; path or binary file object for Parquet
+        export_format (str): 'ndjson' or 'parquet'
+
+    Returns:
+        int: Number of records written
+    """
+    with span("export.user_data", format=export_format) as trace:
+        records = iter_export_records(db, user_id)
+        if export_format == 'parquet':
+            count = write_parquet(records, output)
+        else:
+            count = write_ndjson(records, output)
+        trace.set(documents=count)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's chat history and projects")
+    parser.add_argument("user_id")
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    parser.add_argument("--output", default="-", help="Output file, '-' for stdout (NDJSON only)")
+    args = parser.parse_args()
+
+    if STORAGE_CONFIG['backend'] == 'firestore' and not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(FIREBASE_CONFIG['config_path']), {
+            'projectId': FIREBASE_CONFIG['project_id'],
+        })
+
+    db = get_db()
+    if args.format == 'parquet':
+        if args.output == '-':
+            parser.error("Parquet export needs --output")
+        try:
+            count = export_user_data(db, args.user_id, args.output, 'parquet')
+        except ImportError as e:
+            parser.error(str(e))
+    elif args.output == '-':
+        count = export_user_data(db, args.user_id, sys.stdout)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            count = export_user_data(db, args.user_id, f)
+    logger.info(f"Exported {count} records")
+
+
+if __name__ == "__main__":
+    main()
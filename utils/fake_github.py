@@ -0,0 +1,462 @@
+"""Local stand-in for the parts of GitHub that DevSpell talks to.
+
+Implements the OAuth authorize and token exchange used by the Callback page,
+and the user, repository, blob, tree, commit and ref endpoints a push needs.
+Latency, rate-limit headers and failures are configurable and drawn from a
+seeded generator, so push throughput and retry behaviour can be tested and
+benchmarked offline.
+
+Repositories live in memory. Trees are stored flat (path to blob SHA) and
+always listed recursively; SHAs are real git SHAs for blobs and stable
+content hashes for trees and commits.
+
+Usage:
+    python -m utils.fake_github [--port 8765] [--latency-ms 50] [--error-rate 0.01]
+
+then run the app with GITHUB_OAUTH_URL and GITHUB_API_URL set to
+http://127.0.0.1:8765.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlencode, urlsplit
+from config import GITHUB_CONFIG
+from .github_push import git_blob_sha
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def endpoint_name(path):
+    """Path with owner, repository and SHAs dropped, for per-endpoint request counts"""
+    parts = [part for part in path.split('/') if part]
+    if parts[:1] == ['repos']:
+        return '/'.join(['repos'] + parts[3:5])
+    return '/'.join(parts[:3])
+
+
+class FakeGitHubError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class FakeRepository:
+    def __init__(self, owner, name, private, description):
+        self.owner = owner
+        self.name = name
+        self.private = private
+        self.description = description
+        self.default_branch = 'main'
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        self.refs = {}
+
+    @property
+    def full_name(self):
+        return f"{self.owner}/{self.name}"
+
+    def summary(self, html_root):
+        return {
+            'name': self.name,
+            'full_name': self.full_name,
+            'owner': {'login': self.owner},
+            'private': self.private,
+            'description': self.description,
+            'default_branch': self.default_branch,
+            'html_url': f"{html_root}/{self.full_name}"
+        }
+
+    def add_blob(self, data):
+        sha = git_blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def add_tree(self, paths):
+        entries = dict(sorted(paths.items()))
+        sha = _hash(entries)
+        self.trees[sha] = entries
+        return sha
+
+    def add_commit(self, message, tree, parents):
+        commit = {
+            'message': message,
+            'tree': tree,
+            'parents': parents,
+            'date': datetime.now(timezone.utc).isoformat()
+        }
+        sha = _hash(commit)
+        self.commits[sha] = commit
+        return sha
+
+
+class FakeGitHub:
+    """In-memory GitHub state plus the injected latency, limits and failures"""
+
+    def __init__(self, latency_ms=None, latency_jitter_ms=None, rate_limit=None, rate_limit_window_seconds=None,
+                 error_rate=None, secondary_limit_rate=None, seed=None):
+        settings = GITHUB_CONFIG['fake']
+        self.latency_ms = settings['latency_ms'] if latency_ms is None else latency_ms
+        self.latency_jitter_ms = settings['latency_jitter_ms'] if latency_jitter_ms is None else latency_jitter_ms
+        self.rate_limit = settings['rate_limit'] if rate_limit is None else rate_limit
+        self.rate_limit_window_seconds = (settings['rate_limit_window_seconds'] if rate_limit_window_seconds is None
+                                          else rate_limit_window_seconds)
+        self.error_rate = settings['error_rate'] if error_rate is None else error_rate
+        self.secondary_limit_rate = (settings['secondary_limit_rate'] if secondary_limit_rate is None
+                                     else secondary_limit_rate)
+        self.rng = random.Random(settings['seed'] if seed is None else seed)
+        self.html_root = 'http://localhost'
+        self.codes = {}
+        self.tokens = {}
+        self.repos = {}
+        self.windows = {}
+        self.stats = {'requests': 0, 'not_modified': 0, 'rate_limited': 0, 'injected_errors': 0, 'by_endpoint': {}}
+        self.lock = threading.Lock()
+
+    # Injected behaviour
+
+    def draw(self):
+        """Latency in seconds and the failure, if any, for the next request"""
+        with self.lock:
+            delay = max(0.0, self.rng.gauss(self.latency_ms, self.latency_jitter_ms)) / 1000 if self.latency_ms else 0.0
+            roll = self.rng.random()
+        if roll < self.error_rate:
+            return delay, 'error'
+        if roll < self.error_rate + self.secondary_limit_rate:
+            return delay, 'secondary'
+        return delay, None
+
+    def consume(self, token, charge=True):
+        """Count a request against the token's window and return its rate-limit headers"""
+        now = time.time()
+        with self.lock:
+            # Resets are whole epoch seconds, as GitHub reports them
+            reset, used = self.windows.get(token, (int(now) + self.rate_limit_window_seconds, 0))
+            if now >= reset:
+                reset, used = int(now) + self.rate_limit_window_seconds, 0
+            exhausted = used >= self.rate_limit
+            if charge and not exhausted:
+                used += 1
+            self.windows[token] = (reset, used)
+        headers = {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(max(0, self.rate_limit - used)),
+            'X-RateLimit-Used': str(used),
+            'X-RateLimit-Reset': str(reset),
+            'X-RateLimit-Resource': 'core'
+        }
+        return headers, exhausted
+
+    def count(self, key):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['by_endpoint'][key] = self.stats['by_endpoint'].get(key, 0) + 1
+
+    # OAuth
+
+    def authorize(self, query):
+        """
+        Issue a code and return the redirect the real authorize page would send
+
+        A non-standard login parameter picks the user the code is issued for.
+        """
+        code = hashlib.sha1(f"{query.get('client_id')}:{time.time_ns()}".encode()).hexdigest()[:20]
+        with self.lock:
+            self.codes[code] = query.get('login') or 'devspell-dev'
+        params = {'code': code}
+        if query.get('state'):
+            params['state'] = query['state']
+        return f"{query.get('redirect_uri', '')}?{urlencode(params)}"
+
+    def exchange(self, form):
+        with self.lock:
+            login = self.codes.pop(form.get('code'), None)
+            if login is None:
+                # GitHub reports a bad code with a 200 and an error field
+                return {'error': 'bad_verification_code',
+                        'error_description': 'The code passed is incorrect or expired.'}
+            token = f"gho_fake_{hashlib.sha1(form['code'].encode()).hexdigest()[:30]}"
+            self.tokens[token] = login
+        return {'access_token': token, 'token_type': 'bearer', 'scope': 'repo,user'}
+
+    def login_for(self, token):
+        """Tokens issued here map to their login; any other token gets a stable made-up login"""
+        return self.tokens.get(token) or f"user-{hashlib.sha1(token.encode()).hexdigest()[:8]}"
+
+    # REST API
+
+    def repo(self, owner, name):
+        repo = self.repos.get(f"{owner}/{name}")
+        if repo is None:
+            raise FakeGitHubError(404, 'Not Found')
+        return repo
+
+    def create_repo(self, login, body):
+        name = body.get('name')
+        if not name:
+            raise FakeGitHubError(422, 'Repository creation failed: name is missing')
+        with self.lock:
+            if f"{login}/{name}" in self.repos:
+                raise FakeGitHubError(422, 'Repository creation failed: name already exists on this account')
+            repo = FakeRepository(login, name, body.get('private', False), body.get('description', ''))
+            if body.get('auto_init'):
+                readme = repo.add_blob(f"# {name}\n".encode('utf-8'))
+                repo.refs[repo.default_branch] = repo.add_commit('Initial commit', repo.add_tree({'README.md': readme}), [])
+            self.repos[repo.full_name] = repo
+        return 201, repo.summary(self.html_root)
+
+    def route(self, method, path, body, login):
+        """Dispatch a REST request and return (status, JSON body)"""
+        parts = [part for part in path.split('/') if part]
+        if parts == ['user'] and method == 'GET':
+            return 200, {'login': login, 'id': int(hashlib.sha1(login.encode()).hexdigest()[:8], 16),
+                         'html_url': f"{self.html_root}/{login}"}
+        if parts == ['user', 'repos'] and method == 'POST':
+            return self.create_repo(login, body)
+        if len(parts) < 3 or parts[0] != 'repos':
+            raise FakeGitHubError(404, 'Not Found')
+
+        repo = self.repo(parts[1], parts[2])
+        if repo.owner != login:
+            # Private and public alike, only the owner can see and write in this stand-in
+            raise FakeGitHubError(404, 'Not Found')
+        rest = parts[3:]
+        if not rest and method == 'GET':
+            return 200, repo.summary(self.html_root)
+        if rest[:1] != ['git']:
+            raise FakeGitHubError(404, 'Not Found')
+        rest = rest[1:]
+        if not repo.refs and rest[:1] != ['refs']:
+            raise FakeGitHubError(409, 'Git Repository is empty.')
+
+        with self.lock:
+            return self.git(repo, method, rest, body)
+
+    def git(self, repo, method, rest, body):
+        kind = rest[0] if rest else None
+        if kind == 'blobs' and method == 'POST':
+            content = body.get('content', '')
+            data = base64.b64decode(content) if body.get('encoding') == 'base64' else content.encode('utf-8')
+            return 201, {'sha': repo.add_blob(data)}
+        if kind == 'blobs' and method == 'GET' and len(rest) == 2:
+            data = repo.blobs.get(rest[1])
+            if data is None:
+                raise FakeGitHubError(404, 'Not Found')
+            return 200, {'sha': rest[1], 'size': len(data), 'encoding': 'base64',
+                         'content': base64.b64encode(data).decode('ascii')}
+
+        if kind == 'trees' and method == 'POST':
+            paths = dict(repo.trees.get(body.get('base_tree'), {})) if body.get('base_tree') else {}
+            for entry in body.get('tree', []):
+                if entry.get('sha') is None:
+                    paths.pop(entry['path'], None)
+                elif entry['sha'] not in repo.blobs:
+                    raise FakeGitHubError(422, f"tree.sha {entry['sha']} is not a valid blob")
+                else:
+                    paths[entry['path']] = entry['sha']
+            return 201, {'sha': repo.add_tree(paths)}
+        if kind == 'trees' and method == 'GET' and len(rest) == 2:
+            paths = repo.trees.get(rest[1])
+            if paths is None:
+                raise FakeGitHubError(404, 'Not Found')
+            return 200, {'sha': rest[1], 'truncated': False, 'tree': [
+                {'path': path, 'mode': '100644', 'type': 'blob', 'sha': sha, 'size': len(repo.blobs[sha])}
+                for path, sha in paths.items()
+            ]}
+
+        if kind == 'commits' and method == 'POST':
+            if body.get('tree') not in repo.trees:
+                raise FakeGitHubError(422, 'Tree SHA does not exist')
+            if any(parent not in repo.commits for parent in body.get('parents', [])):
+                raise FakeGitHubError(422, 'Parent SHA does not exist or is not a commit object')
+            return 201, {'sha': repo.add_commit(body.get('message', ''), body['tree'], body.get('parents', []))}
+        if kind == 'commits' and method == 'GET' and len(rest) == 2:
+            commit = repo.commits.get(rest[1])
+            if commit is None:
+                raise FakeGitHubError(404, 'Not Found')
+            return 200, {'sha': rest[1], 'message': commit['message'], 'tree': {'sha': commit['tree']},
+                         'parents': [{'sha': parent} for parent in commit['parents']]}
+
+        if kind == 'ref' and method == 'GET' and rest[1:2] == ['heads']:
+            branch = '/'.join(rest[2:])
+            if branch not in repo.refs:
+                raise FakeGitHubError(404, 'Not Found')
+            return 200, {'ref': f"refs/heads/{branch}", 'object': {'type': 'commit', 'sha': repo.refs[branch]}}
+        if kind == 'refs' and method == 'POST':
+            ref = body.get('ref', '')
+            if not ref.startswith('refs/heads/') or body.get('sha') not in repo.commits:
+                raise FakeGitHubError(422, 'Reference update failed')
+            branch = ref[len('refs/heads/'):]
+            if branch in repo.refs:
+                raise FakeGitHubError(422, 'Reference already exists')
+            repo.refs[branch] = body['sha']
+            return 201, {'ref': ref, 'object': {'type': 'commit', 'sha': body['sha']}}
+        if kind == 'refs' and method == 'PATCH' and rest[1:2] == ['heads']:
+            branch = '/'.join(rest[2:])
+            if branch not in repo.refs or body.get('sha') not in repo.commits:
+                raise FakeGitHubError(422, 'Reference does not exist')
+            if not body.get('force') and repo.refs[branch] not in repo.commits[body['sha']]['parents']:
+                raise FakeGitHubError(422, 'Update is not a fast forward')
+            repo.refs[branch] = body['sha']
+            return 200, {'ref': f"refs/heads/{branch}", 'object': {'type': 'commit', 'sha': body['sha']}}
+        raise FakeGitHubError(404, 'Not Found')
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body leave in one segment, so keep-alive requests don't stall on delayed ACKs
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PATCH(self):
+        self.handle_request('PATCH')
+
+    def send(self, status, body=None, headers=None, raw=None):
+        payload = raw if raw is not None else (json.dumps(body).encode('utf-8') if body is not None else b'')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def handle_request(self, method):
+        github = self.server.github
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        github.count(f"{method} {endpoint_name(url.path)}")
+
+        delay, failure = github.draw()
+        if delay:
+            time.sleep(delay)
+
+        if url.path.startswith('/login/oauth/'):
+            return self.handle_oauth(method, url, raw_body)
+
+        auth = self.headers.get('Authorization', '')
+        token = auth.split(' ', 1)[1] if ' ' in auth else ''
+        if not token:
+            return self.send(401, {'message': 'Requires authentication'})
+
+        if failure == 'error':
+            with github.lock:
+                github.stats['injected_errors'] += 1
+            return self.send(502, {'message': 'Server Error'})
+        if failure == 'secondary':
+            with github.lock:
+                github.stats['injected_errors'] += 1
+            return self.send(403, {'message': 'You have exceeded a secondary rate limit.'}, {'Retry-After': '1'})
+
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            status, response = github.route(method, url.path, body, github.login_for(token))
+        except FakeGitHubError as e:
+            status, response = e.status, {'message': str(e)}
+
+        etag = None
+        if method == 'GET' and status == 200:
+            payload = json.dumps(response).encode('utf-8')
+            etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                # Conditional hits are answered without touching the quota, as on github.com
+                headers, _ = github.consume(token, charge=False)
+                with github.lock:
+                    github.stats['not_modified'] += 1
+                return self.send(304, headers={**headers, 'ETag': etag})
+
+        headers, exhausted = github.consume(token)
+        if exhausted:
+            with github.lock:
+                github.stats['rate_limited'] += 1
+            return self.send(403, {'message': 'API rate limit exceeded'}, headers)
+        if etag:
+            headers['ETag'] = etag
+        self.send(status, response, headers)
+
+    def handle_oauth(self, method, url, raw_body):
+        github = self.server.github
+        if url.path == '/login/oauth/authorize' and method == 'GET':
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            return self.send(302, headers={'Location': github.authorize(query)})
+        if url.path == '/login/oauth/access_token' and method == 'POST':
+            form = {key: values[0] for key, values in parse_qs(raw_body.decode('utf-8')).items()}
+            if 'json' in self.headers.get('Content-Type', ''):
+                form = json.loads(raw_body or b'{}')
+            return self.send(200, github.exchange(form))
+        self.send(404, {'message': 'Not Found'})
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host=None, port=None, **settings):
+        host = GITHUB_CONFIG['fake']['host'] if host is None else host
+        port = GITHUB_CONFIG['fake']['port'] if port is None else port
+        super().__init__((host, port), FakeGitHubHandler)
+        self.github = FakeGitHub(**settings)
+        self.github.html_root = self.url
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve on a daemon thread and return the server; use port 0 for a free port"""
+        threading.Thread(target=self.serve_forever, name="fake-github", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local GitHub API stand-in")
+    parser.add_argument("--host", default=GITHUB_CONFIG['fake']['host'])
+    parser.add_argument("--port", type=int, default=GITHUB_CONFIG['fake']['port'])
+    parser.add_argument("--latency-ms", type=float, help="Mean added latency per request")
+    parser.add_argument("--latency-jitter-ms", type=float, help="Standard deviation of the added latency")
+    parser.add_argument("--rate-limit", type=int, help="Requests per token per window")
+    parser.add_argument("--rate-limit-window", type=int, help="Rate-limit window in seconds")
+    parser.add_argument("--error-rate", type=float, help="Share of requests answered with a 502")
+    parser.add_argument("--secondary-limit-rate", type=float,
+                        help="Share of requests answered with a secondary rate limit 403")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = FakeGitHubServer(args.host, args.port, latency_ms=args.latency_ms,
+                              latency_jitter_ms=args.latency_jitter_ms, rate_limit=args.rate_limit,
+                              rate_limit_window_seconds=args.rate_limit_window, error_rate=args.error_rate,
+                              secondary_limit_rate=args.secondary_limit_rate, seed=args.seed)
+    logger.info(f"Fake GitHub listening on {server.url}; set GITHUB_OAUTH_URL and GITHUB_API_URL to it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
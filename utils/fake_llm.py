@@ -0,0 +1,97 @@
+import json
+import random
+import threading
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.llms import LLM
+from .error_handler import LLMError
+from .llm_recording import prompt_key, load_recordings
+
+_WORDS = [
+    "project", "component", "service", "database", "request", "response", "user",
+    "config", "module", "handler", "schema", "route", "deploy", "build", "test",
+    "cache", "queue", "token", "session", "layout", "feature", "endpoint", "model"
+]
+
+# One generator per (seed, stage), shared by every FakeLLM so successive calls take successive draws
+_generators = {}
+_generators_lock = threading.Lock()
+
+
+def shared_random(seed, stage):
+    """Return the process-wide seeded generator for a seed and pipeline stage"""
+    with _generators_lock:
+        key = (seed, stage)
+        if key not in _generators:
+            _generators[key] = random.Random(f"{seed}:{stage}")
+        return _generators[key]
+
+
+class FakeLLM(LLM):
+    """Offline, deterministic stand-in for ChatGroq.
+
+    Responses are replayed from a recording when the prompt was seen before,
+    otherwise synthesised from the prompt hash so the same prompt always gets
+    the same text. Latency and failures are drawn from a seeded generator
+    shared by every instance for the same stage, so get_llm() can build a new
+    model per call and a run still follows one reproducible sequence.
+    """
+
+    model_name: str = "fake"
+    stage: Optional[str] = None
+    replay_path: Optional[str] = None
+    response_chars: int = 2000
+    implementation_files: int = 10
+    latency_ms: float = 0
+    latency_jitter_ms: float = 0
+    error_rate: float = 0.0
+    seed: int = 0
+    recordings: Optional[dict] = None
+    rng: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "devspell-fake"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        if self.recordings is None:
+            self.recordings = load_recordings(self.replay_path)
+
+        rng = self.rng or shared_random(self.seed, self.stage)
+        with _generators_lock:
+            delay = max(0.0, rng.gauss(self.latency_ms, self.latency_jitter_ms)) if self.latency_ms else 0.0
+            failed = rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay / 1000)
+        if failed:
+            raise LLMError(f"Simulated {self.model_name} failure")
+
+        key = prompt_key(prompt)
+        if key in self.recordings:
+            return self.recordings[key]
+        if self.stage == "implementation" and self.implementation_files:
+            return self._synthesise_implementation(key)
+        return self._synthesise_text(key, self.response_chars)
+
+    @staticmethod
+    def _synthesise_text(key, size):
+        """Build size characters of pseudo-text seeded by the prompt hash"""
+        words = random.Random(key)
+        parts, length = [], 0
+        while length < size:
+            word = words.choice(_WORDS)
+            parts.append(word)
+            length += len(word) + 1
+        return " ".join(parts)[:size]
+
+    def _synthesise_implementation(self, key):
+        """Build a JSON file list in the format ProjectGenerator expects"""
+        per_file = max(1, self.response_chars // self.implementation_files)
+        files = [
+            {
+                "path": f"src/generated/module_{index}.js",
+                "content": self._synthesise_text(f"{key}:{index}", per_file)
+            }
+            for index in range(self.implementation_files)
+        ]
+        return json.dumps(files)
@@ -1,29 +1,105 @@
 import firebase_admin
 from firebase_admin import firestore
 from datetime import datetime
+import itertools
+import logging
+import threading
 import uuid
 import os
 from dotenv import load_dotenv
+from config import FIREBASE_CONFIG, STORAGE_CONFIG
 from .error_handler import FirestoreError
+from .read_cache import ReadCache
+from .storage import StorageBackend, stats_update
+from .batch_writer import BatchWriter
+from .tracing import span, payload_size
+from .text_storage import pack_text, unpack_text, chunk_documents
+from .prompt_versions import plan_version, version_text, VERSION_SUMMARY_FIELDS
 load_dotenv()
 
-class FirestoreDB:
-    def __init__(self, db_client=None):
-        self.db = db_client or firestore.client()
+logger = logging.getLogger(__name__)
 
-    def save_chat_history(self, user_id, chat_data):
+_db_instance = None
+_db_lock = threading.Lock()
+
+# Fields read by history lists; bodies are fetched separately when opened
+CHAT_SUMMARY_FIELDS = ['chat_id', 'timestamp', 'user_message', 'metadata']
+# Field each collection's per-user queries are ordered by
+ORDER_FIELDS = {
+    'chat_history': 'timestamp',
+    'projects': 'created_at'
+}
+PROJECT_SUMMARY_FIELDS = ['project_id', 'name', 'project_type', 'status', 'github_url', 'created_at',
+                          'file_count', 'manifest_sha256']
+
+
+def normalize_email(email):
+    """Key used for the user_emails index"""
+    return email.strip().lower()
+
+
+def _create_clients(pool_size):
+    """Create pool_size Firestore clients, each holding its own gRPC channel"""
+    clients = [firestore.client()]
+    if pool_size > 1:
+        from google.cloud import firestore as cloud_firestore
+        app = firebase_admin.get_app()
+        for _ in range(pool_size - 1):
+            clients.append(cloud_firestore.Client(
+                project=app.project_id,
+                credentials=app.credential.get_credential()
+            ))
+    return clients
+
+
+class FirestoreQueries:
+    """Query and document builders shared by FirestoreDB and AsyncFirestoreDB.
+
+    Both keep their client in self.db and differ only in how the queries and
+    batches built here are run: blocking calls or awaited ones.
+    """
+
+    def _stats_ref(self, user_id):
+        return self.db.collection('user_stats').document(user_id)
+
+    def _email_ref(self, email):
+        return self.db.collection('user_emails').document(normalize_email(email))
+
+    def _build_user_query(self, collection, user_id, order_field, limit=None):
+        """Query for a user's documents in collection, newest first"""
+        query = (self.db.collection(collection)
+                .where("user_id", "==", user_id)
+                .order_by(order_field, direction=firestore.Query.DESCENDING))
+        if limit:
+            query = query.limit(limit)
+        return query
+
+    def _build_page_query(self, collection, user_id, order_field, page_size, start_after=None, fields=None):
+        """Query for one page of a user's documents plus one extra to know whether another page exists"""
+        query = (self._build_user_query(collection, user_id, order_field)
+                .order_by('__name__', direction=firestore.Query.DESCENDING))
+        if fields:
+            query = query.select(fields)
+        if start_after is not None:
+            # The document id breaks ties, so documents sharing the boundary value are not skipped
+            order_value, doc_id = start_after
+            query = query.start_after({order_field: order_value,
+                                       '__name__': self.db.collection(collection).document(doc_id)})
+        return query.limit(page_size + 1)
+
+    @staticmethod
+    def _page_cursor(results, fetched, page_size, order_field):
+        """Cursor after the last result, or None when the extra document wasn't there"""
+        return (results[-1][order_field], results[-1]['id']) if fetched > page_size else None
+
+    def _build_chat(self, user_id, chat_data):
         """
-        Save chat history for a user
-        
-        Args:
-            user_id (str): The user's unique identifier
-            chat_data (dict): Dictionary containing chat data
-                Expected keys: 
-                - user_message (str): The user's message
-                - llm_response (str): The LLM's response
-                
+        Build a new chat history document with its response packed for storage
+
+        Returns:
+            tuple: (document reference, chat document, response chunks)
+
         Raises:
-            FirestoreError: If there's an error saving to Firestore
             ValueError: If the input parameters are invalid
         """
         if not user_id or not isinstance(chat_data, dict):
@@ -34,26 +110,31 @@ class FirestoreDB:
             'timestamp': firestore.SERVER_TIMESTAMP,
             'chat_id': str(uuid.uuid4()),
             'user_message': chat_data.get('user_message', ''),
-            'llm_response': chat_data.get('llm_response', ''),
             'metadata': {
                 'created_at': datetime.utcnow().isoformat(),
-                'type': 'project_generation'
+                'type': 'project_generation',
+                'project_key': chat_data.get('project_key')
             }
         }
+        response_fields, chunks = pack_text('llm_response', chat_data.get('llm_response', ''))
+        chat_doc.update(response_fields)
+        return self.db.collection('chat_history').document(), chat_doc, chunks
 
-        try:
-            doc_ref = self.db.collection('chat_history').document()
-            doc_ref.set(chat_doc)
-            return doc_ref.id
-        except Exception as e:
-            raise FirestoreError(f"Failed to save chat history: {str(e)}")
+    def _queue_chat(self, batch, user_id, doc_ref, chat_doc, chunks):
+        """Queue the chat, its chunks and the user's counters on one batch so they commit atomically"""
+        batch.set(doc_ref, chat_doc)
+        for chunk_ref, chunk_doc in chunk_documents(doc_ref, 'llm_response', chunks):
+            batch.set(chunk_ref, chunk_doc)
+        batch.set(self._stats_ref(user_id), stats_update('chat_count', 'last_chat_at'), merge=True)
 
-    def save_project(self, user_id, project_data):
+    def _build_project(self, user_id, project_data):
         """
-        Save generated project data
-        
+        Build a new project document
+
+        Returns:
+            tuple: (document reference, project document)
+
         Raises:
-            FirestoreError: If there's an error saving to Firestore
             ValueError: If the input parameters are invalid
         """
         if not user_id or not isinstance(project_data, dict):
@@ -66,13 +147,121 @@ class FirestoreDB:
             'updated_at': firestore.SERVER_TIMESTAMP,
             **project_data
         }
+        return self.db.collection('projects').document(project_doc['project_id']), project_doc
 
-        try:
-            doc_ref = self.db.collection('projects').document(project_doc['project_id'])
-            doc_ref.set(project_doc)
-            return project_doc['project_id']
-        except Exception as e:
-            raise FirestoreError(f"Failed to save project: {str(e)}")
+    def _queue_project(self, batch, user_id, doc_ref, project_doc):
+        """Queue the project and the user's counters on one batch"""
+        batch.set(doc_ref, project_doc)
+        batch.set(self._stats_ref(user_id), stats_update('project_count', 'last_project_at'), merge=True)
+
+
+class FirestoreDB(FirestoreQueries, StorageBackend):
+    def __init__(self, db_client=None, pool_size=1):
+        self._clients = [db_client] if db_client else _create_clients(pool_size)
+        self._next_client = itertools.count()
+        self._local = threading.local()
+        self._warm_lock = threading.Lock()
+        self._warmed = False
+        self.cache = ReadCache(ttl_seconds=FIREBASE_CONFIG['cache_ttl_seconds'],
+                               max_entries=FIREBASE_CONFIG['cache_max_entries'])
+
+    @property
+    def db(self):
+        """Firestore client pinned to the calling thread, assigned round-robin from the pool"""
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._clients[next(self._next_client) % len(self._clients)]
+            self._local.client = client
+        return client
+
+    def warm_up(self):
+        """Open the gRPC channel of every pooled client before the first page render"""
+        with self._warm_lock:
+            if self._warmed:
+                return
+            with span("firestore.warm_up", op="read", clients=len(self._clients)):
+                for client in self._clients:
+                    try:
+                        client.collection('user_profiles').document('_warm_up').get()
+                    except Exception as e:
+                        logger.warning(f"Firestore warm-up failed: {str(e)}")
+            self._warmed = True
+
+    def batch_writer(self):
+        """Return a BatchWriter bound to this thread's client"""
+        return BatchWriter(self.db)
+
+    def _queue_write(self, writer, user_id, doc_ref, data, merge=False):
+        """Queue a set on writer and drop the user's cached reads once it commits"""
+        writer.set(doc_ref, data, merge=merge)
+        writer.on_commit(lambda: self.cache.invalidate_user(user_id))
+
+    def save_chat_history(self, user_id, chat_data, writer=None):
+        """
+        Save chat history for a user
+        
+        Args:
+            user_id (str): The user's unique identifier
+            chat_data (dict): Dictionary containing chat data
+                Expected keys: 
+                - user_message (str): The user's message
+                - llm_response (str): The LLM's response
+            writer (BatchWriter): Queue the write on this writer instead of writing immediately
+                
+        Raises:
+            FirestoreError: If there's an error saving to Firestore
+            ValueError: If the input parameters are invalid
+        """
+        doc_ref, chat_doc, chunks = self._build_chat(user_id, chat_data)
+        batch = writer if writer is not None else self.batch_writer()
+        self._queue_chat(batch, user_id, doc_ref, chat_doc, chunks)
+        batch.on_commit(lambda: self.cache.invalidate_user(user_id))
+        if writer is None:
+            with span("firestore.save_chat_history", op="write", collection="chat_history",
+                      request_bytes=payload_size(chat_doc) + sum(map(len, chunks)), chunks=len(chunks)):
+                batch.commit()
+        self._index_chat(user_id, doc_ref.id, chat_data, chat_doc['metadata']['created_at'], writer)
+        return doc_ref.id
+
+    def save_project(self, user_id, project_data, writer=None):
+        """
+        Save generated project data
+        
+        Args:
+            user_id (str): The user's unique identifier
+            project_data (dict): Project fields to store
+            writer (BatchWriter): Queue the write on this writer instead of writing immediately
+        
+        Raises:
+            FirestoreError: If there's an error saving to Firestore
+            ValueError: If the input parameters are invalid
+        """
+        doc_ref, project_doc = self._build_project(user_id, project_data)
+        batch = writer if writer is not None else self.batch_writer()
+        self._queue_project(batch, user_id, doc_ref, project_doc)
+        batch.on_commit(lambda: self.cache.invalidate_user(user_id))
+        if writer is None:
+            with span("firestore.save_project", op="write", collection="projects",
+                      request_bytes=payload_size(project_doc)):
+                batch.commit()
+        return project_doc['project_id']
+
+    def update_project(self, user_id, project_id, update_data, writer=None):
+        """
+        Update fields of an existing project, or queue the update on writer when given
+        
+        Raises:
+            FirestoreError: If there's an error updating Firestore
+        """
+        doc_ref = self.db.collection('projects').document(project_id)
+        batch = writer if writer is not None else self.batch_writer()
+        batch.update(doc_ref, {**update_data, 'updated_at': firestore.SERVER_TIMESTAMP})
+        batch.on_commit(lambda: self.cache.invalidate_user(user_id))
+        if writer is None:
+            with span("firestore.update_project", op="write", collection="projects",
+                      request_bytes=payload_size(update_data)):
+                batch.commit()
+        return True
 
     def get_user_projects(self, user_id, limit=None):
         """
@@ -82,62 +271,480 @@ class FirestoreDB:
             FirestoreError: If there's an error retrieving from Firestore
         """
         try:
-            query = (self.db.collection('projects')
-                    .where("user_id", "==", user_id)
-                    .order_by('created_at', direction=firestore.Query.DESCENDING))
-            
-            if limit:
-                query = query.limit(limit)
-            
-            projects = query.stream()
-            return [project.to_dict() for project in projects]
+            with span("firestore.get_user_projects", collection="projects") as trace:
+                def load():
+                    query = self._build_user_query('projects', user_id, 'created_at', limit)
+                    return [project.to_dict() for project in query.stream()]
+                
+                projects = self._cached_read(trace, user_id, ('get_user_projects', limit), load)
+                trace.set(documents=len(projects), response_bytes=payload_size(projects))
+            return projects
         except Exception as e:
             raise FirestoreError(f"Failed to retrieve user projects: {str(e)}")
 
     def retrieve_chat_history(self, user_id):
         """Retrieve chat history for a user"""
-        chats = (self.db.collection('chat_history')
-                .where("user_id", "==", user_id)
-                .order_by('timestamp', direction=firestore.Query.DESCENDING)
-                .stream())
+        with span("firestore.retrieve_chat_history", op="read", collection="chat_history") as trace:
+            chats = self._build_user_query('chat_history', user_id, 'timestamp').stream()
+            history = [unpack_text(chat.reference, chat.to_dict(), 'llm_response') for chat in chats]
+            trace.set(documents=len(history), response_bytes=payload_size(history))
+        return history
+
+    def _paged_query(self, collection, user_id, order_field, page_size, start_after=None, fields=None,
+                     text_field=None):
+        """Run a per-user, newest-first query and return (documents, next cursor)"""
+        docs = list(self._build_page_query(collection, user_id, order_field, page_size, start_after,
+                                           fields).stream())
+        results = []
+        for doc in docs[:page_size]:
+            result = doc.to_dict()
+            if text_field:
+                unpack_text(doc.reference, result, text_field)
+            result['id'] = doc.id
+            results.append(result)
         
-        return [chat.to_dict() for chat in chats]
+        return results, self._page_cursor(results, len(docs), page_size, order_field)
 
-    def get_user_projects(self, user_id, limit=None):
-        """Retrieve user's projects with optional limit"""
-        query = (self.db.collection('projects')
-                .where("user_id", "==", user_id)
-                .order_by('created_at', direction=firestore.Query.DESCENDING))
+    def iter_user_documents(self, user_id, collection, page_size=200):
+        """Yield every document a user owns in collection, newest first, one uncached page at a time"""
+        text_field = 'llm_response' if collection == 'chat_history' else None
+        cursor = None
+        while True:
+            with span("firestore.iter_user_documents", op="read", collection=collection) as trace:
+                docs, cursor = self._paged_query(collection, user_id, ORDER_FIELDS[collection], page_size,
+                                                 cursor, text_field=text_field)
+                trace.set(documents=len(docs), response_bytes=payload_size(docs))
+            yield from docs
+            if cursor is None:
+                return
+
+    def retrieve_chat_history_page(self, user_id, page_size=20, start_after=None):
+        """
+        Retrieve one page of a user's chat history, newest first
         
-        if limit:
-            query = query.limit(limit)
+        Args:
+            user_id (str): The user's unique identifier
+            page_size (int): Maximum number of chats to return
+            start_after: Cursor returned with the previous page, None for the first page
+            
+        Returns:
+            tuple: (list of chat dicts, cursor for the next page or None when exhausted)
+            
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.retrieve_chat_history_page", collection="chat_history") as trace:
+                chats, next_cursor = self._cached_read(
+                    trace, user_id, ('retrieve_chat_history_page', page_size, start_after),
+                    lambda: self._paged_query('chat_history', user_id, 'timestamp', page_size, start_after,
+                                              text_field='llm_response'))
+                trace.set(documents=len(chats), response_bytes=payload_size(chats))
+            return chats, next_cursor
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve chat history: {str(e)}")
+
+    def list_chat_summaries(self, user_id, page_size=20, start_after=None):
+        """
+        Retrieve one page of chat summaries (timestamp, message and type) without response bodies
         
-        projects = query.stream()
-        return [project.to_dict() for project in projects]
+        Returns:
+            tuple: (list of summary dicts, cursor for the next page or None when exhausted)
+            
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.list_chat_summaries", collection="chat_history") as trace:
+                chats, next_cursor = self._cached_read(
+                    trace, user_id, ('list_chat_summaries', page_size, start_after),
+                    lambda: self._paged_query('chat_history', user_id, 'timestamp', page_size,
+                                              start_after, fields=CHAT_SUMMARY_FIELDS))
+                trace.set(documents=len(chats), response_bytes=payload_size(chats))
+            return chats, next_cursor
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve chat summaries: {str(e)}")
+
+    def get_chat(self, chat_doc_id):
+        """
+        Retrieve a full chat history document, including the LLM response
+        
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_chat", op="read", collection="chat_history") as trace:
+                doc = self.db.collection('chat_history').document(chat_doc_id).get()
+                chat = doc.to_dict() if doc.exists else None
+                trace.set(documents=int(doc.exists), response_bytes=payload_size(chat))
+                if chat is not None:
+                    # Only a full fetch pays for decompression and chunk reads
+                    unpack_text(doc.reference, chat, 'llm_response')
+                    chat['id'] = doc.id
+            return chat
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve chat: {str(e)}")
+
+    def list_project_summaries(self, user_id, limit=5):
+        """
+        Retrieve the user's most recent projects with only the fields shown in project lists
+        
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.list_project_summaries", collection="projects") as trace:
+                projects, _ = self._cached_read(
+                    trace, user_id, ('list_project_summaries', limit),
+                    lambda: self._paged_query('projects', user_id, 'created_at', limit,
+                                              fields=PROJECT_SUMMARY_FIELDS))
+                trace.set(documents=len(projects), response_bytes=payload_size(projects))
+            return projects
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve project summaries: {str(e)}")
+
+    def get_project(self, project_id):
+        """
+        Retrieve a full project document
+        
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_project", op="read", collection="projects") as trace:
+                doc = self.db.collection('projects').document(project_id).get()
+                project = doc.to_dict() if doc.exists else None
+                trace.set(documents=int(doc.exists), response_bytes=payload_size(project))
+            return project
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve project: {str(e)}")
+
+    def save_prompt_version(self, user_id, project_key, text, source='generated', project_name=None):
+        """
+        Store the next version of a project's prompt as a base or a delta
+        
+        Args:
+            user_id (str): The user's unique identifier
+            project_key (str): Key shared by every version of one project's prompt
+            text (str): The prompt text
+            source (str): 'generated' for LLM output, 'edited' for manual edits
+            project_name (str): Project name shown alongside the versions
+            
+        Returns:
+            int: The new version number
+            
+        Raises:
+            FirestoreError: If there's an error saving to Firestore
+        """
+        head_ref = self.db.collection('prompt_versions').document(project_key)
+
+        @firestore.transactional
+        def add_version(transaction):
+            head_doc = head_ref.get(transaction=transaction)
+            head = None
+            if head_doc.exists:
+                head = unpack_text(head_ref, head_doc.to_dict(), 'base_text')
+                if head['user_id'] != user_id:
+                    raise FirestoreError("Prompt versions belong to another user")
+            version_doc, head_fields = plan_version(head, text, source)
+
+            version_ref = head_ref.collection('versions').document(f"{version_doc['version']:06d}")
+            if 'text' in version_doc:
+                text_fields, chunks = pack_text('text', version_doc['text'])
+                version_doc.update(text_fields)
+                for chunk_ref, chunk_doc in chunk_documents(version_ref, 'text', chunks):
+                    transaction.set(chunk_ref, chunk_doc)
+            transaction.set(version_ref, version_doc)
+
+            new_head = {
+                'user_id': user_id,
+                'project_key': project_key,
+                'project_name': project_name or (head or {}).get('project_name'),
+                'base_version': head_fields.get('base_version', (head or {}).get('base_version')),
+                'version_count': head_fields['version_count'],
+                'updated_at': head_fields['updated_at']
+            }
+            # Prompts stay far below the chunk size, so only compression applies to the head
+            new_head.update(pack_text('base_text', head_fields.get('base_text', (head or {}).get('base_text')))[0])
+            new_head.update(pack_text('latest_text', head_fields['latest_text'])[0])
+            transaction.set(head_ref, new_head)
+            transaction.set(self._stats_ref(user_id), stats_update('generation_count', 'last_generation_at'),
+                            merge=True)
+            return version_doc['version']
+
+        try:
+            with span("firestore.save_prompt_version", op="write", collection="prompt_versions",
+                      request_bytes=len(text)):
+                version = add_version(self.db.transaction())
+            self.cache.invalidate_user(user_id)
+            return version
+        except FirestoreError:
+            raise
+        except Exception as e:
+            raise FirestoreError(f"Failed to save prompt version: {str(e)}")
+
+    def list_prompt_versions(self, user_id, project_key, page_size=10, start_after=None):
+        """
+        Retrieve one page of a project's prompt versions, newest first, without their text
+        
+        Returns:
+            tuple: (list of version summaries, cursor for the next page or None when exhausted)
+            
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        def load():
+            # The cache is keyed by user, so only a first read for each key needs the ownership check
+            self._check_prompt_owner(user_id, project_key)
+            query = (self.db.collection('prompt_versions').document(project_key).collection('versions')
+                    .order_by('version', direction=firestore.Query.DESCENDING)
+                    .select(VERSION_SUMMARY_FIELDS))
+            if start_after is not None:
+                query = query.start_after({'version': start_after})
+            docs = list(query.limit(page_size + 1).stream())
+            versions = [doc.to_dict() for doc in docs[:page_size]]
+            return versions, versions[-1]['version'] if len(docs) > page_size else None
+
+        try:
+            with span("firestore.list_prompt_versions", collection="prompt_versions") as trace:
+                versions, next_cursor = self._cached_read(
+                    trace, user_id, ('list_prompt_versions', project_key, page_size, start_after), load)
+                trace.set(documents=len(versions), response_bytes=payload_size(versions))
+            return versions, next_cursor
+        except FirestoreError:
+            raise
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve prompt versions: {str(e)}")
+
+    def _check_prompt_owner(self, user_id, project_key):
+        head_doc = self.db.collection('prompt_versions').document(project_key).get(field_paths=['user_id'])
+        if head_doc.exists and head_doc.to_dict().get('user_id') != user_id:
+            raise FirestoreError("Prompt versions belong to another user")
+
+    def _prompt_base_text(self, project_key, base_version):
+        base_doc = self._prompt_version_doc(project_key, base_version)
+        if base_doc is None:
+            raise FirestoreError(f"Prompt {project_key} is missing base version {base_version}")
+        return base_doc['text']
+
+    def _prompt_version_doc(self, project_key, version):
+        version_ref = (self.db.collection('prompt_versions').document(project_key)
+                       .collection('versions').document(f"{version:06d}"))
+        doc = version_ref.get()
+        return unpack_text(version_ref, doc.to_dict(), 'text') if doc.exists else None
+
+    def get_prompt_version(self, user_id, project_key, version):
+        """
+        Retrieve one prompt version with its text rebuilt from at most two documents
+        
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_prompt_version", op="read", collection="prompt_versions") as trace:
+                self._check_prompt_owner(user_id, project_key)
+                version_doc = self._prompt_version_doc(project_key, version)
+                if version_doc is None:
+                    return None
+                base_text = None
+                if version_doc['kind'] == 'delta':
+                    # Bases never change, so one cached read serves every delta built on it
+                    base_text = self._cached_read(
+                        trace, user_id, ('prompt_base', project_key, version_doc['base_version']),
+                        lambda: self._prompt_base_text(project_key, version_doc['base_version']))
+                result = {field: version_doc.get(field) for field in VERSION_SUMMARY_FIELDS}
+                result['text'] = version_text(version_doc, base_text)
+                trace.set(response_bytes=len(result['text']))
+            return result
+        except FirestoreError:
+            raise
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve prompt version: {str(e)}")
+
+    def record_token_usage(self, user_id, token_usage, writer=None):
+        """
+        Add LLM call and token counts to the user's aggregates
+        
+        Args:
+            user_id (str): The user's unique identifier
+            token_usage (dict): 'llm_calls', 'prompt_tokens' and 'completion_tokens' to add
+            writer (BatchWriter): Queue the write on this writer instead of writing immediately
+        """
+        batch = writer if writer is not None else self.batch_writer()
+        self._queue_write(batch, user_id, self._stats_ref(user_id), stats_update(token_usage=token_usage),
+                          merge=True)
+        if writer is None:
+            with span("firestore.record_token_usage", op="write", collection="user_stats"):
+                batch.commit()
+
+    def get_user_stats(self, user_id):
+        """
+        Retrieve a user's aggregate counters from a single document
+        
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_user_stats", collection="user_stats") as trace:
+                def load():
+                    doc = self._stats_ref(user_id).get()
+                    return doc.to_dict() if doc.exists else None
+
+                stats = self._cached_read(trace, user_id, ('get_user_stats',), load)
+                trace.set(documents=int(stats is not None))
+            return stats
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve user stats: {str(e)}")
+
+    def get_user_profile(self, user_id):
+        """
+        Retrieve a user's profile document
+        
+        Raises:
+            FirestoreError: If there's an error retrieving from Firestore
+        """
+        try:
+            with span("firestore.get_user_profile", collection="user_profiles") as trace:
+                def load():
+                    doc = self.db.collection('user_profiles').document(user_id).get()
+                    return doc.to_dict() if doc.exists else None
+
+                profile = self._cached_read(trace, user_id, ('get_user_profile',), load)
+                trace.set(documents=int(profile is not None), response_bytes=payload_size(profile))
+            return profile
+        except Exception as e:
+            raise FirestoreError(f"Failed to retrieve user profile: {str(e)}")
+
+    def save_user_profile(self, user_id, user_data):
+        """
+        Create a user profile together with its email index entry
+        
+        Both documents are written in one transaction, so an email can only
+        ever point at a single profile.
+        
+        Raises:
+            FirestoreError: If the email is already registered to another user
+                or there's an error saving to Firestore
+            ValueError: If the input parameters are invalid
+        """
+        if not user_id or not isinstance(user_data, dict) or not user_data.get('email'):
+            raise ValueError("Invalid user_id or user_data")
+
+        profile_ref = self.db.collection('user_profiles').document(user_id)
+        index_ref = self._email_ref(user_data['email'])
+
+        @firestore.transactional
+        def create_profile(transaction):
+            index_doc = index_ref.get(transaction=transaction)
+            if index_doc.exists and index_doc.to_dict().get('uid') != user_id:
+                raise FirestoreError("Email already exists")
+            transaction.set(index_ref, {'uid': user_id, 'email': user_data['email']})
+            transaction.set(profile_ref, user_data)
+
+        try:
+            with span("firestore.save_user_profile", op="write", collection="user_profiles",
+                      request_bytes=payload_size(user_data)):
+                create_profile(self.db.transaction())
+            self.cache.invalidate_user(user_id)
+            return user_id
+        except FirestoreError:
+            raise
+        except Exception as e:
+            raise FirestoreError(f"Failed to save user profile: {str(e)}")
 
     def get_user_by_email(self, email):
-        """Get user profile by email"""
-        users_ref = self.db.collection('user_profiles').where("email", "==", email)
-        docs = users_ref.stream()
-        user_record = None
-        for doc in docs:
-            user_record = doc.to_dict()
-            user_record['uid'] = doc.id
-            break
+        """Get user profile by email through the user_emails index"""
+        with span("firestore.get_user_by_email", op="read", collection="user_emails") as trace:
+            index_doc = self._email_ref(email).get()
+            user_record = None
+            if index_doc.exists:
+                uid = index_doc.to_dict()['uid']
+                profile = self.db.collection('user_profiles').document(uid).get()
+                user_record = profile.to_dict() if profile.exists else {'email': email}
+                user_record['uid'] = uid
+            trace.set(documents=int(index_doc.exists) * 2, response_bytes=payload_size(user_record))
         return user_record
-    
 
-    def update_user(self, user_id, update_data):
-        """Update user profile information"""
-        try:
-            doc_ref = self.db.collection('user_profiles').document(user_id)
-            doc_ref.update({
+    def _update_user_email(self, user_id, update_data):
+        """Update a profile whose email changes, moving its index entry in the same transaction"""
+        profile_ref = self.db.collection('user_profiles').document(user_id)
+        new_index_ref = self._email_ref(update_data['email'])
+
+        @firestore.transactional
+        def move_email(transaction):
+            profile = profile_ref.get(transaction=transaction)
+            new_index = new_index_ref.get(transaction=transaction)
+            if new_index.exists and new_index.to_dict().get('uid') != user_id:
+                raise FirestoreError("Email already exists")
+            old_email = (profile.to_dict() or {}).get('email') if profile.exists else None
+            if old_email and normalize_email(old_email) != new_index_ref.id:
+                transaction.delete(self._email_ref(old_email))
+            transaction.set(new_index_ref, {'uid': user_id, 'email': update_data['email']})
+            transaction.update(profile_ref, {
                 **update_data,
                 'updated_at': firestore.SERVER_TIMESTAMP
             })
+
+        move_email(self.db.transaction())
+
+    def update_user(self, user_id, update_data, writer=None):
+        """
+        Update user profile information, or queue a merge on writer when given
+        
+        Email changes always run in their own transaction so the email index
+        stays consistent with the profile.
+        """
+        doc_ref = self.db.collection('user_profiles').document(user_id)
+        if writer is not None and 'email' not in update_data:
+            # A merge keeps a queued batch from failing when the profile doesn't exist yet
+            self._queue_write(writer, user_id, doc_ref, {
+                **update_data,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            }, merge=True)
             return True
+
+        try:
+            with span("firestore.update_user", op="write", collection="user_profiles",
+                      request_bytes=payload_size(update_data)):
+                if 'email' in update_data:
+                    self._update_user_email(user_id, update_data)
+                else:
+                    doc_ref.update({
+                        **update_data,
+                        'updated_at': firestore.SERVER_TIMESTAMP
+                    })
+            self.cache.invalidate_user(user_id)
+            return True
+        except FirestoreError:
+            raise
         except Exception as e:
             raise FirestoreError(f"Failed to update user: {str(e)}")
     
+def create_db():
+    """Create the storage backend selected by STORAGE_CONFIG"""
+    if STORAGE_CONFIG['backend'] == 'sqlite':
+        from .sqlite_db import SQLiteDB
+        return SQLiteDB(STORAGE_CONFIG['sqlite_path'])
+    return FirestoreDB(pool_size=FIREBASE_CONFIG['channel_pool_size'])
+
 def get_db():
-    return FirestoreDB(firestore.client())
\ No newline at end of file
+    """Return the process-wide storage backend, creating it on first use"""
+    global _db_instance
+    if _db_instance is None:
+        with _db_lock:
+            if _db_instance is None:
+                _db_instance = create_db()
+    return _db_instance
+
+def set_db(db):
+    """Replace the shared database handle, e.g. with a fake in tests; None resets it"""
+    global _db_instance
+    with _db_lock:
+        _db_instance = db
+
+def warm_up_db():
+    """Create the shared handle and open its connections"""
+    db = get_db()
+    if FIREBASE_CONFIG['warm_up']:
+        db.warm_up()
+    return db
\ No newline at end of file
@@ -1,11 +1,15 @@
 from github import Github
+import functools
 import os
 from dotenv import load_dotenv
 import streamlit as st
 from urllib.parse import urlencode
 import requests
 import uuid
+from config import GITHUB_CONFIG
 from utils.firestore_db import get_db
+from utils.github_push import get_git_client
+from utils.tracing import span
 
 load_dotenv()
 
@@ -29,7 +33,7 @@ def create_github_oauth_url():
         "scope": "repo user",
         "state": st.session_state.github_oauth_state
     }
-    return f"https://github.com/login/oauth/authorize?{urlencode(params)}"
+    return f"{GITHUB_CONFIG['oauth_url']}/login/oauth/authorize?{urlencode(params)}"
 
 def get_github_token(code, state):
     """Exchange code for access token and verify state."""
@@ -43,30 +47,40 @@ def get_github_token(code, state):
         print("State mismatch!")  # Debug log
         return None
     
-    response = requests.post(
-        "https://github.com/login/oauth/access_token",
-        data={
-            "client_id": GITHUB_CLIENT_ID,
-            "client_secret": GITHUB_CLIENT_SECRET,
-            "code": code,
-            "redirect_uri": GITHUB_REDIRECT_URI
-        },
-        headers={"Accept": "application/json"}
-    )
+    with span("github.oauth_token") as trace:
+        response = requests.post(
+            f"{GITHUB_CONFIG['oauth_url']}/login/oauth/access_token",
+            data={
+                "client_id": GITHUB_CLIENT_ID,
+                "client_secret": GITHUB_CLIENT_SECRET,
+                "code": code,
+                "redirect_uri": GITHUB_REDIRECT_URI
+            },
+            headers={"Accept": "application/json"}
+        )
+        trace.set(status_code=response.status_code, response_bytes=len(response.content))
     
     if response.ok:
         return response.json().get("access_token")
     return None
 
+@functools.lru_cache(maxsize=GITHUB_CONFIG['client_cache_size'])
+def _cached_github(token):
+    return Github(token, base_url=GITHUB_CONFIG['api_url'])
+
+def get_github_login(token):
+    """Return the login of a token's owner, verified at most once per identity TTL."""
+    with span("github.verify_user"):
+        return get_git_client(token).verified_login()
+
 def get_github_client(token=None):
-    """Return a GitHub client, authenticated with a user token or organization token."""
+    """Return a cached GitHub client, authenticated with a user token or organization token."""
     try:
         if token:
-            g = Github(token)
-            # Verify connection
-            g.get_user().login
-            return g
-        return Github(GITHUB_ORG_TOKEN)
+            # Repeat checks within the TTL are free; after it, /user is revalidated with its ETag
+            get_github_login(token)
+            return _cached_github(token)
+        return _cached_github(GITHUB_ORG_TOKEN)
     except Exception as e:
         st.error(f"GitHub authentication failed: {str(e)}")
         if "github_token" in st.session_state:
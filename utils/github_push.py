@@ -0,0 +1,404 @@
+"""Push generated projects to GitHub as a single commit.
+
+Files are uploaded as blobs in parallel, then one tree, one commit and a ref
+update are written through the Git Data API, so a push costs one request per
+file plus four instead of a sequential contents API call for every file.
+
+Re-pushing to a branch fetches its tree once and uploads only the files
+whose git blob SHA differs, so a small edit to a large project costs a
+handful of requests.
+"""
+import base64
+import copy
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from config import GITHUB_CONFIG
+from .error_handler import GitHubError
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {500, 502, 503, 504}
+# Added to waits for a rate-limit reset to allow for clock skew with GitHub
+RESET_MARGIN_SECONDS = 1
+
+
+def git_blob_sha(data):
+    """SHA git assigns to a blob with this content"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _error_message(response):
+    """GitHub's error message, or the status reason when the body isn't GitHub JSON (e.g. a proxy's HTML page)"""
+    try:
+        return response.json().get('message') or response.reason
+    except (ValueError, AttributeError):
+        return response.reason
+
+
+class RateLimiter:
+    """Tracks GitHub's rate-limit headers and holds requests back once the quota is spent.
+
+    Every worker shares one limiter, so when the remaining count reaches zero
+    they all wait for the reset instead of each burning a failed request.
+    """
+
+    def __init__(self, max_wait=None):
+        self.max_wait = GITHUB_CONFIG['max_rate_limit_wait_seconds'] if max_wait is None else max_wait
+        self.remaining = None
+        self.reset_at = None
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        with self._lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = int(reset)
+
+    def _sleep(self, seconds):
+        if seconds > self.max_wait:
+            raise GitHubError(f"GitHub rate limit exhausted; resets in {int(seconds)}s")
+        if seconds > 0:
+            logger.info(f"GitHub rate limit reached, waiting {seconds:.1f}s")
+            time.sleep(seconds)
+
+    def wait(self):
+        """Block until a request may be sent"""
+        with self._lock:
+            exhausted = self.remaining is not None and self.remaining <= 0 and self.reset_at
+            delay = self.reset_at + RESET_MARGIN_SECONDS - time.time() if exhausted else 0
+        self._sleep(delay)
+
+    def backoff(self, response, attempt):
+        """Wait out a rate-limited or failed response before it is retried"""
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            self._sleep(float(retry_after))
+        elif response.headers.get('X-RateLimit-Remaining') == '0' and response.headers.get('X-RateLimit-Reset'):
+            self._sleep(int(response.headers['X-RateLimit-Reset']) + RESET_MARGIN_SECONDS - time.time())
+        else:
+            time.sleep(min(2 ** attempt * 0.5, 8))
+
+
+class ETagCache:
+    """Bounded LRU of GET response bodies and their ETags, replayed on 304 Not Modified"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or GITHUB_CONFIG['etag_cache_entries']
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        """Return (etag, body) for a cached response, or None"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+            return entry
+
+    def put(self, path, etag, body):
+        with self._lock:
+            self._entries[path] = (etag, body)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+class GitDataClient:
+    """Thin REST client for the repository and Git Data endpoints a push needs.
+
+    GET responses carrying an ETag are cached and revalidated with
+    If-None-Match, so re-reading an unchanged user, repository, ref or tree
+    returns the cached body from a 304 that costs no rate limit.
+    """
+
+    def __init__(self, token, api_url=None, workers=None):
+        self.api_url = (api_url or GITHUB_CONFIG['api_url']).rstrip('/')
+        self.workers = workers or GITHUB_CONFIG['push_workers']
+        self.limiter = RateLimiter()
+        self.etags = ETagCache()
+        self._login = None
+        self._verified_at = None
+        self.session = requests.Session()
+        # One pooled connection per blob worker
+        self.session.mount(self.api_url, HTTPAdapter(pool_connections=1, pool_maxsize=self.workers))
+        self.session.headers.update({
+            'Authorization': f"Bearer {token}",
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28'
+        })
+
+    def request(self, method, path, payload=None, allow=()):
+        """
+        Send one API request, retrying rate limits and server errors
+
+        Args:
+            method (str): HTTP method
+            path (str): Path below the API root, e.g. '/user'
+            payload (dict): JSON body
+            allow (tuple): Error statuses returned as None instead of raised
+
+        Raises:
+            GitHubError: If the request fails after all retries
+        """
+        cached = self.etags.get(path) if method == 'GET' else None
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        last_attempt = GITHUB_CONFIG['max_retries']
+        for attempt in range(last_attempt + 1):
+            self.limiter.wait()
+            try:
+                with span("github.request", method=method, path=path) as trace:
+                    response = self.session.request(method, f"{self.api_url}{path}", json=payload,
+                                                    headers=headers, timeout=30)
+                    trace.set(status_code=response.status_code, response_bytes=len(response.content))
+                    if response.status_code == 304 and cached:
+                        trace.set(cache="hit")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Dropped connections and timeouts are retried like server errors
+                if attempt < last_attempt:
+                    time.sleep(min(2 ** attempt * 0.5, 8))
+                    continue
+                raise GitHubError(f"GitHub {method} {path} failed: {str(e)}")
+            except requests.RequestException as e:
+                raise GitHubError(f"GitHub {method} {path} failed: {str(e)}")
+            self.limiter.update(response.headers)
+
+            if method == 'GET':
+                self.etags.record(hit=response.status_code == 304 and cached is not None)
+            if response.status_code == 304 and cached:
+                return copy.deepcopy(cached[1])
+            if response.ok:
+                try:
+                    body = response.json() if response.content else {}
+                except ValueError:
+                    raise GitHubError(f"GitHub {method} {path} returned a response that isn't JSON")
+                if method == 'GET' and response.headers.get('ETag'):
+                    self.etags.put(path, response.headers['ETag'], copy.deepcopy(body))
+                return body
+            if response.status_code in allow:
+                return None
+            if response.status_code == 401:
+                # A revoked token must be verified again rather than trusted until the TTL runs out
+                self._login = None
+            rate_limited = response.status_code == 429 or (
+                response.status_code == 403 and (response.headers.get('Retry-After') is not None
+                                                 or response.headers.get('X-RateLimit-Remaining') == '0'))
+            if (rate_limited or response.status_code in RETRY_STATUSES) and attempt < last_attempt:
+                self.limiter.backoff(response, attempt)
+                continue
+            raise GitHubError(f"GitHub {method} {path} failed ({response.status_code}): {_error_message(response)}")
+
+    def get_login(self):
+        return self.request('GET', '/user')['login']
+
+    def verified_login(self):
+        """
+        Login of the token's owner, re-verified at most every identity_ttl_seconds
+
+        Raises:
+            GitHubError: If the token is rejected
+        """
+        now = time.monotonic()
+        if self._login is None or now - self._verified_at > GITHUB_CONFIG['identity_ttl_seconds']:
+            self._login = self.get_login()
+            self._verified_at = now
+        return self._login
+
+    def ensure_repository(self, owner, name, private=True, description=''):
+        """Return (repository, whether it was created), creating it with an initial commit when missing"""
+        repo = self.request('GET', f"/repos/{owner}/{name}", allow=(404,))
+        if repo is not None:
+            return repo, False
+        # auto_init gives the repo a first commit; the Git Data API can't write to an empty repo
+        return self.request('POST', '/user/repos', {
+            'name': name,
+            'private': private,
+            'description': description,
+            'auto_init': True
+        }), True
+
+    def get_branch_head(self, repo, branch):
+        """Commit SHA at the tip of branch, or None if the branch doesn't exist yet"""
+        ref = self.request('GET', f"/repos/{repo}/git/ref/heads/{branch}", allow=(404, 409))
+        return ref['object']['sha'] if ref else None
+
+    def get_commit_tree(self, repo, commit_sha):
+        return self.request('GET', f"/repos/{repo}/git/commits/{commit_sha}")['tree']['sha']
+
+    def get_tree_blobs(self, repo, tree_sha):
+        """
+        Map every blob path in a tree to its SHA with one recursive request
+
+        Returns:
+            tuple: (dict of path to SHA, whether GitHub truncated the listing)
+        """
+        tree = self.request('GET', f"/repos/{repo}/git/trees/{tree_sha}?recursive=1")
+        blobs = {entry['path']: entry['sha'] for entry in tree['tree'] if entry['type'] == 'blob'}
+        return blobs, tree.get('truncated', False)
+
+    def create_blob(self, repo, data):
+        blob = self.request('POST', f"/repos/{repo}/git/blobs", {
+            'content': base64.b64encode(data).decode('ascii'),
+            'encoding': 'base64'
+        })
+        return blob['sha']
+
+    def create_blobs(self, repo, contents):
+        """Upload blobs on a bounded pool and return their SHAs in input order"""
+        if not contents:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(contents)),
+                                thread_name_prefix="github-blob") as executor:
+            return list(executor.map(lambda data: self.create_blob(repo, data), contents))
+
+    def create_tree(self, repo, entries, base_tree=None):
+        payload = {'tree': entries}
+        if base_tree:
+            payload['base_tree'] = base_tree
+        return self.request('POST', f"/repos/{repo}/git/trees", payload)['sha']
+
+    def create_commit(self, repo, message, tree, parents):
+        return self.request('POST', f"/repos/{repo}/git/commits", {
+            'message': message,
+            'tree': tree,
+            'parents': parents
+        })['sha']
+
+    def update_branch(self, repo, branch, sha, exists):
+        if exists:
+            self.request('PATCH', f"/repos/{repo}/git/refs/heads/{branch}", {'sha': sha, 'force': False})
+        else:
+            self.request('POST', f"/repos/{repo}/git/refs", {'ref': f"refs/heads/{branch}", 'sha': sha})
+
+
+@functools.lru_cache(maxsize=GITHUB_CONFIG['client_cache_size'])
+def get_git_client(token):
+    """Shared client for a token, keeping its connection pool, ETag cache and verified identity"""
+    return GitDataClient(token)
+
+
+def push_files(client, repo, files, message, branch='main', replace=False):
+    """
+    Commit files to a branch as a single commit, uploading only what changed
+
+    The branch's current tree is fetched once and each file's git blob SHA
+    is computed locally; files already on the branch reuse their SHA and are
+    not uploaded. Files on the branch that aren't in files are kept, unless
+    replace is set, in which case the commit's tree is exactly the given
+    files. When nothing would change, no commit is made.
+
+    Args:
+        client (GitDataClient): Authenticated client
+        repo (str): 'owner/name'
+        files (list): Dicts with 'path' and 'content' as returned by ProjectGenerator
+        message (str): Commit message
+        branch (str): Branch to update, created if missing
+        replace (bool): Remove files the project no longer has; only for repositories the project owns
+
+    Returns:
+        dict: 'commit_sha' (the branch head afterwards), 'files', 'uploaded'
+              blob count and 'changed' (False when nothing was committed)
+
+    Raises:
+        GitHubError: If any request fails; the branch is only moved by the last request
+    """
+    with span("github.push", files=len(files), replace=replace) as trace:
+        parent = client.get_branch_head(repo, branch)
+        parent_tree, existing = None, {}
+        if parent:
+            parent_tree = client.get_commit_tree(repo, parent)
+            # A truncated listing only means some unchanged files are uploaded again
+            existing, _ = client.get_tree_blobs(repo, parent_tree)
+
+        contents = [file_info['content'].encode('utf-8') for file_info in files]
+        shas = [git_blob_sha(data) for data in contents]
+        changed = [index for index, (file_info, sha) in enumerate(zip(files, shas))
+                   if existing.get(file_info['path']) != sha]
+        for index, sha in zip(changed, client.create_blobs(repo, [contents[index] for index in changed])):
+            if sha != shas[index]:
+                raise GitHubError(f"GitHub stored {files[index]['path']} as {sha}, expected {shas[index]}")
+        trace.set(uploaded=len(changed), request_bytes=sum(len(contents[index]) for index in changed))
+
+        unchanged = {'commit_sha': parent, 'files': len(files), 'uploaded': len(changed), 'changed': False}
+        if replace:
+            tree = client.create_tree(repo, [
+                {'path': file_info['path'], 'mode': '100644', 'type': 'blob', 'sha': sha}
+                for file_info, sha in zip(files, shas)
+            ])
+        elif changed:
+            # Only changed paths are sent; everything else comes from the branch's tree
+            tree = client.create_tree(repo, [
+                {'path': files[index]['path'], 'mode': '100644', 'type': 'blob', 'sha': shas[index]}
+                for index in changed
+            ], base_tree=parent_tree)
+        else:
+            return unchanged
+        if tree == parent_tree:
+            return unchanged
+
+        commit_sha = client.create_commit(repo, message, tree, [parent] if parent else [])
+        client.update_branch(repo, branch, commit_sha, exists=parent is not None)
+    return {'commit_sha': commit_sha, 'files': len(files), 'uploaded': len(changed), 'changed': True}
+
+
+def push_project(token, repo_name, files, message, branch=None, private=True, description='',
+                 owned_repo=None, allow_existing=False):
+    """
+    Push a generated project to the token owner's repository, creating it if needed
+
+    A repository that already existed is only written to when it is
+    owned_repo (the one this project pushed to before) or allow_existing is
+    set. Only the project's own repository is replaced wholesale; in any
+    other, files outside the project are kept. The repository's default
+    branch is used unless branch is given.
+
+    Args:
+        owned_repo (str): 'owner/name' this project pushed to before, if any
+        allow_existing (bool): The user confirmed pushing into an existing repository
+
+    Returns:
+        dict: push_files result plus 'html_url' of the repository, 'repo' and 'created'
+
+    Raises:
+        GitHubError: If the repository exists and isn't owned_repo without allow_existing,
+                     or a request fails
+    """
+    client = get_git_client(token)
+    owner = client.verified_login()
+    repo, created = client.ensure_repository(owner, repo_name, private=private, description=description)
+    owned = repo['full_name'] == owned_repo
+    if not created and not owned and not allow_existing:
+        raise GitHubError(f"{repo['full_name']} already exists. Choose another name, or confirm pushing "
+                          f"into it; its other files will be kept.")
+    result = push_files(client, repo['full_name'], files, message,
+                        branch or repo.get('default_branch') or 'main', replace=owned)
+    return {**result, 'repo': repo['full_name'], 'html_url': repo['html_url'], 'created': created}
@@ -1,5 +1,6 @@
 # utils/helpers.py
 import re
+from config import ADMIN_CONFIG
 
 def validate_email(email):
     """Validates if the email format is correct."""
@@ -40,4 +41,9 @@ def validate_prompt(prompt):
         "Features",
         "Implementation Plan"
     ]
-    return all(section.lower() in prompt.lower() for section in required_sections)
\ No newline at end of file
+    return all(section.lower() in prompt.lower() for section in required_sections)
+
+def is_admin(user):
+    """Checks if the user is allowed to see admin-only pages."""
+    email = getattr(user, "email", None)
+    return bool(email) and email.lower() in ADMIN_CONFIG['emails']
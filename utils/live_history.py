@@ -0,0 +1,104 @@
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from firebase_admin import firestore
+from config import FIREBASE_CONFIG
+from .firestore_db import CHAT_SUMMARY_FIELDS, FirestoreDB, get_db
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+_views = {}
+_views_lock = threading.Lock()
+
+# Sorts chats whose server timestamp hasn't resolved yet ahead of everything else
+_PENDING = datetime.max.replace(tzinfo=timezone.utc)
+
+
+def _sort_key(chat):
+    timestamp = chat.get('timestamp')
+    if timestamp is None:
+        return _PENDING
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+class LiveChatHistory:
+    """Newest-first view of a user's recent chats kept current by a snapshot listener.
+
+    The listener delivers only changed documents after the first snapshot, so
+    rendering from the view costs no reads. Listeners can't apply a field
+    mask, so response bodies are dropped as changes arrive and only summary
+    fields are kept.
+    """
+
+    def __init__(self, client, user_id, limit):
+        self.user_id = user_id
+        self.limit = limit
+        self.last_access = time.monotonic()
+        self._chats = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        query = (client.collection('chat_history')
+                 .where("user_id", "==", user_id)
+                 .order_by('timestamp', direction=firestore.Query.DESCENDING)
+                 .limit(limit))
+        self._watch = query.on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, snapshots, changes, read_time):
+        with span("firestore.snapshot", op="read", collection="chat_history", documents=len(changes)):
+            with self._lock:
+                for change in changes:
+                    doc_id = change.document.id
+                    self._remove(doc_id)
+                    if change.type.name != 'REMOVED':
+                        data = change.document.to_dict()
+                        chat = {field: data.get(field) for field in CHAT_SUMMARY_FIELDS}
+                        chat['id'] = doc_id
+                        self._chats[doc_id] = chat
+                        # _order is kept sorted oldest first so each change is a single insertion
+                        bisect.insort(self._order, (_sort_key(chat), doc_id))
+        self._ready.set()
+
+    def _remove(self, doc_id):
+        if self._chats.pop(doc_id, None) is not None:
+            self._order = [(key, order_id) for key, order_id in self._order if order_id != doc_id]
+
+    def wait(self, timeout=5):
+        """Block until the first snapshot has arrived; False on timeout"""
+        return self._ready.wait(timeout)
+
+    def chats(self):
+        """Copy of the view, newest first"""
+        self.last_access = time.monotonic()
+        with self._lock:
+            return [dict(self._chats[doc_id]) for _, doc_id in reversed(self._order)]
+
+    def close(self):
+        self._watch.unsubscribe()
+
+
+def get_live_history(user_id):
+    """
+    Return the shared live view of a user's chat history
+
+    Returns None when live history is disabled or the storage backend has no
+    snapshot listeners. Views unused for live_history_idle_seconds are closed.
+    """
+    db = get_db()
+    if not FIREBASE_CONFIG['live_history'] or not isinstance(db, FirestoreDB):
+        return None
+
+    now = time.monotonic()
+    with _views_lock:
+        for idle_user, view in list(_views.items()):
+            if now - view.last_access > FIREBASE_CONFIG['live_history_idle_seconds']:
+                view.close()
+                del _views[idle_user]
+        view = _views.get(user_id)
+        if view is None:
+            view = LiveChatHistory(db.db, user_id, FIREBASE_CONFIG['live_history_limit'])
+            _views[user_id] = view
+    return view
@@ -0,0 +1,28 @@
+import os
+from config import LLM_CONFIG
+
+
+def get_llm(model, stage=None):
+    """Return the language model for the configured backend.
+
+    Args:
+        model (str): Groq model name, also used to label the fake backend
+        stage (str): Pipeline stage the model is used for
+    """
+    if LLM_CONFIG['backend'] == 'fake':
+        from .fake_llm import FakeLLM
+        fake_config = LLM_CONFIG['fake']
+        return FakeLLM(
+            model_name=model,
+            stage=stage,
+            replay_path=fake_config['replay_path'],
+            response_chars=fake_config['response_chars'],
+            implementation_files=fake_config['implementation_files'],
+            latency_ms=fake_config['latency_ms'],
+            latency_jitter_ms=fake_config['latency_jitter_ms'],
+            error_rate=fake_config['error_rate'],
+            seed=fake_config['seed']
+        )
+
+    from langchain_groq import ChatGroq
+    return ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model=model)
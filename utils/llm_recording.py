@@ -0,0 +1,26 @@
+import hashlib
+import json
+import os
+
+
+def prompt_key(prompt):
+    """Stable key used to match a rendered prompt against recorded responses"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def load_recordings(path):
+    """Load recorded responses from a JSONL file keyed by prompt hash"""
+    recordings = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    recordings[record["key"]] = record["response"]
+    return recordings
+
+
+def record_response(path, stage, prompt, response):
+    """Append a real LLM response to a JSONL recording for later replay"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": prompt_key(prompt), "stage": stage, "response": response}) + "\n")
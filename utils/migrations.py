@@ -0,0 +1,148 @@
+"""One-off data migrations.
+
+Usage:
+    python -m utils.migrations backfill-email-index [--dry-run]
+    python -m utils.migrations rebuild-search-index [--dry-run]
+    python -m utils.migrations backfill-user-stats [--dry-run]
+"""
+import argparse
+import logging
+import firebase_admin
+from firebase_admin import credentials
+from config import FIREBASE_CONFIG
+from .firestore_db import get_db, normalize_email
+from .search_index import get_search_index
+from .text_storage import unpack_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def print_progress(done, total):
+    logger.info(f"Committed {done}/{total} writes")
+
+
+def backfill_email_index(db, dry_run=False, progress=print_progress):
+    """
+    Create user_emails index entries for profiles saved before the index existed
+
+    Profiles whose email is already indexed to another uid are reported and
+    skipped rather than overwritten.
+
+    Returns:
+        dict: Counts of indexed, already indexed and conflicting profiles
+    """
+    client = db.db
+    existing = {doc.id: doc.to_dict().get('uid') for doc in client.collection('user_emails').stream()}
+    writer = db.batch_writer()
+    counts = {'indexed': 0, 'already_indexed': 0, 'conflicts': 0, 'without_email': 0}
+
+    for profile in client.collection('user_profiles').stream():
+        email = (profile.to_dict() or {}).get('email')
+        if not email:
+            counts['without_email'] += 1
+            continue
+        key = normalize_email(email)
+        owner = existing.get(key)
+        if owner == profile.id:
+            counts['already_indexed'] += 1
+        elif owner is not None:
+            counts['conflicts'] += 1
+            logger.warning(f"{email} is indexed to {owner}, skipping profile {profile.id}")
+        else:
+            existing[key] = profile.id
+            writer.set(client.collection('user_emails').document(key), {'uid': profile.id, 'email': email})
+            counts['indexed'] += 1
+
+    if not dry_run:
+        writer.commit(progress=progress)
+    return counts
+
+
+def rebuild_search_index(db, dry_run=False, progress=print_progress):
+    """
+    Index chats saved before search was enabled
+
+    Re-adding a chat replaces its earlier entry, so the rebuild can be rerun
+    safely after an interruption.
+
+    Returns:
+        dict: Number of chats indexed
+    """
+    index = get_search_index()
+    if index is None:
+        raise SystemExit("Search is disabled (SEARCH_ENABLED=false)")
+
+    indexed = 0
+    for chat in db.db.collection('chat_history').stream():
+        data = unpack_text(chat.reference, chat.to_dict(), 'llm_response')
+        if not dry_run:
+            index.add(data['user_id'], chat.id, data.get('user_message', ''), data.get('llm_response', ''),
+                      data.get('metadata', {}).get('created_at'))
+        indexed += 1
+        if indexed % 500 == 0:
+            logger.info(f"Indexed {indexed} chats")
+    return {'indexed': indexed}
+
+
+def _count(query):
+    return query.count().get()[0][0].value
+
+
+def backfill_user_stats(db, dry_run=False, progress=print_progress):
+    """
+    Recompute each user's chat, project and generation counters
+
+    Chats and projects are counted with aggregation queries, so documents
+    aren't downloaded. Token counters can't be recovered and are left as
+    they are. Run while the app is idle: a save landing between a count and
+    its write is not reflected.
+
+    Returns:
+        dict: Number of users whose stats were written
+    """
+    client = db.db
+    writer = db.batch_writer()
+    users = 0
+    for user_ref in client.collection('user_profiles').list_documents():
+        user_id = user_ref.id
+        generations = sum((head.to_dict() or {}).get('version_count', 0) for head in
+                          client.collection('prompt_versions').where("user_id", "==", user_id)
+                          .select(['version_count']).stream())
+        writer.set(client.collection('user_stats').document(user_id), {
+            'chat_count': _count(client.collection('chat_history').where("user_id", "==", user_id)),
+            'project_count': _count(client.collection('projects').where("user_id", "==", user_id)),
+            'generation_count': generations
+        }, merge=True)
+        users += 1
+
+    if not dry_run:
+        writer.on_commit(db.cache.clear)
+        writer.commit(progress=progress)
+    return {'users': users}
+
+
+MIGRATIONS = {
+    'backfill-email-index': backfill_email_index,
+    'rebuild-search-index': rebuild_search_index,
+    'backfill-user-stats': backfill_user_stats
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a DevSpell data migration")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(FIREBASE_CONFIG['config_path']), {
+            'projectId': FIREBASE_CONFIG['project_id'],
+        })
+
+    result = MIGRATIONS[args.migration](get_db(), dry_run=args.dry_run)
+    logger.info(f"{args.migration}: {result}")
+
+
+if __name__ == "__main__":
+    main()
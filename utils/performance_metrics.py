@@ -0,0 +1,96 @@
+import os
+import pandas as pd
+from config import TRACING_CONFIG
+from .tracing import get_recorded_spans
+
+PERCENTILES = [0.5, 0.9, 0.95, 0.99]
+
+
+def load_span_frame(path=None):
+    """Load recorded spans into a DataFrame indexed by start time.
+
+    Reads the JSONL trace file when the file exporter is enabled, otherwise the
+    in-process ring buffer.
+    """
+    path = path or TRACING_CONFIG['file_path']
+    if "file" in TRACING_CONFIG['exporters'] and os.path.exists(path) and os.path.getsize(path):
+        df = pd.read_json(path, lines=True, convert_dates=False)
+    else:
+        df = pd.DataFrame.from_records(get_recorded_spans())
+
+    if df.empty:
+        return df
+    df["timestamp"] = pd.to_datetime(df["start"], unit="s")
+    df["name"] = df["name"].astype("category")
+    return df.set_index("timestamp").sort_index()
+
+
+def latency_percentiles(df, by):
+    """duration_ms percentiles grouped by the given columns"""
+    if df.empty:
+        return pd.DataFrame()
+    grouped = df.groupby(by, observed=True)["duration_ms"]
+    summary = grouped.quantile(PERCENTILES).unstack()
+    summary.columns = [f"p{int(q * 100)}_ms" for q in summary.columns]
+    summary.insert(0, "count", grouped.size())
+    return summary.round(2)
+
+
+def llm_latency(df):
+    """LLM call latency by model and stage"""
+    if df.empty or "model" not in df:
+        return pd.DataFrame()
+    return latency_percentiles(df[df["name"] == "llm.call"], ["model", "stage"])
+
+
+def cache_hit_rates(df):
+    """Hit rate per span name for operations that report a cache attribute"""
+    if df.empty or "cache" not in df:
+        return pd.DataFrame()
+    cached = df[df["cache"].notna()]
+    hits = cached["cache"].eq("hit")
+    summary = hits.groupby(cached["name"], observed=True).agg(["mean", "count"])
+    summary.columns = ["hit_rate", "lookups"]
+    return summary.round(3)
+
+
+def firestore_ops_per_render(df):
+    """Firestore reads and writes issued by each page render, summarised per page"""
+    if df.empty or "op" not in df or "page" not in df:
+        return pd.DataFrame()
+    renders = df.loc[df["name"] == "page.render", ["span_id", "page"]]
+    ops = df[df["name"].str.startswith("firestore.") & df["op"].notna()]
+    counts = pd.crosstab(ops["root_id"], ops["op"])
+    per_render = renders.set_index("span_id").join(counts, how="left").fillna(0)
+    op_columns = [column for column in ("read", "write") if column in per_render]
+    if not op_columns:
+        return pd.DataFrame()
+    summary = per_render.groupby("page")[op_columns].describe(percentiles=[0.5, 0.95])
+    return summary.round(2)
+
+
+def generation_sizes(df):
+    """Distribution of generated file counts and ZIP sizes"""
+    if df.empty or "files" not in df:
+        return pd.DataFrame()
+    generations = df.loc[df["name"] == "generator.generate_project", ["files", "response_bytes"]]
+    return generations.describe(percentiles=PERCENTILES).round(1)
+
+
+def queue_depths(df, window):
+    """Maximum observed queue depth per queue over fixed time windows"""
+    if df.empty or "queue_depth" not in df:
+        return pd.DataFrame()
+    queued = df[df["queue_depth"].notna()]
+    return queued.pivot_table(index=pd.Grouper(freq=window), columns="name", values="queue_depth",
+                              aggfunc="max", observed=True)
+
+
+def rolling_latency(df, window, quantile=0.95):
+    """Latency quantile per span name over fixed time windows"""
+    if df.empty:
+        return pd.DataFrame()
+    return (df.groupby("name", observed=True)["duration_ms"]
+            .resample(window)
+            .quantile(quantile)
+            .unstack(level=0))
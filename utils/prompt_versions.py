@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+from config import PROMPT_VERSION_CONFIG
+from .text_delta import make_delta, apply_delta, delta_size
+
+# Fields read by version lists; text and deltas are only read when a version is opened
+VERSION_SUMMARY_FIELDS = ['version', 'created_at', 'source', 'kind', 'base_version', 'size']
+
+
+def plan_version(head, text, source):
+    """
+    Work out how to store the next version of a project's prompt
+
+    Each version is stored either in full (a base) or as a delta against the
+    latest base, so any version is rebuilt from at most two documents. A new
+    base is started every keyframe_interval versions, or when the delta would
+    no longer be much smaller than the text itself.
+
+    Args:
+        head (dict): The project's version head, None for the first version
+        text (str): The new prompt text
+        source (str): 'generated' or 'edited'
+
+    Returns:
+        tuple: (version document, head fields to store); text values are plain
+               strings and are packed by the storage backend
+    """
+    version = (head or {}).get('version_count', 0) + 1
+    version_doc = {
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'source': source,
+        'size': len(text)
+    }
+
+    delta = None
+    if head and version - head['base_version'] < PROMPT_VERSION_CONFIG['keyframe_interval']:
+        delta = make_delta(head['base_text'], text)
+        if delta_size(delta) > PROMPT_VERSION_CONFIG['max_delta_ratio'] * len(text):
+            delta = None
+
+    if delta is None:
+        version_doc.update({'kind': 'base', 'base_version': version, 'text': text})
+        head_fields = {'base_version': version, 'base_text': text}
+    else:
+        # Firestore can't store nested arrays, so the delta is kept as JSON text
+        version_doc.update({'kind': 'delta', 'base_version': head['base_version'], 'delta': json.dumps(delta)})
+        head_fields = {}
+
+    head_fields.update({
+        'version_count': version,
+        'latest_text': text,
+        'updated_at': version_doc['created_at']
+    })
+    return version_doc, head_fields
+
+
+def version_text(version_doc, base_text=None):
+    """Rebuild a version's text; delta versions need the text of their base"""
+    if version_doc['kind'] == 'base':
+        return version_doc['text']
+    return apply_delta(base_text, json.loads(version_doc['delta']))
@@ -0,0 +1,102 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReadCache:
+    """Per-user read-through cache with a TTL and LRU eviction.
+
+    Entries are grouped by user so every write for a user can drop exactly the
+    reads it may have made stale. Invalidation also bumps the user's
+    generation; a loader that started before it passes the generation it
+    took to put(), which then drops the stale value instead of caching it.
+    """
+
+    def __init__(self, ttl_seconds=60, max_entries=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._generations = {}
+        self._clears = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def get(self, user_id, key):
+        """Return (True, value) for a fresh entry, (False, None) otherwise"""
+        cache_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(cache_key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            value = entry[1]
+        # Callers get their own copy so they can't mutate the cached entry
+        return True, copy.deepcopy(value)
+
+    def generation(self, user_id):
+        """Token to take before loading a read and hand to put()"""
+        with self._lock:
+            return self._clears, self._generations.get(user_id, 0)
+
+    def put(self, user_id, key, value, generation=None):
+        cache_key = (user_id, key)
+        with self._lock:
+            if generation is not None and generation != (self._clears, self._generations.get(user_id, 0)):
+                # The user's data changed while this value was loading
+                self.stale_puts += 1
+                return
+            self._entries[cache_key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end(cache_key)
+            self._keys_by_user.setdefault(user_id, set()).add(cache_key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every cached read for a user"""
+        with self._lock:
+            for cache_key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(cache_key)
+            self._keys_by_user.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._clears += 1
+
+    def stats(self):
+        """Size and hit rate, for the admin dashboard"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "users": len(self._keys_by_user),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts
+            }
+
+    def _remove(self, cache_key):
+        self._entries.pop(cache_key, None)
+        user_keys = self._keys_by_user.get(cache_key[0])
+        if user_keys is not None:
+            user_keys.discard(cache_key)
+            if not user_keys:
+                del self._keys_by_user[cache_key[0]]
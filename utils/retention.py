@@ -0,0 +1,150 @@
+"""Retention for chat_history.
+
+Chats older than the TTL are deleted or archived. Repeated generations of
+a project are not compacted here: each project saves one chat, and its
+prompt regenerations are kept as deltas in prompt_versions.
+
+Users are processed one at a time in id order and the last finished user is
+checkpointed, so an interrupted run picks up where it stopped.
+
+Usage:
+    python -m utils.retention [--dry-run] [--restart]
+"""
+import argparse
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+import firebase_admin
+from firebase_admin import credentials, firestore
+from config import FIREBASE_CONFIG, RETENTION_CONFIG
+from .firestore_db import get_db
+from .search_index import get_search_index
+from .text_storage import chunk_documents
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = 'chat_history_archive'
+# revisions_chunks is still set on chats compacted by earlier versions of this job
+EXPIRY_FIELDS = ['timestamp', 'llm_response_chunks', 'revisions_chunks']
+
+
+def _delete_chat(writer, chat_ref, data):
+    """Queue deletes for a chat and the chunk documents of its packed fields"""
+    for field in ('llm_response', 'revisions'):
+        for chunk_ref, _ in chunk_documents(chat_ref, field, [None] * (data.get(f'{field}_chunks') or 0)):
+            writer.delete(chunk_ref)
+    writer.delete(chat_ref)
+
+
+def _archive_chat(client, writer, chat_ref):
+    """Queue a copy of a chat, chunks included, into the archive collection"""
+    data = chat_ref.get().to_dict()
+    archive_ref = client.collection(ARCHIVE_COLLECTION).document(chat_ref.id)
+    writer.set(archive_ref, {**data, 'archived_at': firestore.SERVER_TIMESTAMP})
+    for field in ('llm_response', 'revisions'):
+        for chunk_ref, _ in chunk_documents(chat_ref, field, [None] * (data.get(f'{field}_chunks') or 0)):
+            writer.set(archive_ref.collection('chunks').document(chunk_ref.id), chunk_ref.get().to_dict())
+    _delete_chat(writer, chat_ref, data)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get('last_user_id')
+
+
+def save_checkpoint(path, user_id):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'last_user_id': user_id, 'updated_at': datetime.utcnow().isoformat()}, f)
+
+
+def print_progress(done, total):
+    logger.info(f"Committed {done}/{total} writes")
+
+
+def run_retention(db, dry_run=False, restart=False, progress=print_progress):
+    """
+    Apply the retention policy to every user's chat history
+
+    Args:
+        db (FirestoreDB): Database handle
+        dry_run (bool): Report what would change without writing
+        restart (bool): Ignore the checkpoint and start from the first user
+        progress (callable): Optional progress(committed, total) callback for each user's writes
+
+    Returns:
+        dict: Counts of users processed and chats expired
+    """
+    client = db.db
+    checkpoint_path = RETENTION_CONFIG['checkpoint_path']
+    ttl_days = RETENTION_CONFIG['ttl_days']
+    totals = {'users': 0, 'expired': 0}
+    if ttl_days <= 0:
+        logger.info("CHAT_RETENTION_DAYS is 0, nothing expires")
+        return totals
+    cutoff = datetime.now(timezone.utc) - timedelta(days=ttl_days)
+    last_user_id = None if restart or dry_run else load_checkpoint(checkpoint_path)
+    index = get_search_index()
+
+    user_ids = sorted(doc.id for doc in client.collection('user_profiles').list_documents())
+    if last_user_id is not None:
+        user_ids = [user_id for user_id in user_ids if user_id > last_user_id]
+        logger.info(f"Resuming after user {last_user_id}")
+
+    for position, user_id in enumerate(user_ids, 1):
+        expired = list(client.collection('chat_history')
+                       .where("user_id", "==", user_id)
+                       .where("timestamp", "<", cutoff)
+                       .order_by('timestamp', direction=firestore.Query.DESCENDING)
+                       .select(EXPIRY_FIELDS)
+                       .stream())
+        removed = [chat.id for chat in expired]
+        totals['expired'] += len(expired)
+
+        if not dry_run and expired:
+            writer = db.batch_writer()
+            for chat in expired:
+                if RETENTION_CONFIG['expired_action'] == 'archive':
+                    _archive_chat(client, writer, chat.reference)
+                else:
+                    _delete_chat(writer, chat.reference, chat.to_dict())
+            # Deleted and archived chats both leave chat_history, so take them off the counter too
+            writer.set(client.collection('user_stats').document(user_id),
+                       {'chat_count': firestore.Increment(-len(removed))}, merge=True)
+            writer.on_commit(lambda user_id=user_id: db.cache.invalidate_user(user_id))
+            writer.commit(progress=progress)
+            if index is not None:
+                index.remove(user_id, removed)
+
+        if not dry_run:
+            save_checkpoint(checkpoint_path, user_id)
+        totals['users'] += 1
+        logger.info(f"User {position}/{len(user_ids)}: {len(expired)} expired")
+
+    # A finished run starts from the first user next time
+    if not dry_run and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply chat_history retention")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(FIREBASE_CONFIG['config_path']), {
+            'projectId': FIREBASE_CONFIG['project_id'],
+        })
+
+    result = run_retention(get_db(), dry_run=args.dry_run, restart=args.restart)
+    logger.info(f"Retention finished: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from config import SEARCH_CONFIG
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+_index_instance = None
+_index_lock = threading.Lock()
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = frozenset("""
+a an and are as at be by can for from has have i in is it its of on or that the this to was were will with
+you your my me we our use used using
+""".split())
+
+# Words in the user's own message describe the project better than the generated response
+MESSAGE_WEIGHT = 2
+SNIPPET_CHARS = 200
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id TEXT PRIMARY KEY,
+    length INTEGER NOT NULL,
+    created_at TEXT,
+    snippet TEXT
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_doc ON postings (doc_id);
+"""
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords and single characters removed"""
+    return [token for token in TOKEN_PATTERN.findall((text or '').lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+class SearchIndex:
+    """Per-user inverted index over chat history, kept in local SQLite files.
+
+    Chats are added as they are saved, so a query only reads the postings of
+    its own terms; results are ranked with BM25.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        # sqlite3 connections can't be shared across threads, so each thread keeps its own per file
+        self._local = threading.local()
+        self._initialised = set()
+        self._schema_lock = threading.Lock()
+
+    def _path(self, user_id):
+        return os.path.join(self.index_dir, f"{hashlib.sha1(user_id.encode('utf-8')).hexdigest()}.sqlite")
+
+    def _connect(self, user_id):
+        path = self._path(user_id)
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(path)
+        if conn is None:
+            conn = connections[path] = sqlite3.connect(path, timeout=30)
+
+        if path not in self._initialised:
+            with self._schema_lock:
+                if path not in self._initialised:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    self._initialised.add(path)
+        return conn
+
+    def add(self, user_id, doc_id, user_message, llm_response, created_at=None):
+        """Index a chat, replacing any earlier entry for the same document"""
+        terms = Counter(tokenize(user_message) * MESSAGE_WEIGHT + tokenize(llm_response))
+        with span("search.index", documents=1, terms=len(terms)):
+            conn = self._connect(user_id)
+            with conn:
+                conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                conn.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)",
+                             (doc_id, sum(terms.values()), created_at, (user_message or '')[:SNIPPET_CHARS]))
+                conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                 [(term, doc_id, tf) for term, tf in terms.items()])
+
+    def remove(self, user_id, doc_ids):
+        """Drop chats from a user's index"""
+        conn = self._connect(user_id)
+        with conn:
+            for doc_id in doc_ids:
+                conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+
+    def search(self, user_id, query, page=1, page_size=10):
+        """
+        Rank a user's chats against a free-text query
+
+        Args:
+            user_id (str): The user's unique identifier
+            query (str): Search words; chats matching any of them are returned
+            page (int): 1-based page number
+            page_size (int): Results per page
+
+        Returns:
+            tuple: (list of {'doc_id', 'score', 'snippet', 'created_at'}, total number of matches)
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms or not os.path.exists(self._path(user_id)):
+            return [], 0
+
+        with span("search.query", terms=len(terms)) as trace:
+            conn = self._connect(user_id)
+            total_docs, total_length = conn.execute("SELECT COUNT(*), SUM(length) FROM docs").fetchone()
+            if not total_docs:
+                return [], 0
+            average_length = total_length / total_docs
+
+            placeholders = ",".join("?" * len(terms))
+            postings = conn.execute(
+                f"SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN docs d USING (doc_id) "
+                f"WHERE p.term IN ({placeholders})", terms).fetchall()
+
+            document_frequency = Counter(term for term, _, _, _ in postings)
+            scores = Counter()
+            for term, doc_id, tf, length in postings:
+                df = document_frequency[term]
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                scores[doc_id] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+
+            ranked = scores.most_common()
+            start = (page - 1) * page_size
+            page_hits = ranked[start:start + page_size]
+            details = {}
+            if page_hits:
+                ids = [doc_id for doc_id, _ in page_hits]
+                details = {row[0]: row[1:] for row in conn.execute(
+                    f"SELECT doc_id, snippet, created_at FROM docs WHERE doc_id IN ({','.join('?' * len(ids))})",
+                    ids)}
+
+            results = [{
+                'doc_id': doc_id,
+                'score': round(score, 4),
+                'snippet': details[doc_id][0],
+                'created_at': details[doc_id][1]
+            } for doc_id, score in page_hits]
+            trace.set(postings=len(postings), matches=len(ranked))
+        return results, len(ranked)
+
+
+def get_search_index():
+    """Return the process-wide SearchIndex, or None when search is disabled"""
+    global _index_instance
+    if not SEARCH_CONFIG['enabled']:
+        return None
+    if _index_instance is None:
+        with _index_lock:
+            if _index_instance is None:
+                _index_instance = SearchIndex(SEARCH_CONFIG['index_dir'])
+    return _index_instance
+
+
+def index_chat(user_id, doc_id, chat_data, created_at=None):
+    """Add a saved chat to the search index; indexing failures never fail the save"""
+    index = get_search_index()
+    if index is None:
+        return
+    try:
+        index.add(user_id, doc_id, chat_data.get('user_message', ''), chat_data.get('llm_response', ''),
+                  created_at)
+    except Exception as e:
+        logger.warning(f"Failed to index chat {doc_id}: {str(e)}")
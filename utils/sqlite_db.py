@@ -0,0 +1,491 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from firebase_admin import firestore
+from config import FIREBASE_CONFIG
+from .error_handler import FirestoreError
+from .read_cache import ReadCache
+from .storage import StorageBackend, stats_update
+from .batch_writer import BatchWriter
+from .tracing import span, payload_size
+from .firestore_db import CHAT_SUMMARY_FIELDS, PROJECT_SUMMARY_FIELDS, ORDER_FIELDS, normalize_email
+from .prompt_versions import plan_version, version_text, VERSION_SUMMARY_FIELDS
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    user_id TEXT,
+    order_value TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS documents_by_user ON documents (collection, user_id, order_value);
+"""
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat(timespec='microseconds')}
+    if isinstance(value, bytes):
+        return {'$bytes': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode(value):
+    if '$datetime' in value:
+        return datetime.fromisoformat(value['$datetime'])
+    if '$bytes' in value:
+        return base64.b64decode(value['$bytes'])
+    return value
+
+
+def _order_value(value):
+    """Sortable text form of an order field"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='microseconds')
+    return None if value is None else str(value)
+
+
+class SQLiteBatchWriter(BatchWriter):
+    """BatchWriter whose queued writes are applied in one SQLite transaction.
+
+    Document references are (collection, id) pairs.
+    """
+
+    def _commit_chunk(self, chunk):
+        with span("sqlite.batch_commit", op="write", writes=len(chunk),
+                  request_bytes=sum(payload_size(data) for _, _, data, _ in chunk)):
+            try:
+                with self.client._transaction() as conn:
+                    for kind, (collection, doc_id), data, merge in chunk:
+                        if kind == "set":
+                            self.client._put(conn, collection, doc_id, data, merge=merge)
+                        elif kind == "update":
+                            self.client._update(conn, collection, doc_id, data)
+                        else:
+                            self.client._delete(conn, collection, doc_id)
+            except Exception as e:
+                raise FirestoreError(f"Failed to commit {len(chunk)} writes: {str(e)}")
+
+
+class SQLiteDB(StorageBackend):
+    """Local implementation of the storage interface on a single SQLite file.
+
+    Documents are stored as JSON rows keyed by collection and id, with the
+    owning user and order field copied into indexed columns so per-user,
+    newest-first pages with cursors behave like their Firestore queries.
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path=':memory:'):
+        if path == ':memory:':
+            # A named shared-cache database lets every thread's connection see the same data
+            self.path = f"file:devspell-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.path = path
+        self._local = threading.local()
+        self.cache = ReadCache(ttl_seconds=FIREBASE_CONFIG['cache_ttl_seconds'],
+                               max_entries=FIREBASE_CONFIG['cache_max_entries'])
+        # Held for the lifetime of the handle, which keeps an in-memory database alive
+        self._anchor = self._connect()
+        self._anchor.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, uri=self.path.startswith('file:'), isolation_level=None,
+                               check_same_thread=False, timeout=30)
+        if not self.path.startswith('file:'):
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @property
+    def conn(self):
+        """Connection owned by the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _get(self, conn, collection, doc_id):
+        row = conn.execute("SELECT data FROM documents WHERE collection = ? AND id = ?",
+                           (collection, doc_id)).fetchone()
+        return json.loads(row[0], object_hook=_decode) if row else None
+
+    def _put(self, conn, collection, doc_id, data, merge=False):
+        existing = self._get(conn, collection, doc_id) if merge else None
+        # Callers written against Firestore may still pass its server timestamp and increment sentinels
+        resolved = {}
+        for key, value in data.items():
+            if value is firestore.SERVER_TIMESTAMP:
+                value = datetime.utcnow()
+            elif isinstance(value, firestore.Increment):
+                value = (existing or {}).get(key, 0) + value.value
+            resolved[key] = value
+        data = {**(existing or {}), **resolved}
+        order_field = ORDER_FIELDS.get(collection)
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (collection, id, user_id, order_value, data) VALUES (?, ?, ?, ?, ?)",
+            (collection, doc_id, data.get('user_id'),
+             _order_value(data.get(order_field)) if order_field else None,
+             json.dumps(data, default=_encode))
+        )
+
+    def _update(self, conn, collection, doc_id, data):
+        if self._get(conn, collection, doc_id) is None:
+            raise FirestoreError(f"No document to update: {collection}/{doc_id}")
+        self._put(conn, collection, doc_id, data, merge=True)
+
+    def _delete(self, conn, collection, doc_id):
+        conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+
+    def batch_writer(self):
+        return SQLiteBatchWriter(self)
+
+    def _write(self, writer, user_id, collection, doc_id, data, stats=None):
+        """Write a document now, or queue it on writer, together with a merge into the user's stats"""
+        if writer is not None:
+            writer.set((collection, doc_id), data)
+            if stats:
+                writer.set(('user_stats', user_id), stats, merge=True)
+            writer.on_commit(lambda: self.cache.invalidate_user(user_id))
+            return
+        with self._transaction() as conn:
+            self._put(conn, collection, doc_id, data)
+            if stats:
+                self._put(conn, 'user_stats', user_id, stats, merge=True)
+        self.cache.invalidate_user(user_id)
+
+    def save_chat_history(self, user_id, chat_data, writer=None):
+        """
+        Save chat history for a user
+
+        Raises:
+            FirestoreError: If there's an error saving to SQLite
+            ValueError: If the input parameters are invalid
+        """
+        if not user_id or not isinstance(chat_data, dict):
+            raise ValueError("Invalid user_id or chat_data")
+
+        now = datetime.utcnow()
+        chat_doc = {
+            'user_id': user_id,
+            'timestamp': now,
+            'chat_id': str(uuid.uuid4()),
+            'user_message': chat_data.get('user_message', ''),
+            'llm_response': chat_data.get('llm_response', ''),
+            'metadata': {
+                'created_at': now.isoformat(),
+                'type': 'project_generation',
+                'project_key': chat_data.get('project_key')
+            }
+        }
+        doc_id = uuid.uuid4().hex
+        try:
+            with span("sqlite.save_chat_history", op="write", collection="chat_history",
+                      request_bytes=payload_size(chat_doc)):
+                self._write(writer, user_id, 'chat_history', doc_id, chat_doc,
+                            stats_update('chat_count', 'last_chat_at'))
+            self._index_chat(user_id, doc_id, chat_data, chat_doc['metadata']['created_at'], writer)
+            return doc_id
+        except Exception as e:
+            raise FirestoreError(f"Failed to save chat history: {str(e)}")
+
+    def save_project(self, user_id, project_data, writer=None):
+        """
+        Save generated project data
+
+        Raises:
+            FirestoreError: If there's an error saving to SQLite
+            ValueError: If the input parameters are invalid
+        """
+        if not user_id or not isinstance(project_data, dict):
+            raise ValueError("Invalid user_id or project_data")
+
+        now = datetime.utcnow()
+        project_doc = {
+            'user_id': user_id,
+            'project_id': str(uuid.uuid4()),
+            'created_at': now,
+            'updated_at': now,
+            **project_data
+        }
+        try:
+            with span("sqlite.save_project", op="write", collection="projects",
+                      request_bytes=payload_size(project_doc)):
+                self._write(writer, user_id, 'projects', project_doc['project_id'], project_doc,
+                            stats_update('project_count', 'last_project_at'))
+            return project_doc['project_id']
+        except Exception as e:
+            raise FirestoreError(f"Failed to save project: {str(e)}")
+
+    def update_project(self, user_id, project_id, update_data, writer=None):
+        """Update fields of an existing project, or queue the update on writer when given"""
+        project_update = {**update_data, 'updated_at': datetime.utcnow()}
+        if writer is not None:
+            writer.update(('projects', project_id), project_update)
+            writer.on_commit(lambda: self.cache.invalidate_user(user_id))
+            return True
+        with span("sqlite.update_project", op="write", collection="projects"):
+            with self._transaction() as conn:
+                self._update(conn, 'projects', project_id, project_update)
+        self.cache.invalidate_user(user_id)
+        return True
+
+    def _paged_query(self, collection, user_id, page_size=None, start_after=None, fields=None):
+        """Run a per-user, newest-first query and return (documents, next cursor)"""
+        order_field = ORDER_FIELDS[collection]
+        sql = "SELECT id, data FROM documents WHERE collection = ? AND user_id = ?"
+        params = [collection, user_id]
+        if start_after is not None:
+            # The document id breaks ties, so documents sharing the boundary value are not skipped
+            order_value, doc_id = start_after
+            sql += " AND (order_value < ? OR (order_value = ? AND id < ?))"
+            params.extend([_order_value(order_value), _order_value(order_value), doc_id])
+        sql += " ORDER BY order_value DESC, id DESC"
+        if page_size:
+            # Fetch one extra row to know whether another page exists
+            sql += " LIMIT ?"
+            params.append(page_size + 1)
+
+        rows = self.conn.execute(sql, params).fetchall()
+        results = []
+        for doc_id, data in rows[:page_size] if page_size else rows:
+            result = json.loads(data, object_hook=_decode)
+            if fields:
+                result = {field: result[field] for field in fields if field in result}
+            result['id'] = doc_id
+            results.append(result)
+
+        next_cursor = (results[-1][order_field], results[-1]['id']) if page_size and len(rows) > page_size else None
+        return results, next_cursor
+
+    def get_user_projects(self, user_id, limit=None):
+        """Retrieve user's projects"""
+        with span("sqlite.get_user_projects", collection="projects") as trace:
+            projects, _ = self._cached_read(trace, user_id, ('get_user_projects', limit),
+                                            lambda: self._paged_query('projects', user_id, limit))
+            for project in projects:
+                project.pop('id')
+            trace.set(documents=len(projects))
+        return projects
+
+    def retrieve_chat_history(self, user_id):
+        """Retrieve chat history for a user"""
+        with span("sqlite.retrieve_chat_history", op="read", collection="chat_history") as trace:
+            history, _ = self._paged_query('chat_history', user_id)
+            for chat in history:
+                chat.pop('id')
+            trace.set(documents=len(history))
+        return history
+
+    def iter_user_documents(self, user_id, collection, page_size=200):
+        """Yield every document a user owns in collection, newest first, one uncached page at a time"""
+        cursor = None
+        while True:
+            with span("sqlite.iter_user_documents", op="read", collection=collection):
+                docs, cursor = self._paged_query(collection, user_id, page_size, cursor)
+            yield from docs
+            if cursor is None:
+                return
+
+    def retrieve_chat_history_page(self, user_id, page_size=20, start_after=None):
+        """Retrieve one page of a user's chat history, newest first"""
+        with span("sqlite.retrieve_chat_history_page", collection="chat_history") as trace:
+            chats, next_cursor = self._cached_read(
+                trace, user_id, ('retrieve_chat_history_page', page_size, start_after),
+                lambda: self._paged_query('chat_history', user_id, page_size, start_after))
+            trace.set(documents=len(chats))
+        return chats, next_cursor
+
+    def list_chat_summaries(self, user_id, page_size=20, start_after=None):
+        """Retrieve one page of chat summaries without response bodies"""
+        with span("sqlite.list_chat_summaries", collection="chat_history") as trace:
+            chats, next_cursor = self._cached_read(
+                trace, user_id, ('list_chat_summaries', page_size, start_after),
+                lambda: self._paged_query('chat_history', user_id, page_size, start_after,
+                                          fields=CHAT_SUMMARY_FIELDS))
+            trace.set(documents=len(chats))
+        return chats, next_cursor
+
+    def get_chat(self, chat_doc_id):
+        """Retrieve a full chat history document"""
+        with span("sqlite.get_chat", op="read", collection="chat_history"):
+            chat = self._get(self.conn, 'chat_history', chat_doc_id)
+            if chat is not None:
+                chat['id'] = chat_doc_id
+        return chat
+
+    def list_project_summaries(self, user_id, limit=5):
+        """Retrieve the user's most recent projects with only the fields shown in project lists"""
+        with span("sqlite.list_project_summaries", collection="projects") as trace:
+            projects, _ = self._cached_read(
+                trace, user_id, ('list_project_summaries', limit),
+                lambda: self._paged_query('projects', user_id, limit, fields=PROJECT_SUMMARY_FIELDS))
+            trace.set(documents=len(projects))
+        return projects
+
+    def get_project(self, project_id):
+        """Retrieve a full project document"""
+        with span("sqlite.get_project", op="read", collection="projects"):
+            return self._get(self.conn, 'projects', project_id)
+
+    def save_prompt_version(self, user_id, project_key, text, source='generated', project_name=None):
+        """Store the next version of a project's prompt as a base or a delta"""
+        with span("sqlite.save_prompt_version", op="write", collection="prompt_versions"):
+            with self._transaction() as conn:
+                head = self._get(conn, 'prompt_versions', project_key)
+                if head and head['user_id'] != user_id:
+                    raise FirestoreError("Prompt versions belong to another user")
+                version_doc, head_fields = plan_version(head, text, source)
+                self._put(conn, 'prompt_version_entries', f"{project_key}/{version_doc['version']:06d}",
+                          {'user_id': user_id, **version_doc})
+                self._put(conn, 'prompt_versions', project_key, {
+                    **(head or {}),
+                    **head_fields,
+                    'user_id': user_id,
+                    'project_key': project_key,
+                    'project_name': project_name or (head or {}).get('project_name')
+                })
+                self._put(conn, 'user_stats', user_id, stats_update('generation_count', 'last_generation_at'),
+                          merge=True)
+        self.cache.invalidate_user(user_id)
+        return version_doc['version']
+
+    def _check_prompt_owner(self, user_id, project_key):
+        head = self._get(self.conn, 'prompt_versions', project_key)
+        if head and head['user_id'] != user_id:
+            raise FirestoreError("Prompt versions belong to another user")
+
+    def list_prompt_versions(self, user_id, project_key, page_size=10, start_after=None):
+        """Retrieve one page of a project's prompt versions, newest first, without their text"""
+        # Version ids are zero-padded, so id order is version order
+        sql = "SELECT data FROM documents WHERE collection = 'prompt_version_entries' AND id > ? AND id < ?"
+        params = [f"{project_key}/", f"{project_key}/{start_after:06d}" if start_after is not None
+                  else f"{project_key}0"]
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(page_size + 1)
+
+        with span("sqlite.list_prompt_versions", op="read", collection="prompt_versions"):
+            self._check_prompt_owner(user_id, project_key)
+            rows = self.conn.execute(sql, params).fetchall()
+        versions = []
+        for (data,) in rows[:page_size]:
+            version_doc = json.loads(data, object_hook=_decode)
+            versions.append({field: version_doc.get(field) for field in VERSION_SUMMARY_FIELDS})
+        return versions, versions[-1]['version'] if len(rows) > page_size else None
+
+    def get_prompt_version(self, user_id, project_key, version):
+        """Retrieve one prompt version with its text rebuilt from at most two documents"""
+        with span("sqlite.get_prompt_version", op="read", collection="prompt_versions"):
+            self._check_prompt_owner(user_id, project_key)
+            version_doc = self._get(self.conn, 'prompt_version_entries', f"{project_key}/{version:06d}")
+            if version_doc is None:
+                return None
+            base_text = None
+            if version_doc['kind'] == 'delta':
+                base_doc = self._get(self.conn, 'prompt_version_entries',
+                                     f"{project_key}/{version_doc['base_version']:06d}")
+                if base_doc is None:
+                    raise FirestoreError(f"Prompt {project_key} is missing base version {version_doc['base_version']}")
+                base_text = base_doc['text']
+            result = {field: version_doc.get(field) for field in VERSION_SUMMARY_FIELDS}
+            result['text'] = version_text(version_doc, base_text)
+        return result
+
+    def record_token_usage(self, user_id, token_usage, writer=None):
+        """Add LLM call and token counts to the user's aggregates"""
+        update = stats_update(token_usage=token_usage)
+        if writer is not None:
+            writer.set(('user_stats', user_id), update, merge=True)
+            writer.on_commit(lambda: self.cache.invalidate_user(user_id))
+            return
+        with span("sqlite.record_token_usage", op="write", collection="user_stats"):
+            with self._transaction() as conn:
+                self._put(conn, 'user_stats', user_id, update, merge=True)
+        self.cache.invalidate_user(user_id)
+
+    def get_user_stats(self, user_id):
+        """Retrieve a user's aggregate counters"""
+        with span("sqlite.get_user_stats", collection="user_stats") as trace:
+            return self._cached_read(trace, user_id, ('get_user_stats',),
+                                     lambda: self._get(self.conn, 'user_stats', user_id))
+
+    def get_user_profile(self, user_id):
+        """Retrieve a user's profile document"""
+        with span("sqlite.get_user_profile", collection="user_profiles") as trace:
+            return self._cached_read(trace, user_id, ('get_user_profile',),
+                                     lambda: self._get(self.conn, 'user_profiles', user_id))
+
+    def save_user_profile(self, user_id, user_data):
+        """
+        Create a user profile together with its email index entry
+
+        Raises:
+            FirestoreError: If the email is already registered to another user
+            ValueError: If the input parameters are invalid
+        """
+        if not user_id or not isinstance(user_data, dict) or not user_data.get('email'):
+            raise ValueError("Invalid user_id or user_data")
+
+        email_key = normalize_email(user_data['email'])
+        with span("sqlite.save_user_profile", op="write", collection="user_profiles"):
+            with self._transaction() as conn:
+                index = self._get(conn, 'user_emails', email_key)
+                if index and index['uid'] != user_id:
+                    raise FirestoreError("Email already exists")
+                self._put(conn, 'user_emails', email_key, {'uid': user_id, 'email': user_data['email']})
+                self._put(conn, 'user_profiles', user_id, user_data)
+        self.cache.invalidate_user(user_id)
+        return user_id
+
+    def get_user_by_email(self, email):
+        """Get user profile by email through the user_emails index"""
+        with span("sqlite.get_user_by_email", op="read", collection="user_emails"):
+            index = self._get(self.conn, 'user_emails', normalize_email(email))
+            if index is None:
+                return None
+            user_record = self._get(self.conn, 'user_profiles', index['uid']) or {'email': email}
+            user_record['uid'] = index['uid']
+        return user_record
+
+    def update_user(self, user_id, update_data, writer=None):
+        """Update user profile information, or queue a merge on writer when given"""
+        profile_update = {**update_data, 'updated_at': datetime.utcnow()}
+        if writer is not None and 'email' not in update_data:
+            writer.set(('user_profiles', user_id), profile_update, merge=True)
+            writer.on_commit(lambda: self.cache.invalidate_user(user_id))
+            return True
+
+        with span("sqlite.update_user", op="write", collection="user_profiles"):
+            with self._transaction() as conn:
+                if 'email' in update_data:
+                    new_key = normalize_email(update_data['email'])
+                    index = self._get(conn, 'user_emails', new_key)
+                    if index and index['uid'] != user_id:
+                        raise FirestoreError("Email already exists")
+                    old_email = (self._get(conn, 'user_profiles', user_id) or {}).get('email')
+                    if old_email and normalize_email(old_email) != new_key:
+                        self._delete(conn, 'user_emails', normalize_email(old_email))
+                    self._put(conn, 'user_emails', new_key, {'uid': user_id, 'email': update_data['email']})
+                self._update(conn, 'user_profiles', user_id, profile_update)
+        self.cache.invalidate_user(user_id)
+        return True
@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from firebase_admin import firestore
+from .search_index import get_search_index, index_chat
+
+
+TOKEN_USAGE_FIELDS = ('llm_calls', 'prompt_tokens', 'completion_tokens')
+
+
+def stats_update(counter=None, timestamp_field=None, token_usage=None):
+    """
+    Fields merged into user_stats/{user_id} for one event
+
+    Counters are Increment transforms, so concurrent writers never lose an
+    update and no read is needed before writing.
+    """
+    update = {'last_activity_at': firestore.SERVER_TIMESTAMP}
+    if counter:
+        update[counter] = firestore.Increment(1)
+    if timestamp_field:
+        update[timestamp_field] = firestore.SERVER_TIMESTAMP
+    for field in TOKEN_USAGE_FIELDS:
+        if (token_usage or {}).get(field):
+            update[field] = firestore.Increment(token_usage[field])
+    return update
+
+
+class StorageBackend(ABC):
+    """Storage interface used by the pages, independent of where data lives.
+
+    FirestoreDB is the production implementation and SQLiteDB the local one;
+    get_db() picks between them from STORAGE_CONFIG. Paged reads return
+    (documents, cursor) where the cursor is the last document's (order value,
+    id) pair, and writes accept an optional writer from batch_writer() so several
+    writes can be committed together.
+    """
+
+    def warm_up(self):
+        """Open connections before the first page render"""
+
+    def _cached_read(self, trace, user_id, key, loader):
+        """Serve a per-user read from self.cache, calling loader and caching its result on a miss"""
+        generation = self.cache.generation(user_id)
+        hit, value = self.cache.get(user_id, key)
+        if hit:
+            trace.set(cache="hit")
+            return value
+        value = loader()
+        self.cache.put(user_id, key, value, generation)
+        trace.set(cache="miss", op="read")
+        return value
+
+    def cache_stats(self):
+        """Size and hit rate of the read-through cache"""
+        return self.cache.stats()
+
+    def _index_chat(self, user_id, doc_id, chat_data, created_at, writer=None):
+        """Add a saved chat to the search index, once writer has committed when one is given"""
+        if writer is not None:
+            writer.on_commit(lambda: index_chat(user_id, doc_id, chat_data, created_at))
+        else:
+            index_chat(user_id, doc_id, chat_data, created_at)
+
+    def search_chats(self, user_id, query, page=1, page_size=10):
+        """
+        Ranked full-text search over a user's chats
+
+        Returns:
+            tuple: (list of hits with 'doc_id', 'score', 'snippet' and 'created_at', total matches)
+        """
+        index = get_search_index()
+        if index is None:
+            return [], 0
+        return index.search(user_id, query, page=page, page_size=page_size)
+
+    @abstractmethod
+    def batch_writer(self):
+        """Return a writer whose queued writes commit together"""
+
+    @abstractmethod
+    def save_chat_history(self, user_id, chat_data, writer=None):
+        """Save a chat and return its document id"""
+
+    @abstractmethod
+    def save_project(self, user_id, project_data, writer=None):
+        """Save a project and return its project id"""
+
+    @abstractmethod
+    def update_project(self, user_id, project_id, update_data, writer=None):
+        """Update fields of an existing project, or queue the update on writer"""
+
+    @abstractmethod
+    def get_user_projects(self, user_id, limit=None):
+        """Return the user's projects, newest first"""
+
+    @abstractmethod
+    def retrieve_chat_history(self, user_id):
+        """Return every chat of the user, newest first"""
+
+    @abstractmethod
+    def iter_user_documents(self, user_id, collection, page_size=200):
+        """Yield every document a user owns in 'chat_history' or 'projects', newest first, page by page"""
+
+    @abstractmethod
+    def retrieve_chat_history_page(self, user_id, page_size=20, start_after=None):
+        """Return (chats, next cursor) for one page of full chats"""
+
+    @abstractmethod
+    def list_chat_summaries(self, user_id, page_size=20, start_after=None):
+        """Return (summaries, next cursor) for one page of chats without bodies"""
+
+    @abstractmethod
+    def get_chat(self, chat_doc_id):
+        """Return one full chat, or None"""
+
+    @abstractmethod
+    def list_project_summaries(self, user_id, limit=5):
+        """Return the user's most recent projects with list fields only"""
+
+    @abstractmethod
+    def get_project(self, project_id):
+        """Return one full project, or None"""
+
+    @abstractmethod
+    def get_user_profile(self, user_id):
+        """Return a user's profile, or None"""
+
+    @abstractmethod
+    def save_user_profile(self, user_id, user_data):
+        """Create a profile; raises FirestoreError when the email is taken"""
+
+    @abstractmethod
+    def get_user_by_email(self, email):
+        """Return the profile registered to email, with its uid, or None"""
+
+    @abstractmethod
+    def update_user(self, user_id, update_data, writer=None):
+        """Update profile fields"""
+
+    @abstractmethod
+    def save_prompt_version(self, user_id, project_key, text, source='generated', project_name=None):
+        """Store the next version of a project's prompt and return its version number"""
+
+    @abstractmethod
+    def list_prompt_versions(self, user_id, project_key, page_size=10, start_after=None):
+        """Return (version summaries, next cursor), newest first"""
+
+    @abstractmethod
+    def get_prompt_version(self, user_id, project_key, version):
+        """Return a version summary with its rebuilt 'text', or None"""
+
+    @abstractmethod
+    def record_token_usage(self, user_id, token_usage, writer=None):
+        """Add LLM call and token counts to the user's aggregates"""
+
+    @abstractmethod
+    def get_user_stats(self, user_id):
+        """Return the user's aggregate counters and last activity times, or None"""
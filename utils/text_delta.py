@@ -0,0 +1,35 @@
+import difflib
+
+
+def _lines(text):
+    return (text or '').splitlines(keepends=True)
+
+
+def make_delta(source, target):
+    """
+    Encode target as edits against source
+
+    The delta is a list of [start, end] line ranges copied from source and
+    strings inserted verbatim, so near-identical texts produce a few short
+    entries.
+    """
+    source_lines, target_lines = _lines(source), _lines(target)
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+    delta = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(''.join(target_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(source, delta):
+    """Rebuild the target text of make_delta(source, target)"""
+    source_lines = _lines(source)
+    return ''.join(''.join(source_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in delta)
+
+
+def delta_size(delta):
+    """Approximate stored size of a delta in characters"""
+    return sum(len(op) if isinstance(op, str) else 8 for op in delta)
@@ -0,0 +1,86 @@
+import asyncio
+import zlib
+from config import FIREBASE_CONFIG
+
+CHUNK_COLLECTION = 'chunks'
+
+
+def pack_text(field, text):
+    """
+    Encode a large text field for storage
+
+    Text below the compression threshold is stored inline unchanged. Larger
+    text is zlib-compressed into '<field>_z'; if the compressed bytes are still
+    above the chunk threshold they are split into chunk documents instead.
+
+    Returns:
+        tuple: (fields to store on the document, list of chunk bytes to store
+                in the document's chunks subcollection)
+    """
+    text = text or ''
+    raw = text.encode('utf-8')
+    if len(raw) < FIREBASE_CONFIG['compress_threshold_bytes']:
+        return {field: text}, []
+
+    compressed = zlib.compress(raw, FIREBASE_CONFIG['compression_level'])
+    fields = {
+        field: None,
+        f'{field}_encoding': 'zlib',
+        f'{field}_size': len(raw)
+    }
+    chunk_size = FIREBASE_CONFIG['chunk_size_bytes']
+    if len(compressed) <= chunk_size:
+        fields[f'{field}_z'] = compressed
+        return fields, []
+
+    chunks = [compressed[i:i + chunk_size] for i in range(0, len(compressed), chunk_size)]
+    fields[f'{field}_chunks'] = len(chunks)
+    return fields, chunks
+
+
+def chunk_documents(doc_ref, field, chunks):
+    """Yield (document reference, data) pairs for the chunks of a packed field"""
+    for index, chunk in enumerate(chunks):
+        chunk_ref = doc_ref.collection(CHUNK_COLLECTION).document(f'{field}_{index:05d}')
+        yield chunk_ref, {'field': field, 'index': index, 'data': chunk}
+
+
+def unpack_text(doc_ref, data, field):
+    """Restore a packed field in place, fetching its chunks only when it was chunked"""
+    encoding = data.pop(f'{field}_encoding', None)
+    if encoding is None:
+        return data
+
+    chunk_count = data.pop(f'{field}_chunks', 0)
+    if chunk_count:
+        # Chunk ids are deterministic, so they are fetched directly without a query
+        compressed = b''.join(
+            bytes(chunk_ref.get().to_dict()['data'])
+            for chunk_ref, _ in chunk_documents(doc_ref, field, [None] * chunk_count)
+        )
+    else:
+        compressed = bytes(data.pop(f'{field}_z'))
+
+    data.pop(f'{field}_size', None)
+    data[field] = zlib.decompress(compressed).decode('utf-8')
+    return data
+
+
+async def unpack_text_async(doc_ref, data, field):
+    """unpack_text for async document references; chunks are fetched concurrently"""
+    encoding = data.pop(f'{field}_encoding', None)
+    if encoding is None:
+        return data
+
+    chunk_count = data.pop(f'{field}_chunks', 0)
+    if chunk_count:
+        snapshots = await asyncio.gather(*(
+            chunk_ref.get() for chunk_ref, _ in chunk_documents(doc_ref, field, [None] * chunk_count)
+        ))
+        compressed = b''.join(bytes(snapshot.to_dict()['data']) for snapshot in snapshots)
+    else:
+        compressed = bytes(data.pop(f'{field}_z'))
+
+    data.pop(f'{field}_size', None)
+    data[field] = zlib.decompress(compressed).decode('utf-8')
+    return data
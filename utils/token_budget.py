@@ -0,0 +1,192 @@
+import logging
+import math
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain.chains import LLMChain
+from langchain.prompts import PromptTemplate
+from config import LLM_CONFIG
+from .error_handler import LLMError
+from .llm_recording import record_response
+from .tracing import span, payload_size
+
+logger = logging.getLogger(__name__)
+
+# Average characters per token for the Groq hosted models (Mixtral/Gemma)
+CHARS_PER_TOKEN = 4
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_token_usage = ContextVar("devspell_token_usage", default=None)
+
+
+def estimate_tokens(text):
+    """Estimate the token count of text without loading a tokenizer.
+
+    Every word or punctuation mark costs at least one token and long words
+    are split into CHARS_PER_TOKEN sized pieces, which slightly overestimates
+    the real BPE count and keeps the budget check on the safe side.
+    """
+    if not text:
+        return 0
+    return sum(math.ceil(len(piece) / CHARS_PER_TOKEN) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def get_stage_budget(stage):
+    """Return the prompt token budget configured for a pipeline stage"""
+    return LLM_CONFIG['stage_budgets'].get(stage, LLM_CONFIG['default_budget'])
+
+
+def compact_text(text):
+    """Strip indentation and collapse runs of spaces and blank lines, leaving fenced code blocks as they are"""
+    lines = []
+    in_fence = False
+    for line in str(text).splitlines():
+        if line.strip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+            lines.append(line.strip())
+        elif in_fence:
+            lines.append(line)
+        else:
+            line = re.sub(r"[ \t]+", " ", line).strip()
+            if line or (lines and lines[-1]):
+                lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def dedupe_items(items):
+    """Remove blank and case-insensitive duplicate entries, keeping order"""
+    seen = set()
+    unique = []
+    for item in items:
+        item = compact_text(item)
+        key = item.lower()
+        if item and key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+
+def compact_template(template):
+    """Return a copy of a PromptTemplate with whitespace-heavy text trimmed"""
+    return PromptTemplate(template=compact_text(template.template),
+                          input_variables=list(template.input_variables))
+
+
+def compact_inputs(inputs, verbatim_fields=()):
+    """Normalise chain inputs: lists are deduplicated and joined, text is compacted.
+
+    verbatim_fields are passed through untouched, for text such as an
+    approved prompt whose layout and code blocks must reach the model as is.
+    """
+    compacted = {}
+    for key, value in inputs.items():
+        if key in verbatim_fields:
+            compacted[key] = str(value) if value is not None else ""
+        elif isinstance(value, (list, tuple, set)):
+            compacted[key] = ", ".join(dedupe_items(value))
+        else:
+            compacted[key] = compact_text(value) if value is not None else ""
+    return compacted
+
+
+def summarise_text(text, max_tokens):
+    """Extractively shorten text to roughly max_tokens.
+
+    Sentences are scored by the frequency of the words they contain and the
+    highest scoring ones are kept in their original order.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    sentences = [s.strip() for s in _SENTENCE_PATTERN.split(text) if s.strip()]
+    frequencies = Counter(word.lower() for word in re.findall(r"\w{3,}", text))
+
+    def score(sentence):
+        words = re.findall(r"\w{3,}", sentence.lower())
+        return sum(frequencies[word] for word in words) / (len(words) or 1)
+
+    ranked = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)
+    kept, used = set(), 0
+    for index in ranked:
+        cost = estimate_tokens(sentences[index])
+        if used + cost <= max_tokens:
+            kept.add(index)
+            used += cost
+
+    if not kept:
+        # A single oversized sentence: fall back to a hard character cut
+        return text[:max_tokens * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + " ..."
+    return " ".join(sentences[i] for i in sorted(kept))
+
+
+def fit_prompt(template, inputs, stage, summarise_fields=("description",), verbatim_fields=("prompt",)):
+    """Compact a template and its inputs so the rendered prompt fits the stage budget.
+
+    Returns:
+        tuple: (compacted PromptTemplate, compacted inputs, estimated prompt tokens)
+
+    Raises:
+        LLMError: If the prompt is still over budget after compaction
+    """
+    budget = get_stage_budget(stage)
+    template = compact_template(template)
+    inputs = compact_inputs(inputs, verbatim_fields)
+    prompt_tokens = estimate_tokens(template.format(**inputs))
+
+    if prompt_tokens > budget:
+        for field in summarise_fields:
+            if not inputs.get(field):
+                continue
+            field_tokens = estimate_tokens(inputs[field])
+            allowance = field_tokens - (prompt_tokens - budget)
+            inputs[field] = summarise_text(inputs[field], allowance)
+            prompt_tokens = estimate_tokens(template.format(**inputs))
+            logger.info(f"Summarised '{field}' for {stage}: {field_tokens} -> "
+                        f"{estimate_tokens(inputs[field])} tokens")
+            if prompt_tokens <= budget:
+                break
+
+    if prompt_tokens > budget:
+        raise LLMError(f"The {stage.replace('_', ' ')} prompt needs about {prompt_tokens} tokens, "
+                       f"over the {budget} token budget. Please shorten your input.")
+    return template, inputs, prompt_tokens
+
+
+@contextmanager
+def track_token_usage():
+    """Total the estimated tokens of every LLM call made inside the block"""
+    usage = {'llm_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+    token = _token_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _token_usage.reset(token)
+
+
+def run_budgeted_chain(llm, template, inputs, stage, summarise_fields=("description",),
+                       verbatim_fields=("prompt",)):
+    """Run an LLMChain after fitting its prompt to the stage token budget"""
+    template, inputs, prompt_tokens = fit_prompt(template, inputs, stage, summarise_fields, verbatim_fields)
+    chain = LLMChain(prompt=template, llm=llm)
+    rendered_prompt = template.format(**inputs)
+    model = getattr(llm, "model_name", type(llm).__name__)
+    with span("llm.call", stage=stage, model=model, prompt_tokens=prompt_tokens,
+              request_bytes=payload_size(rendered_prompt)) as trace:
+        result = chain.run(inputs)
+        trace.set(completion_tokens=estimate_tokens(result), response_bytes=payload_size(result))
+    record_path = LLM_CONFIG['fake']['record_path']
+    if record_path and LLM_CONFIG['backend'] != 'fake':
+        record_response(record_path, stage, rendered_prompt, result)
+    usage = _token_usage.get()
+    if usage is not None:
+        usage['llm_calls'] += 1
+        usage['prompt_tokens'] += prompt_tokens
+        usage['completion_tokens'] += estimate_tokens(result)
+    logger.info(f"LLM call {stage}: prompt_tokens~{prompt_tokens} "
+                f"completion_tokens~{estimate_tokens(result)}")
+    return result
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import TRACING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_current_span = ContextVar("devspell_current_span", default=None)
+
+
+class Span:
+    """A timed operation with free-form attributes (payload sizes, tokens, cache hits)"""
+
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.root_id = parent.root_id if parent else self.span_id
+        self.start = time.time()
+        self.duration_ms = None
+        self.status = "ok"
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        """Attach or overwrite attributes on the span"""
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "root_id": self.root_id,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            **self.attributes
+        }
+
+
+class RingBufferExporter:
+    """Keeps the most recent spans in memory for the admin pages"""
+
+    def __init__(self, size):
+        self.spans = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def export(self, span_dict):
+        with self.lock:
+            self.spans.append(span_dict)
+
+    def read(self):
+        with self.lock:
+            return list(self.spans)
+
+
+class FileExporter:
+    """Appends spans as JSON lines to a local file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span_dict):
+        line = json.dumps(span_dict, default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+def _build_exporters():
+    exporters = {}
+    for name in TRACING_CONFIG['exporters']:
+        name = name.strip()
+        if name == "memory":
+            exporters[name] = RingBufferExporter(TRACING_CONFIG['buffer_size'])
+        elif name == "file":
+            exporters[name] = FileExporter(TRACING_CONFIG['file_path'])
+        elif name:
+            logger.warning(f"Unknown tracing exporter '{name}' ignored")
+    return exporters
+
+
+_exporters = _build_exporters()
+
+
+def current_span():
+    """Return the innermost active span, or None outside of any span"""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block of code and export it as a span.
+
+    Example:
+        with span("llm.call", stage="implementation") as s:
+            result = chain.run(inputs)
+            s.set(response_bytes=len(result))
+    """
+    parent = _current_span.get()
+    current = Span(name, parent=parent, **attributes)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.status = "error"
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+        if TRACING_CONFIG['enabled']:
+            span_dict = current.to_dict()
+            for exporter in _exporters.values():
+                try:
+                    exporter.export(span_dict)
+                except Exception as e:
+                    logger.warning(f"Failed to export span {name}: {str(e)}")
+
+
+def payload_size(value):
+    """Approximate serialised size in bytes of a document or response"""
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+def get_recorded_spans():
+    """Return recorded spans, preferring the persisted file over the ring buffer"""
+    exporter = _exporters.get("file") or _exporters.get("memory")
+    return exporter.read() if exporter else []
+